@@ -0,0 +1,320 @@
+"""
+บริการวิเคราะห์ผ่าน HTTP ภายในเครื่อง (Local Analysis Service) แบบ asyncio
+
+เปิด endpoint ของทั้งสามโปรแกรม (รับ JSON object หนึ่งรายการต่อคำขอ รูปแบบเดียวกับโหมด batch ของ jsonl_batch):
+    POST /bmi           {"weight": 70, "height": 170, "age": 30, "gender": "ชาย"}
+    POST /heart-rate    {"heart_rate": 72, "age": 30, "activity_level": "resting"}
+    POST /symptoms      {"symptoms": ["มีไข้", "ไอ"]}
+    GET  /health        สถานะของบริการ
+    GET  /metrics       สถิติแบบ Prometheus (?format=json ได้ JSON)
+
+คำขอที่เข้ามาพร้อมกันถูกรวมเป็นกลุ่มย่อย (micro-batch) ภายในช่วงเวลา --batch-window แล้วส่งให้
+process pool ที่แต่ละ worker สร้างตัววิเคราะห์ไว้แล้ว (warm) การแปลง JSON และการวิเคราะห์จึงไม่ใช้ event loop
+รองรับการเชื่อมต่อแบบ keep-alive (HTTP/1.1) และปฏิเสธคำขอด้วย 503 เมื่องานค้างเกิน --max-pending
+
+ตัวอย่างการใช้งาน:
+    python analysis_service.py --port 8080 --workers 4
+    python load_generator.py --url http://127.0.0.1:8080/bmi --connections 64 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import MethodStats, stats_lines
+from jsonl_batch import analyze_json, encode_result
+
+# path -> ชื่อการวิเคราะห์
+ROUTES = {"/bmi": "bmi", "/heart-rate": "heart_rate", "/symptoms": "symptoms"}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_BYTES = 64 * 1024
+
+
+# ตัววิเคราะห์ของแต่ละ worker (สร้างครั้งเดียวตอนเริ่ม worker)
+_worker_handlers = None
+
+
+def _init_worker(kb_path=None):
+    global _worker_handlers
+    from bmi_calculator import BMICalculator
+    from heart_rate_analyzer import HeartRateAnalyzer
+    from symptom_checker import SymptomChecker
+
+    calculator = BMICalculator()
+    analyzer = HeartRateAnalyzer()
+    checker = SymptomChecker(kb_path)
+    _worker_handlers = {
+        "bmi": lambda records: calculator.analyze_records(records, as_json=True),
+        "heart_rate": lambda records: analyzer.analyze_records(records, as_json=True),
+        "symptoms": lambda records: checker.check_records(records, top_k=3),
+    }
+    # เรียกครั้งแรกล่วงหน้า ให้ numpy และตารางภายในพร้อมก่อนคำขอจริง
+    calculator.analyze_records([{"weight": 70, "height": 170, "age": 30}])
+    analyzer.analyze_records([{"heart_rate": 70, "age": 30}])
+    checker.check_records([{"symptoms": ["ไข้"]}])
+
+
+def _analyze_batch(kind, bodies):
+    """วิเคราะห์ body ของหลายคำขอ (ทำงานใน worker) คืนรายการ (สำเร็จหรือไม่, ข้อความ JSON)"""
+    results = []
+    for _, result in analyze_json(_worker_handlers[kind], bodies):
+        ok, text = encode_result(result)
+        results.append((ok, text if ok else f'{{"error": {text}}}'))
+    return results
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+class MicroBatcher:
+    """รวมคำขอของการวิเคราะห์หนึ่งชนิดที่เข้ามาภายใน window วินาที (หรือครบ max_batch) เป็นงานเดียว"""
+
+    def __init__(self, kind, service, window, max_batch):
+        self.kind = kind
+        self.service = service
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+
+    def submit(self, body):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((body, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self.service._tasks.add(task)
+            task.add_done_callback(self.service._tasks.discard)
+
+    async def _run(self, batch):
+        began = time.perf_counter()
+        failed = False
+        try:
+            results = await self.service.run_analysis(self.kind, [body for body, _ in batch])
+        except Exception as e:
+            failed = True
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        self.service.batch_stats[self.kind].record(time.perf_counter() - began, len(batch), failed)
+
+
+class AnalysisService:
+    """เซิร์ฟเวอร์ HTTP/1.1 ขนาดเล็ก (asyncio streams) ที่ส่งงานวิเคราะห์ให้ process pool
+
+    workers=0: วิเคราะห์ใน event loop เอง (เหมาะกับเครื่องที่มี CPU เดียว ไม่เสียค่าส่งข้อมูลข้ามโปรเซส)
+    """
+
+    def __init__(self, workers=None, batch_window=0.002, max_batch=256, max_pending=10000, kb_path=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.kb_path = kb_path
+        self.pool = None
+        self.pending = 0
+        self.connections = 0
+        self.started = time.time()
+        self.batchers = {kind: MicroBatcher(kind, self, batch_window, max_batch) for kind in ROUTES.values()}
+        self.request_stats = {}
+        self.batch_stats = {kind: MethodStats() for kind in ROUTES.values()}
+        self._tasks = set()
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """เริ่ม worker ทั้งหมด (รอจนพร้อม) แล้วเปิดรับการเชื่อมต่อ"""
+        if self.workers:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.kb_path,))
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.pool, _worker_ready) for _ in range(self.workers)))
+        else:
+            _init_worker(self.kb_path)
+        self._server = await asyncio.start_server(self._handle_connection, host, port,
+                                                  limit=MAX_HEADER_BYTES)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def run_analysis(self, kind, bodies):
+        if self.pool is None:
+            return _analyze_batch(kind, bodies)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, _analyze_batch, kind, bodies)
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, '{"error": "header ใหญ่เกินไป"}', keep_alive=False)
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _handle_request(self, head, reader, writer):
+        """ประมวลผลหนึ่งคำขอ คืน True ถ้าการเชื่อมต่อยังใช้ต่อได้ (keep-alive)"""
+        began = time.perf_counter()
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            await self._respond(writer, 400, '{"error": "request line ไม่ถูกต้อง"}', keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        path, _, query = target.partition("?")
+
+        body = b""
+        if "transfer-encoding" in headers:
+            await self._respond(writer, 411, '{"error": "ต้องระบุ Content-Length"}', keep_alive=False)
+            return False
+        length = headers.get("content-length", "0")
+        if not length.isdigit() or int(length) > MAX_BODY_BYTES:
+            await self._respond(writer, 413, '{"error": "body ใหญ่เกินไป"}', keep_alive=False)
+            return False
+        if int(length):
+            try:
+                body = await reader.readexactly(int(length))
+            except asyncio.IncompleteReadError:
+                return False
+
+        status, content, content_type = await self._route(method, path, query, body)
+        await self._respond(writer, status, content, keep_alive, content_type)
+        endpoint = path if path in ROUTES or path in ("/health", "/metrics") else "other"
+        stats = self.request_stats.get(endpoint)
+        if stats is None:
+            stats = self.request_stats[endpoint] = MethodStats()
+        stats.record(time.perf_counter() - began, len(body), status >= 400)
+        return keep_alive
+
+    async def _route(self, method, path, query, body):
+        """คืน (status, เนื้อหา, content type)"""
+        kind = ROUTES.get(path)
+        if kind is not None:
+            if method != "POST":
+                return 405, '{"error": "ใช้ POST"}', "application/json"
+            if self.pending >= self.max_pending:
+                return 503, '{"error": "งานค้างมากเกินไป ลองใหม่ภายหลัง"}', "application/json"
+            self.pending += 1
+            try:
+                ok, text = await self.batchers[kind].submit(body)
+            except Exception as e:
+                return 500, json.dumps({"error": str(e)}, ensure_ascii=False), "application/json"
+            finally:
+                self.pending -= 1
+            return (200 if ok else 400), text, "application/json"
+        if method != "GET":
+            return 405, '{"error": "ใช้ GET"}', "application/json"
+        if path == "/health":
+            return 200, json.dumps(self.health()), "application/json"
+        if path == "/metrics":
+            if "format=json" in query:
+                return 200, json.dumps(self.metrics(), ensure_ascii=False), "application/json"
+            return 200, self.prometheus(), "text/plain; version=0.0.4"
+        return 404, '{"error": "ไม่พบ endpoint"}', "application/json"
+
+    async def _respond(self, writer, status, content, keep_alive=True, content_type="application/json"):
+        data = content.encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                     f"Content-Type: {content_type}; charset=utf-8\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def health(self):
+        return {"status": "ok", "uptime": time.time() - self.started, "workers": self.workers,
+                "pending": self.pending, "connections": self.connections}
+
+    def metrics(self):
+        return {
+            "requests": {endpoint: stats.to_dict() for endpoint, stats in self.request_stats.items()},
+            "batches": {kind: stats.to_dict() for kind, stats in self.batch_stats.items() if stats.calls},
+            "pending": self.pending,
+            "connections": self.connections
+        }
+
+    def prometheus(self):
+        """สถิติของบริการแบบ Prometheus: คำขอต่อ endpoint (input_size = ไบต์ของ body)
+        และกลุ่มย่อยต่อการวิเคราะห์ (input_size = จำนวนคำขอในกลุ่ม)"""
+        data = self.metrics()
+        lines = stats_lines("service_request", data["requests"], label="endpoint", what="HTTP endpoint")
+        lines += stats_lines("service_batch", data["batches"], label="analysis", what="analysis micro-batch")
+        lines += ["# TYPE service_pending_requests gauge", f"service_pending_requests {self.pending}",
+                  "# TYPE service_open_connections gauge", f"service_open_connections {self.connections}"]
+        return "\n".join(lines) + "\n"
+
+
+async def serve(host, port, **options):
+    service = AnalysisService(**options)
+    await service.start(host, port)
+    print(f"🩺 บริการวิเคราะห์พร้อมที่ http://{host}:{port} (worker {service.workers}, "
+          f"รวมคำขอทุก {service.batch_window * 1000:g} ms สูงสุด {service.max_batch} รายการ)", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+    await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="บริการวิเคราะห์ BMI อัตราการเต้นหัวใจ และอาการผ่าน HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="จำนวน worker process (0 = วิเคราะห์ใน event loop)")
+    parser.add_argument("--batch-window", type=float, default=0.002, help="ช่วงเวลารวมคำขอเป็นกลุ่ม (วินาที)")
+    parser.add_argument("--max-batch", type=int, default=256, help="จำนวนคำขอสูงสุดต่อกลุ่ม")
+    parser.add_argument("--max-pending", type=int, default=10000, help="งานค้างสูงสุดก่อนตอบ 503")
+    parser.add_argument("--kb", help="ไฟล์ฐานข้อมูล .skb ของ /symptoms")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, workers=args.workers, batch_window=args.batch_window,
+                      max_batch=args.max_batch, max_pending=args.max_pending, kb_path=args.kb))
+
+if __name__ == "__main__":
+    main()
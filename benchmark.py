@@ -0,0 +1,340 @@
+"""
+ชุดวัดประสิทธิภาพ (Benchmark Suite) ของจุดที่ทำงานหนักของทุกโปรแกรมวิเคราะห์
+
+แต่ละรายการสร้างข้อมูลจำลองตามขนาดที่กำหนด (จำนวนโรคในฐานข้อมูล, จำนวนคำถามต่อ batch,
+จำนวนประชากร, ความยาวข้อมูลอัตราการเต้นหัวใจ) แล้ววัดที่หลายขนาดเพื่อดูเส้นโค้งการขยายตัว:
+    - เวลาต่อการเรียกหนึ่งครั้ง (p50/p95/p99) และปริมาณงานต่อวินาที (throughput)
+    - หน่วยความจำสูงสุดระหว่างเรียก (tracemalloc วัดแยกรอบ ไม่ปนกับการจับเวลา)
+    - เลขชี้กำลังของการขยายตัว (ความชันของ log เวลา กับ log ขนาด: 1 = เชิงเส้น)
+
+ผลบันทึกเป็น JSON ได้ และเทียบกับผลเดิม (baseline) ได้ โดยคืน exit code 1 เมื่อช้าลง
+หรือใช้หน่วยความจำมากขึ้นเกินเกณฑ์
+
+วิธีใช้:
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.25
+    python benchmark.py --quick --filter heart_rate
+"""
+
+import argparse
+import fnmatch
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from bmi_calculator import BMICalculator
+from bmi_cohort import analyze_health_parallel
+from heart_rate_analyzer import HeartRateAnalyzer
+from symptom_checker import SymptomChecker
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+
+# ตัวชี้วัดที่ใช้ตัดสินว่าช้าลง/ใช้หน่วยความจำมากขึ้น เมื่อเทียบกับ baseline
+REGRESSION_METRICS = ("p50_ms", "peak_memory_bytes")
+
+# หน่วยความจำที่เปลี่ยนน้อยกว่านี้ (ไบต์) ไม่นับเป็นการถดถอย (สัญญาณรบกวนของตัวจัดสรรหน่วยความจำ)
+_MEMORY_NOISE_BYTES = 64 * 1024
+
+
+def synthetic_symptom_workload(n_diseases, n_queries, rng):
+    """ฐานข้อมูลโรคและคำถามจำลองจาก SyntheticKnowledgeBase (ตัวสร้างเดียวกับข้อมูลทดสอบโหลด)
+
+    คืน (ข้อมูลโรคแบบ SymptomChecker.diseases, รายการชุดอาการ n_queries ชุด)
+    """
+    kb = SyntheticKnowledgeBase(n_diseases, seed=int(rng.integers(1 << 31)))
+    queries, _ = kb.queries(n_queries, seed=int(rng.integers(1 << 31)))
+    return kb.to_diseases(), queries
+
+
+def synthetic_cohort(n, rng):
+    """น้ำหนัก (กก.) ส่วนสูง (ซม.) อายุ ของประชากรจำลอง n คน"""
+    weights = rng.normal(65, 15, n).clip(30, 200)
+    heights = rng.normal(165, 10, n).clip(120, 210)
+    ages = rng.integers(5, 90, n)
+    return weights, heights, ages
+
+
+# ---------------------------------------------------------------------------
+# รายการวัด: แต่ละฟังก์ชันรับ (ขนาด, rng) คืน (ฟังก์ชันที่จะจับเวลา, จำนวนงานต่อการเรียกหนึ่งครั้ง)
+# การเตรียมข้อมูลทำก่อนจับเวลาทั้งหมด
+# ---------------------------------------------------------------------------
+
+def _bench_check_symptoms(n_diseases, rng):
+    diseases, queries = synthetic_symptom_workload(n_diseases, 256, rng)
+    checker = SymptomChecker(diseases)
+    position = [0]
+
+    def call():
+        position[0] = (position[0] + 1) % len(queries)
+        checker.check_symptoms(queries[position[0]], top_k=3)
+    return call, 1
+
+
+def _bench_check_symptoms_batch(batch_size, rng):
+    diseases, queries = synthetic_symptom_workload(1000, batch_size, rng)
+    checker = SymptomChecker(diseases)
+    return lambda: checker.check_symptoms_batch(queries, top_k=3), batch_size
+
+
+def _bench_analyze_health(cohort_size, rng):
+    calculator = BMICalculator()
+    rows = list(zip(*(column.tolist() for column in synthetic_cohort(cohort_size, rng))))
+
+    def call():
+        for weight, height, age in rows:
+            calculator.analyze_health(weight, height, age, "ชาย")
+    return call, cohort_size
+
+
+def _bench_analyze_health_arrays(cohort_size, rng):
+    calculator = BMICalculator()
+    weights, heights, _ = synthetic_cohort(cohort_size, rng)
+    return lambda: calculator.analyze_health_arrays(weights, heights), cohort_size
+
+
+def _bench_analyze_health_parallel(workers, rng):
+    # ขนาดข้อมูลคงที่ 2 ล้านแถว วัดตามจำนวน worker (เลขชี้กำลัง -1 = เร็วขึ้นเชิงเส้นตามจำนวน worker)
+    weights, heights, _ = synthetic_cohort(2000000, rng)
+    return lambda: analyze_health_parallel(weights, heights, workers=workers), len(weights)
+
+
+def _bench_analyze_heart_rate(trace_length, rng):
+    analyzer = HeartRateAnalyzer()
+    heart_rates = rng.integers(45, 190, trace_length).tolist()
+    ages = rng.integers(5, 90, trace_length).tolist()
+
+    def call():
+        for heart_rate, age in zip(heart_rates, ages):
+            analyzer.analyze_heart_rate(heart_rate, age)
+    return call, trace_length
+
+
+def _bench_analyze_heart_rate_arrays(trace_length, rng):
+    analyzer = HeartRateAnalyzer()
+    heart_rates = rng.integers(45, 190, trace_length)
+    ages = rng.integers(5, 90, trace_length)
+    return lambda: analyzer.analyze_heart_rate_arrays(heart_rates, ages), trace_length
+
+
+def _bench_generate_sample_data(duration_hours, rng):
+    analyzer = HeartRateAnalyzer()
+    random.seed(int(rng.integers(1 << 31)))
+    return lambda: analyzer.generate_sample_data(duration_hours), duration_hours * 4
+
+
+def _bench_generate_sample_data_arrays(duration_hours, rng):
+    analyzer = HeartRateAnalyzer()
+    seed = int(rng.integers(1 << 31))
+    return (lambda: analyzer.generate_sample_data_arrays(duration_hours, resolution_seconds=1, seed=seed),
+            duration_hours * 3600)
+
+
+def _bench_render_bmi_chart(_, rng):
+    calculator = BMICalculator()
+    bmis = rng.uniform(15, 40, 64).round(1)
+    position = [0]
+
+    def call():
+        position[0] = (position[0] + 1) % len(bmis)
+        bmi = float(bmis[position[0]])
+        calculator.render_bmi_chart(bmi, calculator.get_bmi_category(bmi))
+    return call, 1
+
+
+def _bench_render_heart_rate_trend(trace_length, rng):
+    analyzer = HeartRateAnalyzer()
+    start = datetime(2024, 1, 1)
+    times = np.datetime64(start) + np.arange(trace_length).astype("timedelta64[s]")
+    heart_rates = rng.integers(50, 160, trace_length).astype(np.float64)
+    return lambda: analyzer.render_heart_rate_trend(times, heart_rates, 35), trace_length
+
+
+def _bench_render_heart_rate_zones_chart(_, rng):
+    analyzer = HeartRateAnalyzer()
+    ages = rng.integers(10, 80, 64)
+    position = [0]
+
+    def call():
+        position[0] = (position[0] + 1) % len(ages)
+        analyzer.render_heart_rate_zones_chart(int(ages[position[0]]))
+    return call, 1
+
+
+# (ชื่อ, ชื่อพารามิเตอร์ขนาด, ขนาดที่วัด, ฟังก์ชันเตรียมงาน)
+BENCHMARKS = [
+    ("symptom.check_symptoms", "kb_diseases", (100, 1000, 10000), _bench_check_symptoms),
+    ("symptom.check_symptoms_batch", "batch_size", (100, 1000, 10000), _bench_check_symptoms_batch),
+    ("bmi.analyze_health", "cohort_size", (1000, 10000, 100000), _bench_analyze_health),
+    ("bmi.analyze_health_arrays", "cohort_size", (10000, 100000, 1000000), _bench_analyze_health_arrays),
+    ("bmi.analyze_health_parallel", "workers", (1, 2, 4, 8), _bench_analyze_health_parallel),
+    ("heart_rate.analyze_heart_rate", "trace_length", (1000, 10000, 100000), _bench_analyze_heart_rate),
+    ("heart_rate.analyze_heart_rate_arrays", "trace_length", (10000, 100000, 1000000),
+     _bench_analyze_heart_rate_arrays),
+    ("heart_rate.generate_sample_data", "duration_hours", (24, 240, 2400), _bench_generate_sample_data),
+    ("heart_rate.generate_sample_data_arrays", "duration_hours", (1, 24, 168),
+     _bench_generate_sample_data_arrays),
+    ("chart.render_bmi_chart", "charts", (1,), _bench_render_bmi_chart),
+    ("chart.render_heart_rate_trend", "trace_length", (1000, 86400, 604800), _bench_render_heart_rate_trend),
+    ("chart.render_heart_rate_zones_chart", "charts", (1,), _bench_render_heart_rate_zones_chart),
+]
+
+
+def _percentile(sorted_values, q):
+    """เปอร์เซ็นไทล์แบบ interpolate เชิงเส้นของรายการที่เรียงแล้ว"""
+    position = (len(sorted_values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def measure(call, items=1, min_time=0.5, min_calls=3, max_calls=1000):
+    """จับเวลา call ซ้ำจนครบ min_time วินาที (อย่างน้อย min_calls ครั้ง) แล้ววัดหน่วยความจำสูงสุดอีกหนึ่งรอบ
+
+    คืน dict: calls, p50_ms, p95_ms, p99_ms, mean_ms, throughput (งาน/วินาที), peak_memory_bytes
+    """
+    call()   # อุ่นเครื่อง (แคช, import ภายในเมธอด, รูปต้นแบบของกราฟ)
+    durations = []
+    deadline = time.perf_counter() + min_time
+    while len(durations) < max_calls and (len(durations) < min_calls or time.perf_counter() < deadline):
+        began = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - began)
+    durations.sort()
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        call()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    p50 = _percentile(durations, 50)
+    return {
+        "calls": len(durations),
+        "p50_ms": p50 * 1000,
+        "p95_ms": _percentile(durations, 95) * 1000,
+        "p99_ms": _percentile(durations, 99) * 1000,
+        "mean_ms": sum(durations) / len(durations) * 1000,
+        "throughput": items / p50 if p50 > 0 else math.inf,
+        "peak_memory_bytes": max(peak, 0)
+    }
+
+
+def scaling_exponent(scales, times):
+    """ความชันของ log(เวลา) เทียบ log(ขนาด) ด้วย least squares (None ถ้ามีขนาดเดียว)"""
+    if len(scales) < 2:
+        return None
+    slope, _ = np.polyfit(np.log(scales), np.log(times), 1)
+    return float(slope)
+
+
+def run_benchmarks(pattern="*", quick=False, min_time=0.5, seed=0):
+    """วัดทุกรายการที่ชื่อตรงกับ pattern (fnmatch) คืนผลเป็น dict ที่บันทึกเป็น JSON ได้
+
+    quick=True: วัดเฉพาะสองขนาดแรกของแต่ละรายการ
+    """
+    results = []
+    scaling = {}
+    for name, parameter, scales, setup in BENCHMARKS:
+        if not fnmatch.fnmatch(name, pattern) and pattern not in name:
+            continue
+        if quick:
+            scales = scales[:2]
+        for scale in scales:
+            call, items = setup(scale, np.random.default_rng([seed, scale]))
+            result = measure(call, items, min_time=min_time)
+            result.update(benchmark=name, parameter=parameter, scale=scale, items=items)
+            results.append(result)
+            print(f"  {name:42} {parameter}={scale:<8} p50 {result['p50_ms']:10.3f} ms  "
+                  f"p99 {result['p99_ms']:10.3f} ms  {result['throughput']:14,.0f} /s  "
+                  f"{result['peak_memory_bytes'] / 1e6:8.2f} MB", flush=True)
+        measured = [r for r in results if r["benchmark"] == name]
+        exponent = scaling_exponent([r["scale"] for r in measured], [r["p50_ms"] for r in measured])
+        if exponent is not None:
+            scaling[name] = exponent
+            print(f"  {name:42} เวลาขยายตัว ~ {parameter}^{exponent:.2f}")
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "seed": seed
+        },
+        "results": results,
+        "scaling": scaling
+    }
+
+
+def compare(current, baseline, threshold=0.25):
+    """เทียบผลกับ baseline คืนรายการ (ชื่อ, ขนาด, ตัวชี้วัด, ค่าเดิม, ค่าใหม่, อัตราส่วน) ที่แย่ลงเกิน threshold
+
+    เทียบเฉพาะรายการและขนาดที่มีทั้งสองฝั่ง
+    """
+    previous = {(r["benchmark"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get((result["benchmark"], result["scale"]))
+        if old is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            before, after = old[metric], result[metric]
+            if metric == "peak_memory_bytes" and after - before < _MEMORY_NOISE_BYTES:
+                continue
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append((result["benchmark"], result["scale"], metric, before, after, after / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="วัดประสิทธิภาพของโปรแกรมวิเคราะห์ที่หลายขนาดข้อมูล")
+    parser.add_argument("--filter", default="*", help="เลือกรายการตามชื่อ (fnmatch หรือส่วนของชื่อ)")
+    parser.add_argument("--quick", action="store_true", help="วัดเฉพาะสองขนาดแรกของแต่ละรายการ")
+    parser.add_argument("--min-time", type=float, default=0.5, help="เวลาวัดขั้นต่ำต่อขนาด (วินาที)")
+    parser.add_argument("--seed", type=int, default=0, help="seed ของข้อมูลจำลอง")
+    parser.add_argument("--output", help="บันทึกผลเป็น JSON")
+    parser.add_argument("--baseline", help="ไฟล์ JSON ของผลเดิมที่ใช้เทียบ")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="สัดส่วนที่ยอมให้แย่ลงได้ก่อนนับเป็นการถดถอย (0.25 = 25%%)")
+    parser.add_argument("--list", action="store_true", help="แสดงรายการที่วัดได้แล้วออก")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, parameter, scales, _ in BENCHMARKS:
+            print(f"{name:42} {parameter}: {', '.join(map(str, scales))}")
+        return 0
+
+    print("⏱️ วัดประสิทธิภาพ")
+    current = run_benchmarks(args.filter, args.quick, args.min_time, args.seed)
+    if not current["results"]:
+        print(f"❌ ไม่มีรายการที่ตรงกับ {args.filter!r}")
+        return 2
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"💾 บันทึกผลที่ {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ แย่ลงเกิน {args.threshold:.0%} เมื่อเทียบกับ {args.baseline}:")
+            for name, scale, metric, before, after, ratio in regressions:
+                print(f"   {name} (ขนาด {scale}) {metric}: {before:,.3f} -> {after:,.3f} (x{ratio:.2f})")
+            return 1
+        print(f"\n✅ ไม่มีรายการที่แย่ลงเกิน {args.threshold:.0%} เมื่อเทียบกับ {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
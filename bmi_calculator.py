@@ -3,8 +3,123 @@
 ตัวอย่าง AI ทางการแพทย์อย่างง่ายสำหรับนักเรียนมัธยม
 """
 
-import matplotlib.pyplot as plt
-import numpy as np
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# numpy และ matplotlib นำเข้าเฉพาะในเมธอดที่ใช้ (การคำนวณทีละคนจึงเริ่มทำงานได้ทันที)
+
+# ความเสี่ยงต่อโรคตามหมวดหมู่ (ใช้ร่วมกันทุกผลลัพธ์)
+OBESITY_RISKS = (
+    "โรคเบาหวานประเภท 2",
+    "โรคหัวใจและหลอดเลือด",
+    "ความดันโลหิตสูง",
+    "โรคไขมันในเลือดสูง",
+    "โรคข้อเข่าเสื่อม"
+)
+UNDERWEIGHT_RISKS = (
+    "ภูมิต้านทานต่ำ",
+    "โรคกระดูกพรุน",
+    "ขาดสารอาหาร",
+    "การเจริญเติบโตผิดปกติ"
+)
+
+# ตารางที่ผลลัพธ์ทุกตัวของ BMICalculator เดียวกันอ้างถึง (ดัชนี = รหัสหมวดหมู่)
+ResultTables = namedtuple("ResultTables", ["names", "risks", "advice"])
+
+
+class HealthResult(Mapping):
+    """ผลการวิเคราะห์หนึ่งคนแบบประหยัดหน่วยความจำ
+    
+    เก็บเฉพาะตัวเลขและรหัสหมวดหมู่ ส่วนชื่อหมวดหมู่ ความเสี่ยง และคำแนะนำอ้างถึงตารางที่ใช้ร่วมกันและแก้ไขไม่ได้
+    (แอตทริบิวต์ .health_risks / .advice เป็น tuple / mapping ที่ใช้ร่วมกัน)
+    
+    เป็น Mapping ที่ใช้แทน dict เดิมได้: result["health_risks"], get(), items(), == dict
+    การอ่านแบบ dict ได้ list / dict สำเนาใหม่เหมือนเดิม แต่ไม่ใช่ dict จริง
+    (isinstance(result, dict) เป็นเท็จ และ json.dumps ต้องใช้ to_dict())
+    """
+    __slots__ = ("bmi", "category_code", "ideal_weight", "weight_diff", "_tables")
+    
+    _FIELDS = ("bmi", "category", "ideal_weight", "weight_diff", "health_risks", "advice")
+    
+    def __init__(self, bmi, category_code, ideal_weight, weight_diff, tables):
+        self.bmi = bmi
+        self.category_code = category_code
+        self.ideal_weight = ideal_weight
+        self.weight_diff = weight_diff
+        self._tables = tables
+    
+    @property
+    def category(self):
+        return self._tables.names[self.category_code]
+    
+    @property
+    def health_risks(self):
+        return self._tables.risks[self.category_code]
+    
+    @property
+    def advice(self):
+        return self._tables.advice[self.category_code]
+    
+    def __getitem__(self, key):
+        if key == "health_risks":
+            return list(self.health_risks)
+        if key == "advice":
+            advice = self.advice
+            return {"advice": advice["advice"], "recommendations": list(advice["recommendations"])}
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self):
+        return iter(self._FIELDS)
+    
+    def __len__(self):
+        return len(self._FIELDS)
+    
+    def to_dict(self):
+        """แปลงเป็น dict รูปแบบเดิมของ analyze_health (สำเนาใหม่ แก้ไขได้โดยไม่กระทบตารางที่ใช้ร่วมกัน)"""
+        return {key: self[key] for key in self._FIELDS}
+    
+    def __repr__(self):
+        return (f"HealthResult(bmi={self.bmi}, category={self.category!r}, "
+                f"ideal_weight={self.ideal_weight}, weight_diff={self.weight_diff})")
+
+
+class HealthResults:
+    """ผลการวิเคราะห์หลายคนแบบ struct-of-arrays (ประมาณ 25 ไบต์ต่อคน)
+    
+    results[i] ได้ HealthResult ของคนที่ i และ to_dicts() ได้รายการ dict รูปแบบเดิม
+    """
+    
+    def __init__(self, bmi, category_code, ideal_weight, weight_diff, tables):
+        self.bmi = bmi
+        self.category_code = category_code
+        self.ideal_weight = ideal_weight
+        self.weight_diff = weight_diff
+        self._tables = tables
+    
+    @property
+    def category_names(self):
+        return self._tables.names
+    
+    def __len__(self):
+        return len(self.bmi)
+    
+    def __getitem__(self, i):
+        return HealthResult(float(self.bmi[i]), int(self.category_code[i]), float(self.ideal_weight[i]),
+                            float(self.weight_diff[i]), self._tables)
+    
+    def __iter__(self):
+        tables = self._tables
+        for values in zip(self.bmi.tolist(), self.category_code.tolist(),
+                          self.ideal_weight.tolist(), self.weight_diff.tolist()):
+            yield HealthResult(*values, tables)
+    
+    def to_dicts(self):
+        """แปลงเป็นรายการ dict รูปแบบเดิมของ analyze_health"""
+        return [result.to_dict() for result in self]
 
 class BMICalculator:
     def __init__(self):
@@ -102,44 +217,197 @@ class BMICalculator:
         ideal_weight = 22 * (height_m ** 2)
         return round(ideal_weight, 1)
     
-    def analyze_health(self, weight, height, age, gender):
-        """วิเคราะห์สุขภาพโดยรวม"""
-        bmi = self.calculate_bmi(weight, height)
-        category = self.get_bmi_category(bmi)
-        ideal_weight = self.calculate_ideal_weight(height)
-        weight_diff = weight - ideal_weight
+    def category_names(self):
+        """รายชื่อหมวดหมู่ BMI ตามรหัส (รหัสหมวดหมู่ = ลำดับใน self.bmi_categories)"""
+        return list(self.bmi_categories.keys())
+    
+    def _round1(self, values):
+        """ปัดทศนิยม 1 ตำแหน่งแบบเดียวกับ round(x, 1) ของ Python ทุกค่า"""
+        import numpy as np
         
-        # ข้อมูลเพิ่มเติมตามเพศและอายุ
-        health_risks = []
-        if category in ["อ้วนระดับ 1", "อ้วนระดับ 2", "อ้วนระดับ 3"]:
-            health_risks = [
-                "โรคเบาหวานประเภท 2",
-                "โรคหัวใจและหลอดเลือด",
-                "ความดันโลหิตสูง",
-                "โรคไขมันในเลือดสูง",
-                "โรคข้อเข่าเสื่อม"
-            ]
-        elif category == "น้ำหนักน้อยกว่าเกณฑ์":
-            health_risks = [
-                "ภูมิต้านทานต่ำ",
-                "โรคกระดูกพรุน",
-                "ขาดสารอาหาร",
-                "การเจริญเติบโตผิดปกติ"
-            ]
+        scaled = values * 10
+        rounded = np.round(scaled) / 10
+        # np.round อาจต่างจาก round() ของ Python เฉพาะค่าที่อยู่กึ่งกลางพอดี (x.x5) จึงคำนวณค่ากลุ่มนี้ซ้ำ
+        frac = scaled - np.floor(scaled)
+        ambiguous = np.flatnonzero(np.abs(frac - 0.5) <= 1e-9 * np.maximum(1, np.abs(scaled)))
+        if ambiguous.size:
+            rounded[ambiguous] = [round(v, 1) for v in values[ambiguous].tolist()]
+        return rounded
+    
+    def calculate_bmi_array(self, weights, heights):
+        """คำนวณค่า BMI ของข้อมูลหลายคนพร้อมกัน (NumPy array)
+        
+        ส่วนสูงเป็น 0 หรือค่าสุดโต่งที่เกินช่วงของ float จะได้ inf/nan แทนการเกิด ZeroDivisionError/คำเตือน
+        """
+        import numpy as np
+        
+        weights = np.asarray(weights, dtype=np.float64)
+        heights_m = np.asarray(heights, dtype=np.float64) / 100
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return self._round1(weights / (heights_m ** 2))
+    
+    def get_bmi_category_codes(self, bmis):
+        """หารหัสหมวดหมู่ BMI ของหลายค่าพร้อมกัน ด้วย binary search บนขอบเขตของแต่ละหมวด
+        
+        คืน array ของ int8 (แปลงเป็นชื่อด้วย category_names()) ผลเหมือน get_bmi_category
+        """
+        import numpy as np
+        
+        bmis = np.asarray(bmis, dtype=np.float64)
+        names = self.category_names()
+        mins = np.array([self.bmi_categories[c]["min"] for c in names], dtype=np.float64)
+        maxs = np.array([self.bmi_categories[c]["max"] for c in names], dtype=np.float64)
         
+        # หมวดแรกที่ค่า max มากกว่า bmi และต้องมี min <= bmi ด้วย (ขอบ max ไม่รวมในหมวด)
+        codes = np.searchsorted(maxs, bmis, side="right")
+        in_range = codes < len(names)
+        in_range[in_range] = mins[codes[in_range]] <= bmis[in_range]
+        codes[~in_range] = names.index("อ้วนระดับ 3")  # สำหรับกรณี BMI > 40
+        return codes.astype(np.int8)
+    
+    def calculate_ideal_weight_array(self, heights):
+        """คำนวณน้ำหนักที่เหมาะสมของหลายคนพร้อมกัน"""
+        import numpy as np
+        
+        heights_m = np.asarray(heights, dtype=np.float64) / 100
+        with np.errstate(invalid="ignore", over="ignore"):
+            return self._round1(22 * (heights_m ** 2))
+    
+    def analyze_health_arrays(self, weights, heights):
+        """วิเคราะห์ข้อมูลหลายคนพร้อมกัน คืน dict ของ array: bmi, category_code, ideal_weight, weight_diff
+        
+        ค่าเหมือนกับ analyze_health ทีละคน (ชื่อหมวดหมู่ได้จาก category_names()[category_code])
+        """
+        import numpy as np
+        
+        weights = np.asarray(weights, dtype=np.float64)
+        bmi = self.calculate_bmi_array(weights, heights)
+        ideal_weight = self.calculate_ideal_weight_array(heights)
+        with np.errstate(invalid="ignore"):
+            weight_diff = weights - ideal_weight
         return {
             "bmi": bmi,
-            "category": category,
+            "category_code": self.get_bmi_category_codes(bmi),
             "ideal_weight": ideal_weight,
-            "weight_diff": weight_diff,
-            "health_risks": health_risks,
-            "advice": self.health_advice[category]
+            "weight_diff": weight_diff
         }
     
-    def create_bmi_chart(self, bmi, category):
-        """สร้างกราฟแสดงตำแหน่ง BMI"""
-        fig, ax = plt.subplots(figsize=(12, 6))
+    def get_health_risks(self, category):
+        """ความเสี่ยงต่อโรคตามหมวดหมู่ BMI (tuple ที่ใช้ร่วมกัน แก้ไขไม่ได้)"""
+        if category in ["อ้วนระดับ 1", "อ้วนระดับ 2", "อ้วนระดับ 3"]:
+            return OBESITY_RISKS
+        elif category == "น้ำหนักน้อยกว่าเกณฑ์":
+            return UNDERWEIGHT_RISKS
+        return ()
+    
+    def _result_tables(self):
+        """ตารางชื่อหมวดหมู่/ความเสี่ยง/คำแนะนำแบบแก้ไขไม่ได้ตามรหัสหมวดหมู่ (สร้างครั้งเดียว ใช้ร่วมทุกผลลัพธ์)"""
+        tables = getattr(self, "_tables", None)
+        if tables is None:
+            names = tuple(self.category_names())
+            tables = self._tables = ResultTables(
+                names,
+                tuple(self.get_health_risks(name) for name in names),
+                tuple(MappingProxyType({
+                    "advice": self.health_advice[name]["advice"],
+                    "recommendations": tuple(self.health_advice[name]["recommendations"])
+                }) for name in names)
+            )
+        return tables
+    
+    def analyze_health(self, weight, height, age, gender):
+        """วิเคราะห์สุขภาพโดยรวม
+        
+        คืน HealthResult (Mapping ที่อ่านแบบ dict ได้ เช่น result["bmi"], result.get("advice"))
+        ใช้ .to_dict() หากต้องการ dict จริง (เช่นสำหรับ json.dumps หรือ isinstance(..., dict))
+        """
+        bmi = self.calculate_bmi(weight, height)
+        tables = self._result_tables()
+        category_code = tables.names.index(self.get_bmi_category(bmi))
+        ideal_weight = self.calculate_ideal_weight(height)
+        weight_diff = weight - ideal_weight
+        
+        return HealthResult(bmi, category_code, ideal_weight, weight_diff, tables)
+    
+    def analyze_health_bulk(self, weights, heights):
+        """วิเคราะห์ข้อมูลหลายคนพร้อมกัน คืน HealthResults (เก็บผลเป็น array แยกตามคอลัมน์)"""
+        result = self.analyze_health_arrays(weights, heights)
+        return HealthResults(result["bmi"], result["category_code"], result["ideal_weight"],
+                             result["weight_diff"], self._result_tables())
+    
+    def analyze_records(self, records, as_json=False):
+        """วิเคราะห์คำขอหลายรายการ (dict ที่มี weight, height, age และ gender เช่นจากโหมด batch)
         
+        คืนรายการผล (dict รูปแบบเดียวกับ analyze_health) หรือ RecordError ของรายการที่ข้อมูลไม่ถูกต้อง
+        รายการที่ถูกต้องทั้งหมดวิเคราะห์พร้อมกันด้วย analyze_health_bulk
+        ค่าสุดโต่งที่ทำให้ผลเกินช่วงของ float (inf/nan) ได้ RecordError เช่นกัน
+        as_json=True: คืนผลเป็นข้อความ JSON (RawJSON) ประกอบจากส่วนของแต่ละหมวดหมู่ที่เข้ารหัสไว้แล้ว
+        """
+        import json
+        
+        import numpy as np
+        
+        from jsonl_batch import RawJSON, RecordError, number_field
+        
+        outputs = [None] * len(records)
+        valid, weights, heights = [], [], []
+        for i, record in enumerate(records):
+            try:
+                weight = number_field(record, "weight")
+                height = number_field(record, "height")
+                number_field(record, "age", integer=True)
+                if not isinstance(record.get("gender", ""), str):
+                    raise RecordError("gender ต้องเป็นข้อความ")
+            except RecordError as e:
+                outputs[i] = e
+                continue
+            valid.append(i)
+            weights.append(weight)
+            heights.append(height)
+        
+        if not valid:
+            return outputs
+        results = self.analyze_health_bulk(weights, heights)
+        finite = np.isfinite(results.bmi) & np.isfinite(results.ideal_weight) & np.isfinite(results.weight_diff)
+        if not finite.all():
+            for i in np.flatnonzero(~finite).tolist():
+                outputs[valid[i]] = RecordError("weight และ height ต้องอยู่ในช่วงที่คำนวณ BMI ได้")
+            keep = np.flatnonzero(finite)
+            results = HealthResults(results.bmi[keep], results.category_code[keep], results.ideal_weight[keep],
+                                    results.weight_diff[keep], results._tables)
+            valid = [valid[i] for i in keep.tolist()]
+        if not as_json:
+            for i, result in zip(valid, results):
+                outputs[i] = result.to_dict()
+            return outputs
+        
+        fragments = self._json_fragments()
+        encode = json.JSONEncoder(allow_nan=False).encode
+        for i, bmi, code, ideal_weight, weight_diff in zip(valid, results.bmi.tolist(), results.category_code.tolist(),
+                                                            results.ideal_weight.tolist(), results.weight_diff.tolist()):
+            name, rest = fragments[code]
+            outputs[i] = RawJSON(f'{{"bmi": {encode(bmi)}, "category": {name}, '
+                                 f'"ideal_weight": {encode(ideal_weight)}, "weight_diff": {encode(weight_diff)}, {rest}}}')
+        return outputs
+    
+    def _json_fragments(self):
+        """ส่วนของผลที่เข้ารหัสเป็น JSON แล้วตามรหัสหมวดหมู่: (ชื่อหมวดหมู่, "health_risks": ..., "advice": ...)"""
+        import json
+        
+        fragments = getattr(self, "_json_fragments_cache", None)
+        if fragments is None:
+            tables = self._result_tables()
+            fragments = self._json_fragments_cache = [
+                (json.dumps(name, ensure_ascii=False),
+                 json.dumps({"health_risks": list(risks),
+                             "advice": {"advice": advice["advice"],
+                                        "recommendations": list(advice["recommendations"])}},
+                            ensure_ascii=False)[1:-1])
+                for name, risks, advice in zip(tables.names, tables.risks, tables.advice)]
+        return fragments
+    
+    def _draw_bmi_chart(self, ax, bmi, category):
+        """วาดกราฟตำแหน่ง BMI ลงบน ax คืน (จุด BMI, ข้อความกำกับ, legend) สำหรับปรับค่าภายหลัง"""
         # สร้างแถบสี BMI
         categories = list(self.bmi_categories.keys())
         ranges = [self.bmi_categories[cat]["max"] for cat in categories[:-1]] + [45]
@@ -153,8 +421,8 @@ class BMICalculator:
             prev_val = next_val
         
         # ทำเครื่องหมายตำแหน่ง BMI ของผู้ใช้
-        ax.plot(bmi, 0, 'ro', markersize=15, label=f'BMI ของคุณ: {bmi}')
-        ax.annotate(f'BMI: {bmi}\n{category}', xy=(bmi, 0), xytext=(bmi, 0.3),
+        marker, = ax.plot(bmi, 0, 'ro', markersize=15, label=f'BMI ของคุณ: {bmi}')
+        annotation = ax.annotate(f'BMI: {bmi}\n{category}', xy=(bmi, 0), xytext=(bmi, 0.3),
                    ha='center', va='bottom', fontsize=12, fontweight='bold',
                    arrowprops=dict(arrowstyle='->', color='red', lw=2))
         
@@ -162,14 +430,53 @@ class BMICalculator:
         ax.set_ylim(-0.5, 0.8)
         ax.set_xlabel('ค่า BMI', fontsize=12)
         ax.set_title('ตำแหน่งค่า BMI ของคุณ', fontsize=14, fontweight='bold')
-        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        legend = ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
         ax.grid(True, alpha=0.3)
         
         # ซ่อนแกน Y
         ax.set_yticks([])
+        return marker, annotation, legend
+    
+    def create_bmi_chart(self, bmi, category):
+        """สร้างกราฟแสดงตำแหน่ง BMI"""
+        import matplotlib.pyplot as plt
+        
+        fig, ax = plt.subplots(figsize=(12, 6))
+        self._draw_bmi_chart(ax, bmi, category)
         
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
+    
+    def render_bmi_chart(self, bmi, category, path=None, format=None):
+        """วาดกราฟตำแหน่ง BMI โดยไม่ต้องมีหน้าจอ (สำหรับเซิร์ฟเวอร์ออกรายงาน)
+        
+        คืนข้อมูลรูปเป็น bytes (format: "png" หรือ "svg") หรือบันทึกลง path แล้วคืน path
+        ใช้รูปต้นแบบที่วาดแถบสีไว้แล้วซ้ำทุกครั้ง เปลี่ยนเฉพาะจุด BMI และข้อความกำกับ
+        """
+        template = getattr(self, "_bmi_chart_template", None)
+        if template is None:
+            from matplotlib.figure import Figure
+            
+            from chart_rendering import ChartTemplate
+            
+            fig = Figure(figsize=(12, 6))
+            ax = fig.add_subplot()
+            marker, annotation, legend = self._draw_bmi_chart(ax, bmi, category)
+            fig.tight_layout()
+            # ข้อความใน legend ของจุด BMI (รายการอื่นเป็นแถบสีที่ไม่เปลี่ยน)
+            label = next(text for text in legend.get_texts() if text.get_text() == marker.get_label())
+            template = self._bmi_chart_template = (
+                ChartTemplate(fig, dynamic_artists=(marker, annotation, legend)),
+                marker, annotation, label)
+        chart, marker, annotation, label = template
+        
+        marker.set_data([bmi], [0])
+        label.set_text(f'BMI ของคุณ: {bmi}')
+        annotation.xy = (bmi, 0)
+        annotation.set_position((bmi, 0.3))
+        annotation.set_text(f'BMI: {bmi}\n{category}')
+        return chart.render(path, format)
 
 def main():
     print("\n🏥 เครื่องคำนวณดัชนีมวลกาย (BMI Calculator)")
@@ -242,5 +549,18 @@ def main():
     except Exception as e:
         print(f"❌ เกิดข้อผิดพลาด: {e}")
 
+def batch_main(argv=None):
+    """โหมด batch: อ่านคำขอ JSONL ({"weight": 70, "height": 170, "age": 30, "gender": "ชาย"})
+    แล้วเขียนผลของ analyze_health เป็น JSONL (ดู jsonl_batch)"""
+    from jsonl_batch import batch_main as run
+    
+    def make_handler(args):
+        calculator = BMICalculator()
+        return lambda records: calculator.analyze_records(records, as_json=True)
+    
+    return run(make_handler, argv, description="วิเคราะห์ BMI จากคำขอ JSONL")
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch_main(sys.argv[2:]))
     main()
\ No newline at end of file
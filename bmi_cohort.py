@@ -0,0 +1,418 @@
+"""
+วิเคราะห์ BMI ของประชากรจำนวนมากจากไฟล์ CSV แบบสตรีม (Cohort Pipeline)
+อ่านไฟล์ทีละช่วง (chunk) ขนาดคงที่ วิเคราะห์ด้วย BMICalculator แบบ array แล้วเขียนผลรายแถวลงไฟล์
+พร้อมเก็บสถิติสะสมที่รวมกันได้ (mergeable) หน่วยความจำจึงคงที่ไม่ว่าไฟล์จะใหญ่แค่ไหน
+
+ไฟล์นำเข้าต้องมีหัวคอลัมน์ weight, height, age, gender
+
+ตัวอย่างการใช้งาน:
+    python bmi_cohort.py cohort.csv results.csv --stats part1.json
+    python bmi_cohort.py --merge part1.json part2.json
+"""
+
+import argparse
+import atexit
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from bmi_calculator import BMICalculator
+
+OUTPUT_COLUMNS = ["weight", "height", "age", "gender", "bmi", "category", "ideal_weight", "weight_diff"]
+
+# ช่วงของฮิสโตแกรม weight_diff (กก.) ค่านอกช่วงถูกนับในช่องแรก/ช่องสุดท้าย
+WEIGHT_DIFF_MIN = -100
+WEIGHT_DIFF_MAX = 200
+WEIGHT_DIFF_BIN = 1
+
+
+class RowError(ValueError):
+    """ข้อมูลแถวที่วิเคราะห์ไม่ได้ (row = ลำดับแถวในข้อมูลนำเข้า เริ่มจาก 0)"""
+
+    def __init__(self, row, message):
+        super().__init__(row, message)
+        self.row = row
+        self.message = message
+
+    def __str__(self):
+        return f"แถวที่ {self.row}: {self.message}"
+
+
+class CohortStats:
+    """สถิติสะสมของกลุ่มประชากร: จำนวนต่อหมวดหมู่, ค่าเฉลี่ย/ความแปรปรวนของ BMI, การกระจายของ weight_diff
+
+    รวมผลจากหลายส่วน (เช่นคนละไฟล์หรือคนละเครื่อง) ได้ด้วย merge()
+    """
+
+    def __init__(self, category_names):
+        self.category_names = list(category_names)
+        self.count = 0
+        self.invalid = 0
+        self.category_counts = [0] * len(self.category_names)
+        self.bmi_mean = 0.0
+        self.bmi_m2 = 0.0   # ผลรวมกำลังสองของส่วนเบี่ยงเบน (Welford/Chan)
+        self.bmi_min = float("inf")
+        self.bmi_max = float("-inf")
+        n_bins = (WEIGHT_DIFF_MAX - WEIGHT_DIFF_MIN) // WEIGHT_DIFF_BIN
+        self.weight_diff_hist = [0] * (n_bins + 2)  # ช่องแรก = ต่ำกว่าช่วง, ช่องสุดท้าย = สูงกว่าช่วง
+
+    def update(self, bmi, category_code, weight_diff):
+        """เพิ่มผลการวิเคราะห์หนึ่งช่วง (array จาก analyze_health_arrays)"""
+        n = len(bmi)
+        if n == 0:
+            return
+        counts = np.bincount(category_code, minlength=len(self.category_names))
+        self.category_counts = [a + int(b) for a, b in zip(self.category_counts, counts)]
+
+        chunk_mean = float(bmi.mean())
+        chunk_m2 = float(((bmi - chunk_mean) ** 2).sum())
+        self._merge_moments(n, chunk_mean, chunk_m2)
+        self.bmi_min = min(self.bmi_min, float(bmi.min()))
+        self.bmi_max = max(self.bmi_max, float(bmi.max()))
+
+        bins = np.floor((weight_diff - WEIGHT_DIFF_MIN) / WEIGHT_DIFF_BIN).astype(np.int64) + 1
+        np.clip(bins, 0, len(self.weight_diff_hist) - 1, out=bins)
+        hist = np.bincount(bins, minlength=len(self.weight_diff_hist))
+        self.weight_diff_hist = [a + int(b) for a, b in zip(self.weight_diff_hist, hist)]
+
+    def _merge_moments(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.bmi_mean
+        self.bmi_mean += delta * n / total
+        self.bmi_m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def merge(self, other):
+        """รวมสถิติจากอีกส่วนเข้ามา (เช่นผลจากไฟล์อื่นหรือการรันบางส่วน)"""
+        if other.category_names != self.category_names:
+            raise ValueError("หมวดหมู่ BMI ของสถิติทั้งสองชุดไม่ตรงกัน")
+        self.invalid += other.invalid
+        self.category_counts = [a + b for a, b in zip(self.category_counts, other.category_counts)]
+        self.weight_diff_hist = [a + b for a, b in zip(self.weight_diff_hist, other.weight_diff_hist)]
+        self.bmi_min = min(self.bmi_min, other.bmi_min)
+        self.bmi_max = max(self.bmi_max, other.bmi_max)
+        if other.count:
+            self._merge_moments(other.count, other.bmi_mean, other.bmi_m2)
+        return self
+
+    @property
+    def bmi_variance(self):
+        """ความแปรปรวนของ BMI (แบบประชากร)"""
+        return self.bmi_m2 / self.count if self.count else float("nan")
+
+    def weight_diff_quantile(self, q):
+        """ประมาณควอนไทล์ของ weight_diff จากฮิสโตแกรม (ความละเอียดเท่าความกว้างช่อง)"""
+        target = q * sum(self.weight_diff_hist)
+        running = 0
+        for i, n in enumerate(self.weight_diff_hist):
+            running += n
+            if n and running >= target:
+                return WEIGHT_DIFF_MIN + (i - 1) * WEIGHT_DIFF_BIN + WEIGHT_DIFF_BIN / 2
+        return float("nan")
+
+    def to_dict(self):
+        return {
+            "category_names": self.category_names,
+            "count": self.count,
+            "invalid": self.invalid,
+            "category_counts": dict(zip(self.category_names, self.category_counts)),
+            "bmi_mean": self.bmi_mean,
+            "bmi_m2": self.bmi_m2,
+            # กลุ่มว่างไม่มีค่าเหล่านี้ (None แทน NaN/±inf ซึ่งไม่ใช่ JSON ที่ถูกต้อง)
+            "bmi_variance": self.bmi_variance if self.count else None,
+            "bmi_min": self.bmi_min if self.count else None,
+            "bmi_max": self.bmi_max if self.count else None,
+            "weight_diff_hist": {
+                "min": WEIGHT_DIFF_MIN,
+                "max": WEIGHT_DIFF_MAX,
+                "bin": WEIGHT_DIFF_BIN,
+                "counts": self.weight_diff_hist
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data["category_names"])
+        stats.count = data["count"]
+        stats.invalid = data["invalid"]
+        stats.category_counts = [data["category_counts"][c] for c in stats.category_names]
+        stats.bmi_mean = data["bmi_mean"]
+        stats.bmi_m2 = data["bmi_m2"]
+        if stats.count:
+            stats.bmi_min = data["bmi_min"]
+            stats.bmi_max = data["bmi_max"]
+        stats.weight_diff_hist = list(data["weight_diff_hist"]["counts"])
+        return stats
+
+
+def _parse_chunk(rows, columns):
+    """แยกค่าตัวเลขของหนึ่งช่วง คืน (weights, heights, valid mask)"""
+    weight_col = columns["weight"]
+    height_col = columns["height"]
+    weights = np.empty(len(rows))
+    heights = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        try:
+            weights[i] = float(row[weight_col])
+            heights[i] = float(row[height_col])
+        except (ValueError, IndexError):
+            weights[i] = heights[i] = np.nan
+    # ข้อมูลไม่ถูกต้องเช่นเดียวกับใน main(): ตัวเลขไม่ได้ ("inf"/"nan" ก็ไม่นับ) หรือน้อยกว่าหรือเท่ากับ 0
+    return weights, heights, _valid_measurements(weights, heights)
+
+
+def _valid_measurements(weights, heights):
+    """น้ำหนักและส่วนสูงเป็นตัวเลขจำกัดที่มากกว่า 0 (เหมือน jsonl_batch.number_field)"""
+    return np.isfinite(weights) & np.isfinite(heights) & (weights > 0) & (heights > 0)
+
+
+# BMICalculator ของแต่ละ worker (สร้างครั้งเดียวตอนเริ่ม worker ไม่ต้องส่งตารางไปกับทุกงาน)
+_worker_calculator = None
+
+
+def _init_worker():
+    global _worker_calculator
+    _worker_calculator = BMICalculator()
+
+
+# process pool ที่ใช้ซ้ำข้ามการเรียก แยกตามจำนวน worker (สร้าง process และ BMICalculator ครั้งเดียว)
+_pools = {}
+
+
+def _get_pool(workers):
+    pool = _pools.get(workers)
+    if pool is None:
+        if os.name == "posix":
+            # เริ่ม resource tracker ก่อน fork ให้ worker ใช้ตัวเดียวกับ process หลัก มิฉะนั้นแต่ละ worker จะมีของตัวเอง
+            # ที่นับ shared memory ที่ worker เปิดอ่านเป็นก้อนรั่วและพยายามลบเมื่อ worker จบ
+            resource_tracker.ensure_running()
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    return pool
+
+
+def shutdown_pools():
+    """ปิด process pool ที่เก็บไว้ใช้ซ้ำทั้งหมด (เรียกอัตโนมัติเมื่อโปรแกรมจบ)"""
+    while _pools:
+        _pools.popitem()[1].shutdown()
+
+
+atexit.register(shutdown_pools)
+
+# ข้อมูลนำเข้าและผลลัพธ์ทั้งหมดอยู่ใน shared memory ก้อนเดียว เรียงเป็นคอลัมน์ตามลำดับนี้
+# worker อ่านและเขียนเฉพาะช่วงแถวของตัวเอง จึงไม่ต้อง pickle array ไปกลับ
+_SHARED_COLUMNS = (("weights", np.float64), ("heights", np.float64), ("bmi", np.float64),
+                   ("category_code", np.int8), ("ideal_weight", np.float64), ("weight_diff", np.float64))
+_RESULT_COLUMNS = ("bmi", "category_code", "ideal_weight", "weight_diff")
+
+
+def _shared_columns(buf, n):
+    columns = {}
+    offset = 0
+    for name, dtype in _SHARED_COLUMNS:
+        columns[name] = np.ndarray(n, dtype=dtype, buffer=buf, offset=offset)
+        offset += n * np.dtype(dtype).itemsize
+    return columns
+
+
+def _analyze_shared_rows(buf, n, start, stop):
+    """วิเคราะห์แถว [start, stop) ใน shared memory เขียนผลกลับที่เดิม คืนลำดับแถวแรกที่ไม่ถูกต้อง (หรือ None)"""
+    columns = _shared_columns(buf, n)
+    weights = columns["weights"][start:stop]
+    heights = columns["heights"][start:stop]
+    bad = np.flatnonzero(~_valid_measurements(weights, heights))
+    if bad.size:
+        return start + int(bad[0])
+    result = _worker_calculator.analyze_health_arrays(weights, heights)
+    for name in _RESULT_COLUMNS:
+        columns[name][start:stop] = result[name]
+    return None
+
+
+def _analyze_shard(task):
+    name, n, start, stop = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        # view ทั้งหมดอยู่ใน _analyze_shared_rows และหมดอายุเมื่อคืนค่า ก่อน close() ที่ต้องไม่มี view ค้าง
+        return _analyze_shared_rows(block.buf, n, start, stop)
+    finally:
+        block.close()
+
+
+def _analyze_rows(task, calculator=None):
+    rows, columns = task
+    calculator = calculator or _worker_calculator
+    weights, heights, valid = _parse_chunk(rows, columns)
+    return valid, calculator.analyze_health_arrays(weights[valid], heights[valid])
+
+
+def _bounded_map(pool, fn, tasks, max_pending):
+    """เหมือน pool.map แต่ส่งงานค้างไว้ไม่เกิน max_pending งาน คืน (task[0], ผลลัพธ์) ตามลำดับเดิม
+
+    pool ใช้ซ้ำข้ามการเรียก งานที่ยังค้างอยู่จึงถูกยกเลิกเมื่อผู้เรียกหยุดกลางทาง (เช่นเกิดข้อผิดพลาด)
+    """
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append((task[0], pool.submit(fn, task)))
+            if len(pending) >= max_pending:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def analyze_health_parallel(weights, heights, workers=None, shard_size=250000):
+    """วิเคราะห์ข้อมูลจำนวนมากแบบขนานหลายคอร์ (ผลเหมือน analyze_health_arrays และเรียงตามข้อมูลนำเข้า)
+
+    คัดลอกข้อมูลลง shared memory ครั้งเดียว แล้วให้ process pool (ใช้ซ้ำข้ามการเรียก แต่ละ worker สร้าง
+    BMICalculator ของตัวเองครั้งเดียว) วิเคราะห์ทีละ shard_size แถวและเขียนผลลงที่เดียวกัน
+    หากมีแถวที่ข้อมูลไม่ถูกต้องจะเกิด RowError ที่ระบุลำดับแถวแรกนั้น
+
+    การวิเคราะห์เป็นงาน vectorized ที่จำกัดด้วยแบนด์วิดท์หน่วยความจำ ต้นทุนส่วนเพิ่มคือคัดลอกข้อมูลเข้า/ออก
+    shared memory (ราว 50 ไบต์ต่อแถว) จึงเร็วขึ้นตามจำนวนคอร์จริงเมื่อข้อมูลมีหลายล้านแถว
+    บนเครื่องคอร์เดียวใช้ workers=1 (ไม่สร้าง pool)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    n = len(weights)
+    if workers == 1 or n <= shard_size:
+        _init_worker()
+        bad = np.flatnonzero(~_valid_measurements(weights, heights))
+        if bad.size:
+            raise RowError(int(bad[0]), "น้ำหนักและส่วนสูงต้องเป็นตัวเลขที่มากกว่า 0")
+        return _worker_calculator.analyze_health_arrays(weights, heights)
+
+    pool = _get_pool(workers)
+    block = shared_memory.SharedMemory(create=True, size=sum(n * np.dtype(t).itemsize for _, t in _SHARED_COLUMNS))
+    columns = None
+    try:
+        columns = _shared_columns(block.buf, n)
+        columns["weights"][:] = weights
+        columns["heights"][:] = heights
+        tasks = [(block.name, n, start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+        try:
+            bad_rows = [row for row in pool.map(_analyze_shard, tasks) if row is not None]
+        except BrokenProcessPool:
+            # worker ตายกลางคัน pool ใช้ต่อไม่ได้ ครั้งหน้าสร้างใหม่
+            _pools.pop(workers, None)
+            raise
+        if bad_rows:
+            raise RowError(bad_rows[0], "น้ำหนักและส่วนสูงต้องเป็นตัวเลขที่มากกว่า 0")
+        return {name: columns[name].copy() for name in _RESULT_COLUMNS}
+    finally:
+        columns = None
+        block.close()
+        block.unlink()
+
+
+def analyze_cohort_csv(input_path, output_path=None, chunk_size=100000, calculator=None, stats=None,
+                       workers=1):
+    """วิเคราะห์ไฟล์ CSV ทีละ chunk_size แถว เขียนผลรายแถวลง output_path (ถ้าระบุ) คืน CohortStats
+
+    แถวที่ข้อมูลไม่ถูกต้องจะถูกนับใน stats.invalid และเขียนลงไฟล์ผลโดยเว้นคอลัมน์ผลลัพธ์ว่างไว้
+    workers > 1 จะแยกค่าและวิเคราะห์แต่ละ chunk ใน process pool (ผลและลำดับแถวเหมือนเดิม)
+    """
+    calculator = calculator or BMICalculator()
+    names = calculator.category_names()
+    stats = stats or CohortStats(names)
+
+    with open(input_path, newline="", encoding="utf-8") as src:
+        reader = csv.reader(src)
+        header = next(reader)
+        columns = {name.strip(): i for i, name in enumerate(header)}
+        age_col = columns.get("age")
+        gender_col = columns.get("gender")
+
+        out = open(output_path, "w", newline="", encoding="utf-8") if output_path else None
+        analyzed = None
+        try:
+            writer = csv.writer(out) if out else None
+            if writer:
+                writer.writerow(OUTPUT_COLUMNS)
+
+            chunks = iter(lambda: list(islice(reader, chunk_size)), [])
+            if workers > 1:
+                # ส่งงานล่วงหน้าแค่ไม่กี่ chunk ต่อ worker เพื่อให้หน่วยความจำยังคงที่
+                analyzed = _bounded_map(_get_pool(workers), _analyze_rows, ((rows, columns) for rows in chunks),
+                                        workers * 2)
+            else:
+                analyzed = ((rows, _analyze_rows((rows, columns), calculator)) for rows in chunks)
+
+            for rows, (valid, result) in analyzed:
+                stats.invalid += int(len(rows) - valid.sum())
+                stats.update(result["bmi"], result["category_code"], result["weight_diff"])
+
+                if writer:
+                    bmi = result["bmi"].tolist()
+                    codes = result["category_code"].tolist()
+                    ideal = result["ideal_weight"].tolist()
+                    diff = result["weight_diff"].tolist()
+                    j = 0
+                    out_rows = []
+                    for row, ok in zip(rows, valid.tolist()):
+                        age = row[age_col] if age_col is not None and age_col < len(row) else ""
+                        gender = row[gender_col] if gender_col is not None and gender_col < len(row) else ""
+                        base = [row[columns["weight"]] if columns["weight"] < len(row) else "",
+                                row[columns["height"]] if columns["height"] < len(row) else "",
+                                age, gender]
+                        if ok:
+                            out_rows.append(base + [bmi[j], names[codes[j]], ideal[j], diff[j]])
+                            j += 1
+                        else:
+                            out_rows.append(base + ["", "", "", ""])
+                    writer.writerows(out_rows)
+        finally:
+            if analyzed is not None:
+                analyzed.close()
+            if out:
+                out.close()
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วิเคราะห์ BMI ของประชากรจากไฟล์ CSV แบบสตรีม")
+    parser.add_argument("input", nargs="?", help="ไฟล์ CSV (คอลัมน์ weight, height, age, gender)")
+    parser.add_argument("output", nargs="?", help="ไฟล์ CSV สำหรับผลรายแถว (ไม่ระบุ = เก็บเฉพาะสถิติ)")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=1, help="จำนวน process ที่ใช้วิเคราะห์ (ค่าเริ่มต้น 1)")
+    parser.add_argument("--stats", help="บันทึกสถิติสะสมเป็น JSON (นำไปรวมภายหลังได้)")
+    parser.add_argument("--merge", nargs="+", metavar="STATS_JSON", help="รวมไฟล์สถิติหลายไฟล์")
+    args = parser.parse_args()
+
+    if args.merge:
+        stats = None
+        for path in args.merge:
+            with open(path, encoding="utf-8") as f:
+                part = CohortStats.from_dict(json.load(f))
+            stats = part if stats is None else stats.merge(part)
+    elif args.input:
+        stats = analyze_cohort_csv(args.input, args.output, args.chunk_size, workers=args.workers)
+    else:
+        parser.error("ต้องระบุไฟล์นำเข้าหรือ --merge")
+
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats.to_dict(), f, ensure_ascii=False)
+
+    print(f"\n📊 สรุปผลประชากร {stats.count:,} คน (ข้อมูลไม่ถูกต้อง {stats.invalid:,} แถว)")
+    for name, n in zip(stats.category_names, stats.category_counts):
+        share = n / stats.count * 100 if stats.count else 0
+        print(f"   {name}: {n:,} ({share:.1f}%)")
+    print(f"   BMI เฉลี่ย: {stats.bmi_mean:.2f} (SD {stats.bmi_variance ** 0.5:.2f})")
+    print(f"   weight_diff มัธยฐาน: {stats.weight_diff_quantile(0.5):+.1f} กก.")
+
+if __name__ == "__main__":
+    main()
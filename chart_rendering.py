@@ -0,0 +1,119 @@
+"""
+การวาดกราฟแบบไม่ต้องมีหน้าจอ (Headless Chart Rendering) สำหรับเซิร์ฟเวอร์ออกรายงาน
+ใช้ร่วมกันระหว่าง BMICalculator และ HeartRateAnalyzer
+
+ChartTemplate ถือ figure ต้นแบบหนึ่งรูปไว้ตลอด (ไม่ผ่าน pyplot จึงไม่ค้างอยู่ในหน่วยความจำของ pyplot)
+ส่วนที่ไม่เปลี่ยน (แถบสี แกน legend) วาดครั้งเดียวแล้วเก็บเป็นภาพพื้นหลัง
+การออกรายงานแต่ละคนจึงวาดเฉพาะส่วนที่เปลี่ยน (blitting) แล้วเข้ารหัสเป็น PNG
+
+lttb_indices และ minmax_envelope ลดจำนวนจุดของข้อมูลยาวๆ (เช่น 1 Hz ทั้งสัปดาห์) ก่อนวาด
+"""
+
+import io
+import os
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import imsave
+
+
+def render_figure(fig, path=None, format=None):
+    """บันทึกรูปลง path (คืน path) หรือคืนข้อมูลรูปเป็น bytes (ค่าเริ่มต้น PNG)"""
+    if path is not None:
+        fig.savefig(path, format=format)
+        return path
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format or "png")
+    return buffer.getvalue()
+
+
+class ChartTemplate:
+    """figure ต้นแบบที่ใช้วาดกราฟซ้ำได้หลายครั้ง
+
+    dynamic_artists: ส่วนของกราฟที่เปลี่ยนทุกครั้ง (เช่นจุดของผู้ป่วย ข้อความกำกับ)
+    หากระบุ ส่วนที่เหลือจะถูกวาดเพียงครั้งเดียวแล้วนำภาพพื้นหลังกลับมาใช้ (เฉพาะ PNG)
+    หากไม่ระบุ จะวาดใหม่ทั้งรูปทุกครั้งแต่ยังใช้ figure เดิม ไม่สร้างใหม่
+    """
+
+    def __init__(self, fig, dynamic_artists=()):
+        self.fig = fig
+        self.canvas = FigureCanvasAgg(fig)
+        self.dynamic_artists = list(dynamic_artists)
+        self._background = None
+        for artist in self.dynamic_artists:
+            artist.set_animated(True)
+
+    def invalidate(self):
+        """ส่วนที่ไม่เปลี่ยนถูกแก้ไข ต้องวาดภาพพื้นหลังใหม่ในครั้งถัดไป"""
+        self._background = None
+
+    def render(self, path=None, format=None):
+        """วาดรูปปัจจุบัน คืน bytes หรือบันทึกลง path แล้วคืน path"""
+        if format is None:
+            extension = os.path.splitext(path)[1].lower().lstrip(".") if path else ""
+            format = extension or "png"
+
+        if format != "png" or not self.dynamic_artists:
+            return self._render_full(path, format)
+
+        if self._background is None:
+            self.canvas.draw()
+            self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.canvas.restore_region(self._background)
+        for artist in self.dynamic_artists:
+            self.fig.draw_artist(artist)
+        image = np.asarray(self.canvas.buffer_rgba())
+
+        target = path if path is not None else io.BytesIO()
+        imsave(target, image, format="png")
+        return path if path is not None else target.getvalue()
+
+    def _render_full(self, path, format):
+        # savefig ข้ามส่วนที่ตั้งเป็น animated จึงต้องปิดไว้ชั่วคราวตอนวาดทั้งรูป (เช่น SVG)
+        for artist in self.dynamic_artists:
+            artist.set_animated(False)
+        try:
+            return render_figure(self.fig, path, format)
+        finally:
+            for artist in self.dynamic_artists:
+                artist.set_animated(True)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: เลือก n_out จุดที่ยังคงรูปร่างของเส้นไว้ คืนตำแหน่งของจุดที่เลือก
+
+    จุดแรกและจุดสุดท้ายถูกเลือกเสมอ จุดที่เหลือแบ่งเป็น n_out - 2 ช่วง แต่ละช่วงเลือกจุดที่ทำให้
+    สามเหลี่ยม (จุดที่เลือกก่อนหน้า, จุดนี้, ค่าเฉลี่ยของช่วงถัดไป) มีพื้นที่มากที่สุด
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_envelope(y, n_buckets):
+    """ค่าต่ำสุด/สูงสุดของแต่ละช่วง (เช่นหนึ่งช่วงต่อหนึ่งพิกเซล) คืน (ตำแหน่งเริ่มของแต่ละช่วง, ต่ำสุด, สูงสุด)
+
+    ใช้คู่กับ lttb_indices เพื่อไม่ให้ค่าสุดขั้ว (เช่นหัวใจเต้นช้าชั่วขณะ) หายไปจากกราฟ
+    """
+    y = np.asarray(y)
+    if not len(y):
+        return np.empty(0, dtype=np.int64), y, y
+    starts = np.unique(np.linspace(0, len(y), min(n_buckets, len(y)) + 1).astype(np.int64)[:-1])
+    return starts, np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
@@ -3,11 +3,28 @@
 ตัวอย่าง AI ทางการแพทย์อย่างง่ายสำหรับนักเรียนมัธยม
 """
 
-import matplotlib.pyplot as plt
-import numpy as np
 import random
+import sys
+from collections import deque
 from datetime import datetime, timedelta
 
+# numpy และ matplotlib นำเข้าเฉพาะในเมธอดที่ใช้ (การวิเคราะห์ค่าเดียวจึงเริ่มทำงานได้ทันที)
+
+# รูปแบบอัตราการเต้นหัวใจตามช่วงเวลาของวัน: (ชั่วโมงเริ่มต้น, ค่าต่ำสุด, ค่าสูงสุด) แบบเดียวกับ generate_sample_data
+DAILY_ACTIVITY_PROFILE = (
+    (0, 55, 70),     # นอนหลับ
+    (7, 70, 85),     # ตื่นนอน
+    (9, 75, 90),     # ทำงาน/เรียน
+    (12, 80, 95),    # พักเที่ยง
+    (14, 75, 90),    # ทำงาน/เรียนต่อ
+    (18, 120, 160),  # ออกกำลังกาย
+    (20, 70, 85),    # พักผ่อน
+    (23, 65, 80),    # เตรียมนอน
+)
+
+# อายุสูงสุดที่รับในการวิเคราะห์หลายค่าพร้อมกัน (อายุเกินนี้ไม่สมเหตุสมผล และ 220 - อายุ อาจล้นช่วงของ int64)
+MAX_AGE = 150
+
 class HeartRateAnalyzer:
     def __init__(self):
         # เกณฑ์อัตราการเต้นหัวใจตามอายุ (ครั้งต่อนาที)
@@ -55,24 +72,28 @@ class HeartRateAnalyzer:
         else:
             return "ผู้สูงอายุ (65+ ปี)"
     
-    def analyze_heart_rate(self, heart_rate, age, activity_level="resting"):
-        """วิเคราะห์อัตราการเต้นหัวใจ"""
-        age_group = self.get_age_group(age)
-        normal_range = self.heart_rate_zones[age_group][activity_level]
-        
-        # จำแนกสถานะ
+    def classify_heart_rate(self, heart_rate, normal_range):
+        """จำแนกสถานะของอัตราการเต้นหัวใจเทียบกับช่วงปกติ"""
         if heart_rate < normal_range["min"] - 20:
-            status = "ช้ามาก"
+            return "ช้ามาก"
         elif heart_rate < normal_range["min"]:
-            status = "ช้า"
+            return "ช้า"
         elif normal_range["min"] <= heart_rate <= normal_range["max"]:
-            status = "ปกติ"
+            return "ปกติ"
         elif heart_rate <= normal_range["max"] + 20:
-            status = "เร็วเล็กน้อย"
+            return "เร็วเล็กน้อย"
         elif heart_rate <= normal_range["max"] + 40:
-            status = "เร็ว"
+            return "เร็ว"
         else:
-            status = "เร็วมาก"
+            return "เร็วมาก"
+    
+    def analyze_heart_rate(self, heart_rate, age, activity_level="resting"):
+        """วิเคราะห์อัตราการเต้นหัวใจ"""
+        age_group = self.get_age_group(age)
+        normal_range = self.heart_rate_zones[age_group][activity_level]
+        
+        # จำแนกสถานะ
+        status = self.classify_heart_rate(heart_rate, normal_range)
         
         # คำนวณ Max Heart Rate ตามสูตร 220 - อายุ
         max_hr = 220 - age
@@ -89,6 +110,208 @@ class HeartRateAnalyzer:
             "color": self.status_categories[status]["color"]
         }
     
+    def age_group_names(self):
+        """รายชื่อกลุ่มอายุตามรหัส (รหัส = ลำดับใน self.heart_rate_zones)"""
+        return list(self.heart_rate_zones.keys())
+    
+    def activity_levels(self):
+        """รายชื่อสถานะกิจกรรมตามรหัส (resting, normal, exercise)"""
+        return list(next(iter(self.heart_rate_zones.values())).keys())
+    
+    def status_names(self):
+        """รายชื่อสถานะตามรหัส (รหัส = ลำดับใน self.status_categories จากช้ามากไปเร็วมาก)"""
+        return list(self.status_categories.keys())
+    
+    def get_age_group_codes(self, ages):
+        """หารหัสกลุ่มอายุของหลายคนพร้อมกัน ผลเหมือน get_age_group (อายุนอกทุกช่วงจัดเป็นผู้สูงอายุ)"""
+        import numpy as np
+        
+        ages = np.asarray(ages)
+        codes = np.full(ages.shape, 3, dtype=np.int8)
+        codes[(13 <= ages) & (ages <= 18)] = 1
+        codes[(19 <= ages) & (ages <= 64)] = 2
+        codes[(6 <= ages) & (ages <= 12)] = 0
+        return codes
+    
+    def _zone_tables(self):
+        """ตารางค่า min/max ของช่วงปกติ รูปร่าง (กลุ่มอายุ, สถานะกิจกรรม)"""
+        import numpy as np
+        
+        tables = getattr(self, "_zone_tables_cache", None)
+        if tables is None:
+            levels = self.activity_levels()
+            zones = [self.heart_rate_zones[group] for group in self.age_group_names()]
+            tables = self._zone_tables_cache = (
+                np.array([[zone[level]["min"] for level in levels] for zone in zones], dtype=np.float64),
+                np.array([[zone[level]["max"] for level in levels] for zone in zones], dtype=np.float64))
+        return tables
+    
+    def get_activity_codes(self, activity_levels):
+        """แปลงสถานะกิจกรรม (ชื่อหรือรหัส ค่าเดียวหรือ array) เป็นรหัส
+        
+        รหัสต้องอยู่ในช่วง 0 ถึง len(activity_levels()) - 1 มิฉะนั้นยก ValueError
+        """
+        import numpy as np
+        
+        levels = self.activity_levels()
+        activity_levels = np.asarray(activity_levels)
+        if activity_levels.dtype.kind in "iu":
+            # ตรวจก่อนแปลงเป็น int8 (รหัส -1 หรือ 256 จะกลายเป็นรหัสของสถานะอื่นแบบเงียบ ๆ)
+            invalid = (activity_levels < 0) | (activity_levels >= len(levels))
+            if invalid.any():
+                raise ValueError(f"รหัสสถานะกิจกรรมต้องอยู่ระหว่าง 0 ถึง {len(levels) - 1}: "
+                                 f"{activity_levels[invalid].flat[0].item()}")
+            return activity_levels.astype(np.int8)
+        codes = np.full(activity_levels.shape, -1, dtype=np.int8)
+        for code, level in enumerate(levels):
+            codes[activity_levels == level] = code
+        if (codes < 0).any():
+            raise KeyError(activity_levels[codes < 0].flat[0].item())  # เหมือน analyze_heart_rate
+        return codes
+    
+    def get_status_codes(self, heart_rates, normal_min, normal_max):
+        """หารหัสสถานะของหลายค่าพร้อมกันเทียบกับช่วงปกติ ผลเหมือน classify_heart_rate
+        
+        เกณฑ์ของแต่ละสถานะเรียงจากน้อยไปมาก รหัสจึงเท่ากับจำนวนเกณฑ์ที่ค่านั้นผ่าน
+        """
+        import numpy as np
+        
+        heart_rates = np.asarray(heart_rates, dtype=np.float64)
+        codes = (heart_rates >= normal_min - 20).astype(np.int8)
+        codes += heart_rates >= normal_min
+        codes += heart_rates > normal_max
+        codes += heart_rates > normal_max + 20
+        codes += heart_rates > normal_max + 40
+        # ค่า NaN ไม่ผ่านเกณฑ์ใดเลย จึงตกไปที่ else ของ if-chain (เร็วมาก)
+        return np.where(np.isnan(heart_rates), len(self.status_categories) - 1, codes).astype(np.int8)
+    
+    def analyze_heart_rate_arrays(self, heart_rates, ages, activity_levels="resting"):
+        """วิเคราะห์อัตราการเต้นหัวใจหลายค่าพร้อมกัน (เช่นข้อมูลทั้งเดือนของทั้งหอผู้ป่วย)
+        
+        activity_levels เป็นชื่อหรือรหัสสถานะกิจกรรม ค่าเดียวหรือ array ที่ broadcast กับ heart_rates ได้
+        คืน dict ของ array: age_group_code, status_code, normal_min, normal_max, max_hr,
+        target_low, target_high ค่าเหมือน analyze_heart_rate ทีละค่า
+        (ชื่อได้จาก age_group_names()/status_names() และคำแนะนำจาก status_labels())
+        อายุต้องเป็นตัวเลขในช่วง 0 ถึง MAX_AGE มิฉะนั้นยก ValueError
+        """
+        import numpy as np
+        
+        heart_rates = np.asarray(heart_rates, dtype=np.float64)
+        ages = np.asarray(ages)
+        if ages.dtype.kind not in "iuf":
+            raise ValueError("อายุต้องเป็นตัวเลข")
+        if ages.size and not (0 <= ages.min() and ages.max() <= MAX_AGE):
+            raise ValueError(f"อายุต้องอยู่ระหว่าง 0 ถึง {MAX_AGE} ปี")
+        age_group_code = self.get_age_group_codes(ages)
+        activity_code = self.get_activity_codes(activity_levels)
+        zone_min, zone_max = self._zone_tables()
+        normal_min = zone_min[age_group_code, activity_code]
+        normal_max = zone_max[age_group_code, activity_code]
+        
+        # Max Heart Rate = 220 - อายุ, โซนเป้าหมาย 50-85% ปัดเศษทิ้งแบบ int()
+        max_hr = 220 - ages
+        return {
+            "age_group_code": age_group_code,
+            "status_code": self.get_status_codes(heart_rates, normal_min, normal_max),
+            "normal_min": normal_min,
+            "normal_max": normal_max,
+            "max_hr": max_hr,
+            "target_low": np.trunc(max_hr * 0.5).astype(np.int64),
+            "target_high": np.trunc(max_hr * 0.85).astype(np.int64)
+        }
+    
+    def status_labels(self, status_codes):
+        """แปลงรหัสสถานะเป็น (ชื่อสถานะ, คำแนะนำ, สี) แบบ array ของ object"""
+        import numpy as np
+        
+        names = self.status_names()
+        tables = [np.array([self.status_categories[name][field] for name in names], dtype=object)
+                  for field in ("advice", "color")]
+        status_codes = np.asarray(status_codes)
+        return (np.array(names, dtype=object)[status_codes],
+                tables[0][status_codes], tables[1][status_codes])
+    
+    def analyze_records(self, records, as_json=False):
+        """วิเคราะห์คำขอหลายรายการ (dict ที่มี heart_rate, age และ activity_level เช่นจากโหมด batch)
+        
+        คืนรายการผล (dict รูปแบบเดียวกับ analyze_heart_rate) หรือ RecordError ของรายการที่ข้อมูลไม่ถูกต้อง
+        รายการที่ถูกต้องทั้งหมดวิเคราะห์พร้อมกันด้วย analyze_heart_rate_arrays
+        as_json=True: คืนผลเป็นข้อความ JSON (RawJSON) ประกอบจากส่วนที่เข้ารหัสไว้แล้ว
+        """
+        from jsonl_batch import RawJSON, RecordError, number_field
+        
+        levels = self.activity_levels()
+        level_codes = {level: code for code, level in enumerate(levels)}
+        outputs = [None] * len(records)
+        valid, heart_rates, ages, activity_codes = [], [], [], []
+        for i, record in enumerate(records):
+            try:
+                heart_rate = number_field(record, "heart_rate")
+                age = number_field(record, "age", integer=True, positive=False)
+                if age < 0:
+                    raise RecordError("age ต้องไม่ติดลบ")
+                if age > MAX_AGE:
+                    raise RecordError(f"age ต้องไม่เกิน {MAX_AGE}")
+                level = record.get("activity_level", "resting")
+                if level not in level_codes:
+                    raise RecordError(f"activity_level ต้องเป็นหนึ่งใน {', '.join(levels)}")
+            except RecordError as e:
+                outputs[i] = e
+                continue
+            valid.append(i)
+            heart_rates.append(heart_rate)
+            ages.append(age)
+            activity_codes.append(level_codes[level])
+        if not valid:
+            return outputs
+        
+        result = self.analyze_heart_rate_arrays(heart_rates, ages, activity_codes)
+        groups = self.age_group_names()
+        statuses = self.status_names()
+        columns = zip(valid, result["age_group_code"].tolist(), activity_codes, result["status_code"].tolist(),
+                      result["max_hr"].tolist(), result["target_low"].tolist(), result["target_high"].tolist())
+        if as_json:
+            import json
+            
+            def encode(value):
+                return json.dumps(value, ensure_ascii=False)
+            
+            # ส่วนที่ขึ้นกับ (กลุ่มอายุ, กิจกรรม, สถานะ) เท่านั้น เข้ารหัสครั้งเดียวต่อชุดค่า
+            fragments = {}
+            for i, group_code, activity_code, status_code, max_hr, target_low, target_high in columns:
+                key = (group_code, activity_code, status_code)
+                fragment = fragments.get(key)
+                if fragment is None:
+                    age_group = groups[group_code]
+                    status = statuses[status_code]
+                    fragment = fragments[key] = (
+                        f'"status": {encode(status)}, "age_group": {encode(age_group)}, '
+                        f'"normal_range": {encode(self.heart_rate_zones[age_group][levels[activity_code]])}',
+                        f'"advice": {encode(self.status_categories[status]["advice"])}, '
+                        f'"color": {encode(self.status_categories[status]["color"])}')
+                outputs[i] = RawJSON(f'{{{fragment[0]}, "max_hr": {max_hr}, '
+                                     f'"target_zone": {{"low": {target_low}, "high": {target_high}}}, {fragment[1]}}}')
+            return outputs
+        
+        for i, group_code, activity_code, status_code, max_hr, target_low, target_high in columns:
+            age_group = groups[group_code]
+            status = statuses[status_code]
+            category = self.status_categories[status]
+            outputs[i] = {
+                "status": status,
+                "age_group": age_group,
+                "normal_range": self.heart_rate_zones[age_group][levels[activity_code]],
+                "max_hr": max_hr,
+                "target_zone": {"low": target_low, "high": target_high},
+                "advice": category["advice"],
+                "color": category["color"]
+            }
+        return outputs
+    
+    def monitor(self, age, activity_level="resting", windows=(60, 300, 3600), status_window=None):
+        """เริ่มการติดตามอัตราการเต้นหัวใจแบบต่อเนื่อง (HeartRateMonitor) สำหรับข้อมูลสดจากอุปกรณ์สวมใส่"""
+        return HeartRateMonitor(self, age, activity_level, windows, status_window)
+    
     def generate_sample_data(self, duration_hours=24):
         """สร้างข้อมูลตัวอย่างอัตราการเต้นหัวใจ 24 ชั่วโมง"""
         times = []
@@ -126,62 +349,261 @@ class HeartRateAnalyzer:
         
         return times, heart_rates
     
-    def plot_heart_rate_trend(self, times, heart_rates, age):
-        """สร้างกราฟแนวโน้มอัตราการเต้นหัวใจ"""
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+    def _hourly_profile(self):
+        """ตารางค่าต่ำสุด/สูงสุดของแต่ละชั่วโมง (0-23) จาก DAILY_ACTIVITY_PROFILE"""
+        import numpy as np
+        
+        low = np.empty(24, dtype=np.int32)
+        high = np.empty(24, dtype=np.int32)
+        for start_hour, hr_min, hr_max in DAILY_ACTIVITY_PROFILE:
+            low[start_hour:] = hr_min
+            high[start_hour:] = hr_max
+        return low, high
+    
+    def iter_sample_data_chunks(self, duration_hours=24, resolution_seconds=1, patients=None,
+                                seed=None, start=None, chunk_size=None):
+        """สร้างข้อมูลตัวอย่างแบบเวกเตอร์ทีละช่วง (สำหรับข้อมูลหลายสัปดาห์หรือผู้ป่วยหลายพันคน)
+        
+        ให้ผลเป็น (timestamps, heart_rates) ทีละช่วงละ chunk_size จุดเวลา:
+        timestamps เป็น epoch วินาที (int64), heart_rates เป็น int16
+        (1 มิติถ้า patients เป็น None, ไม่เช่นนั้นรูปร่าง (patients, จำนวนจุดเวลา))
+        
+        ใช้รูปแบบตามชั่วโมงของวันเดียวกับ generate_sample_data (เวลาท้องถิ่น) และความสุ่ม ±5
+        seed เดิมให้ข้อมูลเดิมเสมอ ไม่ว่าจะแบ่งช่วงขนาดเท่าใดหรือสร้างผู้ป่วยพร้อมกันกี่คน
+        """
+        import numpy as np
+        
+        if resolution_seconds < 1:
+            raise ValueError("resolution_seconds ต้องมีค่าอย่างน้อย 1 วินาที")
+        total = int(duration_hours * 3600 // resolution_seconds)
+        if start is None:
+            start = int(datetime.now().timestamp()) - total * resolution_seconds
+        utc_offset = int(datetime.fromtimestamp(start).astimezone().utcoffset().total_seconds())
+        
+        # ผู้ป่วยแต่ละคนมีตัวสุ่มของตัวเอง (แยกจาก seed เดียวกัน) ผลของแต่ละคนจึงไม่ขึ้นกับจำนวนผู้ป่วย
+        # และแยกตัวสุ่มของค่าตามช่วงเวลากับความสุ่ม ±5 ลำดับการสุ่มจึงไม่ขึ้นกับขนาดช่วง
+        generators = [tuple(np.random.default_rng(stream) for stream in child.spawn(2))
+                      for child in np.random.SeedSequence(seed).spawn(patients or 1)]
+        if chunk_size is None:
+            chunk_size = max(1, (1 << 23) // len(generators))
+        low, high = self._hourly_profile()
+        
+        for first in range(0, total, chunk_size):
+            count = min(chunk_size, total - first)
+            timestamps = start + (first + np.arange(count, dtype=np.int64)) * resolution_seconds
+            hours = (timestamps + utc_offset) // 3600 % 24
+            hr_min = low[hours]
+            hr_max = high[hours]
+            
+            heart_rates = np.empty((len(generators), count), dtype=np.int16)
+            for row, (activity_rng, noise_rng) in zip(heart_rates, generators):
+                # สุ่มแบบ int32 เพราะตัวสุ่ม int16 ทิ้งบิตที่เหลือท้ายแต่ละครั้ง ผลจะขึ้นกับขนาดช่วง
+                hr = activity_rng.integers(hr_min, hr_max, endpoint=True, dtype=np.int32)
+                hr += noise_rng.integers(-5, 5, size=count, endpoint=True, dtype=np.int32)
+                row[:] = hr
+            np.clip(heart_rates, 50, 200, out=heart_rates)  # จำกัดค่าให้อยู่ในช่วงที่เป็นไปได้
+            yield timestamps, (heart_rates[0] if patients is None else heart_rates)
+    
+    def generate_sample_data_arrays(self, duration_hours=24, resolution_seconds=900, patients=None,
+                                    seed=None, start=None):
+        """สร้างข้อมูลตัวอย่างทั้งหมดในครั้งเดียว คืน (timestamps, heart_rates) แบบ NumPy array
+        
+        ค่าเริ่มต้นเหมือน generate_sample_data (24 ชั่วโมง ทุก 15 นาที) ดู iter_sample_data_chunks
+        """
+        import numpy as np
+        
+        chunks = list(self.iter_sample_data_chunks(duration_hours, resolution_seconds, patients,
+                                                   seed, start))
+        if not chunks:
+            shape = (0,) if patients is None else (patients, 0)
+            return np.empty(0, dtype=np.int64), np.empty(shape, dtype=np.int16)
+        if len(chunks) == 1:
+            return chunks[0]
+        return (np.concatenate([timestamps for timestamps, _ in chunks]),
+                np.concatenate([heart_rates for _, heart_rates in chunks], axis=-1))
+    
+    def _plot_times(self, times):
+        """แปลงเวลา (list ของ datetime หรือ epoch วินาที int64) เป็น datetime64 ตามเวลาท้องถิ่นสำหรับวาดกราฟ"""
+        import numpy as np
+        
+        times = np.asarray(times)
+        if times.dtype.kind in "iu":
+            # epoch เป็นเวลา UTC เลื่อนเป็นเวลาท้องถิ่นให้ตรงกับ generate_sample_data
+            offset = 0
+            if times.size:
+                offset = int(datetime.fromtimestamp(int(times[0])).astimezone().utcoffset().total_seconds())
+            return (times.astype(np.int64) + offset).astype("datetime64[s]")
+        return times.astype("datetime64[us]")
+    
+    def _heart_rate_histogram(self, heart_rates, bins=20):
+        """ฮิสโตแกรมและค่าเฉลี่ย คืน (counts, edges, mean) เหมือน np.histogram(heart_rates, bins)
+        
+        ค่าที่เป็นจำนวนเต็มจะนับรวมเป็นรายค่า (bincount) ก่อน แล้วจึงจัดลงช่องจากจำนวนนับนั้น
+        """
+        import numpy as np
+        
+        values = np.asarray(heart_rates)
+        if values.dtype.kind not in "iu" or not values.size:
+            counts, edges = np.histogram(values, bins=bins)
+            return counts, edges, values.mean() if values.size else float("nan")
+        
+        low = int(values.min())
+        per_value = np.bincount(values.astype(np.int64) - low)
+        levels = np.flatnonzero(per_value)
+        weights = per_value[levels]
+        counts, edges = np.histogram(levels + low, bins=bins, weights=weights)
+        return counts.astype(np.int64), edges, float((levels + low) @ weights) / values.size
+    
+    def _prepare_trend(self, times, heart_rates, max_points):
+        """เตรียมข้อมูลสำหรับกราฟแนวโน้ม: ลดจำนวนจุดเหลือไม่เกิน max_points ด้วย LTTB
+        พร้อมแถบค่าต่ำสุด/สูงสุดของแต่ละช่วง และฮิสโตแกรมจากจำนวนนับ"""
+        import numpy as np
         
-        # กราฟแนวโน้ม 24 ชั่วโมง
-        ax1.plot(times, heart_rates, color='red', linewidth=2, marker='o', markersize=3)
+        from chart_rendering import lttb_indices, minmax_envelope
+        
+        x = self._plot_times(times)
+        y = np.asarray(heart_rates)
+        counts, edges, mean_hr = self._heart_rate_histogram(y)
+        trace = {"x": x, "y": y, "envelope": None, "counts": counts, "edges": edges, "mean": mean_hr}
+        if len(y) > max_points:
+            selected = lttb_indices(x.astype(np.int64), y, max_points)
+            starts, lows, highs = minmax_envelope(y, max_points)
+            trace["x"], trace["y"] = x[selected], y[selected]
+            trace["envelope"] = (x[starts], lows, highs)
+        return trace
+    
+    def _draw_envelope(self, ax, trace):
+        """แถบค่าต่ำสุด/สูงสุดของข้อมูลที่ถูกลดจำนวนจุด (None ถ้าวาดครบทุกจุด)"""
+        if trace["envelope"] is None:
+            return None
+        x, lows, highs = trace["envelope"]
+        return ax.fill_between(x, lows, highs, step='post', color='red', alpha=0.25, linewidth=0)
+    
+    def _draw_heart_rate_trend(self, ax1, ax2, trace, age):
+        """วาดกราฟแนวโน้มและฮิสโตแกรมลงบน ax1, ax2 คืนส่วนของกราฟที่ต้องปรับค่าภายหลัง"""
+        # กราฟแนวโน้ม 24 ชั่วโมง (ข้อมูลยาวถูกลดจำนวนจุดแล้ว จึงไม่ใส่ marker)
+        times = trace["x"]
+        marker = 'o' if trace["envelope"] is None else 'None'
+        trend, = ax1.plot(times, trace["y"], color='red', linewidth=2, marker=marker, markersize=3)
+        envelope = self._draw_envelope(ax1, trace)
         ax1.set_title('อัตราการเต้นหัวใจใน 24 ชั่วโมง', fontsize=14, fontweight='bold')
         ax1.set_xlabel('เวลา')
         ax1.set_ylabel('อัตราการเต้นหัวใจ (ครั้ง/นาที)')
         ax1.grid(True, alpha=0.3)
         
-        # เส้นแสดงโซนปกติ
+        # เส้นแสดงโซนปกติ (พื้นที่เป็นสี่เหลี่ยม ใช้เพียงจุดเวลาแรกและสุดท้าย)
         age_group = self.get_age_group(age)
         normal_range = self.heart_rate_zones[age_group]["resting"]
-        ax1.axhline(y=normal_range["min"], color='green', linestyle='--', alpha=0.7, label='ขีดจำกัดล่าง')
-        ax1.axhline(y=normal_range["max"], color='green', linestyle='--', alpha=0.7, label='ขีดจำกัดบน')
-        ax1.fill_between(times, normal_range["min"], normal_range["max"], alpha=0.2, color='green', label='โซนปกติ')
+        lower = ax1.axhline(y=normal_range["min"], color='green', linestyle='--', alpha=0.7, label='ขีดจำกัดล่าง')
+        upper = ax1.axhline(y=normal_range["max"], color='green', linestyle='--', alpha=0.7, label='ขีดจำกัดบน')
+        span = ax1.fill_between(times[[0, -1]], normal_range["min"], normal_range["max"], alpha=0.2, color='green', label='โซนปกติ')
         ax1.legend()
         
-        # ฮิสโตแกรมการกระจายของข้อมูล
-        ax2.hist(heart_rates, bins=20, color='skyblue', alpha=0.7, edgecolor='black')
+        # ฮิสโตแกรมการกระจายของข้อมูล (จากจำนวนนับที่จัดช่องไว้แล้ว)
+        counts, edges = trace["counts"], trace["edges"]
+        _, _, bars = ax2.hist(edges[:-1], bins=edges, weights=counts, color='skyblue', alpha=0.7, edgecolor='black')
         ax2.set_title('การกระจายของอัตราการเต้นหัวใจ', fontsize=14, fontweight='bold')
         ax2.set_xlabel('อัตราการเต้นหัวใจ (ครั้ง/นาที)')
         ax2.set_ylabel('จำนวนครั้ง')
-        ax2.axvline(x=np.mean(heart_rates), color='red', linestyle='-', linewidth=2, label=f'ค่าเฉลี่ย: {np.mean(heart_rates):.1f}')
-        ax2.axvline(x=normal_range["min"], color='green', linestyle='--', alpha=0.7)
-        ax2.axvline(x=normal_range["max"], color='green', linestyle='--', alpha=0.7)
-        ax2.legend()
+        mean = ax2.axvline(x=trace["mean"], color='red', linestyle='-', linewidth=2, label=f'ค่าเฉลี่ย: {trace["mean"]:.1f}')
+        hist_lower = ax2.axvline(x=normal_range["min"], color='green', linestyle='--', alpha=0.7)
+        hist_upper = ax2.axvline(x=normal_range["max"], color='green', linestyle='--', alpha=0.7)
+        legend = ax2.legend()
         ax2.grid(True, alpha=0.3)
         
+        mean_label = next(text for text in legend.get_texts() if text.get_text() == mean.get_label())
+        return {"trend": trend, "envelope": envelope, "lower": lower, "upper": upper, "span": span,
+                "bars": bars, "mean": mean, "mean_label": mean_label,
+                "hist_lower": hist_lower, "hist_upper": hist_upper}
+    
+    def plot_heart_rate_trend(self, times, heart_rates, age, max_points=2000):
+        """สร้างกราฟแนวโน้มอัตราการเต้นหัวใจ (ข้อมูลยาวกว่า max_points จุดจะถูกลดจำนวนจุดก่อนวาด)"""
+        import matplotlib.pyplot as plt
+        
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+        self._draw_heart_rate_trend(ax1, ax2, self._prepare_trend(times, heart_rates, max_points), age)
+        
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
     
-    def create_heart_rate_zones_chart(self, age):
-        """สร้างกราฟแสดงโซนการเต้นหัวใจ"""
-        max_hr = 220 - age
-        zones = {
+    def render_heart_rate_trend(self, times, heart_rates, age, path=None, format=None, max_points=2000):
+        """วาดกราฟแนวโน้มอัตราการเต้นหัวใจโดยไม่ต้องมีหน้าจอ (สำหรับเซิร์ฟเวอร์ออกรายงาน)
+        
+        คืนข้อมูลรูปเป็น bytes (format: "png" หรือ "svg") หรือบันทึกลง path แล้วคืน path
+        ใช้รูปต้นแบบเดิมซ้ำทุกครั้ง ปรับเฉพาะข้อมูล เส้นโซนปกติ และแท่งฮิสโตแกรม
+        """
+        trace = self._prepare_trend(times, heart_rates, max_points)
+        template = getattr(self, "_trend_chart_template", None)
+        if template is None:
+            from matplotlib.figure import Figure
+            
+            from chart_rendering import ChartTemplate
+            
+            fig = Figure(figsize=(12, 10))
+            ax1, ax2 = fig.subplots(2, 1)
+            parts = self._draw_heart_rate_trend(ax1, ax2, trace, age)
+            fig.tight_layout()
+            template = self._trend_chart_template = (ChartTemplate(fig), ax1, ax2, parts)
+        chart, ax1, ax2, parts = template
+        
+        age_group = self.get_age_group(age)
+        normal_range = self.heart_rate_zones[age_group]["resting"]
+        parts["trend"].set_data(trace["x"], trace["y"])
+        parts["trend"].set_marker('o' if trace["envelope"] is None else 'None')
+        for line, value in ((parts["lower"], normal_range["min"]), (parts["upper"], normal_range["max"])):
+            line.set_ydata([value, value])
+        for line, value in ((parts["hist_lower"], normal_range["min"]), (parts["hist_upper"], normal_range["max"])):
+            line.set_xdata([value, value])
+        # พื้นที่โซนปกติและแถบต่ำสุด/สูงสุดขึ้นกับช่วงเวลาของข้อมูล จึงวาดใหม่
+        # (legend ใช้ของเดิมได้เพราะสีและชื่อไม่เปลี่ยน)
+        for name in ("span", "envelope"):
+            if parts[name] is not None:
+                parts[name].remove()
+        parts["span"] = ax1.fill_between(trace["x"][[0, -1]], normal_range["min"], normal_range["max"], alpha=0.2, color='green')
+        parts["envelope"] = self._draw_envelope(ax1, trace)
+        
+        # ฮิสโตแกรม 20 ช่องเท่าเดิม ปรับตำแหน่งและความสูงของแท่งเดิม
+        edges = trace["edges"]
+        for bar, count, left, right in zip(parts["bars"], trace["counts"], edges[:-1], edges[1:]):
+            bar.set_x(left)
+            bar.set_width(right - left)
+            bar.set_height(count)
+        parts["mean"].set_xdata([trace["mean"], trace["mean"]])
+        parts["mean_label"].set_text(f'ค่าเฉลี่ย: {trace["mean"]:.1f}')
+        
+        for ax in (ax1, ax2):
+            ax.relim()
+            ax.autoscale_view()
+        return chart.render(path, format)
+    
+    def _training_zones(self, max_hr):
+        """โซนการเต้นหัวใจขณะออกกำลังกายตาม Max HR"""
+        return {
             "โซนฟื้นฟู (50-60%)": {"min": max_hr * 0.5, "max": max_hr * 0.6, "color": "#87CEEB"},
             "โซนเผาผลาญไขมัน (60-70%)": {"min": max_hr * 0.6, "max": max_hr * 0.7, "color": "#90EE90"},
             "โซนแอโรบิก (70-80%)": {"min": max_hr * 0.7, "max": max_hr * 0.8, "color": "#FFD700"},
             "โซนแอนแอโรบิก (80-90%)": {"min": max_hr * 0.8, "max": max_hr * 0.9, "color": "#FFA500"},
             "โซนขีดจำกัด (90-100%)": {"min": max_hr * 0.9, "max": max_hr, "color": "#FF6347"}
         }
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
+    
+    def _draw_heart_rate_zones(self, ax, age):
+        """วาดแถบโซนการเต้นหัวใจลงบน ax คืน (แถบ, ข้อความในแถบ) สำหรับปรับค่าภายหลัง"""
+        max_hr = 220 - age
+        zones = self._training_zones(max_hr)
         
         # วาดแถบสี
+        bars = []
+        labels = []
         for i, (zone_name, zone_data) in enumerate(zones.items()):
             width = zone_data["max"] - zone_data["min"]
-            ax.barh(i, width, left=zone_data["min"], height=0.6, 
-                   color=zone_data["color"], alpha=0.8, label=zone_name)
+            bars.extend(ax.barh(i, width, left=zone_data["min"], height=0.6, 
+                               color=zone_data["color"], alpha=0.8, label=zone_name))
             
             # ใส่ข้อความในแถบ
             center = (zone_data["min"] + zone_data["max"]) / 2
-            ax.text(center, i, f'{int(zone_data["min"])}-{int(zone_data["max"])}', 
-                   ha='center', va='center', fontweight='bold')
+            labels.append(ax.text(center, i, f'{int(zone_data["min"])}-{int(zone_data["max"])}', 
+                                  ha='center', va='center', fontweight='bold'))
         
         ax.set_xlim(0, max_hr + 20)
         ax.set_ylim(-0.5, len(zones) - 0.5)
@@ -190,9 +612,212 @@ class HeartRateAnalyzer:
         ax.set_yticks(range(len(zones)))
         ax.set_yticklabels(list(zones.keys()))
         ax.grid(True, alpha=0.3, axis='x')
+        return bars, labels
+    
+    def create_heart_rate_zones_chart(self, age):
+        """สร้างกราฟแสดงโซนการเต้นหัวใจ"""
+        import matplotlib.pyplot as plt
+        
+        fig, ax = plt.subplots(figsize=(12, 6))
+        self._draw_heart_rate_zones(ax, age)
         
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
+    
+    def render_heart_rate_zones_chart(self, age, path=None, format=None):
+        """วาดกราฟโซนการเต้นหัวใจโดยไม่ต้องมีหน้าจอ (สำหรับเซิร์ฟเวอร์ออกรายงาน)
+        
+        คืนข้อมูลรูปเป็น bytes (format: "png" หรือ "svg") หรือบันทึกลง path แล้วคืน path
+        ใช้แถบโซนชุดเดิมซ้ำทุกครั้ง ปรับเฉพาะตำแหน่ง ข้อความ และชื่อกราฟตามอายุ
+        """
+        template = getattr(self, "_zones_chart_template", None)
+        if template is None:
+            from matplotlib.figure import Figure
+            
+            from chart_rendering import ChartTemplate
+            
+            fig = Figure(figsize=(12, 6))
+            ax = fig.add_subplot()
+            bars, labels = self._draw_heart_rate_zones(ax, age)
+            fig.tight_layout()
+            template = self._zones_chart_template = (ChartTemplate(fig), ax, bars, labels)
+        chart, ax, bars, labels = template
+        
+        max_hr = 220 - age
+        zones = self._training_zones(max_hr)
+        for bar, label, (i, zone_data) in zip(bars, labels, enumerate(zones.values())):
+            bar.set_x(zone_data["min"])
+            bar.set_width(zone_data["max"] - zone_data["min"])
+            label.set_position(((zone_data["min"] + zone_data["max"]) / 2, i))
+            label.set_text(f'{int(zone_data["min"])}-{int(zone_data["max"])}')
+        ax.set_xlim(0, max_hr + 20)
+        ax.set_title(f'โซนการเต้นหัวใจสำหรับอายุ {age} ปี (Max HR: {max_hr})', fontsize=14, fontweight='bold')
+        return chart.render(path, format)
+
+class _RollingWindow:
+    """สถิติของ n ค่าล่าสุด: ผลรวม, min/max ด้วย monotonic deque และฮิสโตแกรมของค่า (ครั้ง/นาที)"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.total = 0
+        self.count = 0
+        self.minimums = deque()   # (ลำดับ, ค่า) ที่ค่าเพิ่มขึ้นเรื่อยๆ ตัวหน้าสุดคือค่าต่ำสุด
+        self.maximums = deque()   # (ลำดับ, ค่า) ที่ค่าลดลงเรื่อยๆ ตัวหน้าสุดคือค่าสูงสุด
+        self.histogram = [0] * (HeartRateMonitor.MAX_BPM + 1)
+    
+    def push(self, seq, value, bucket, expired):
+        """เพิ่มค่าลำดับที่ seq และนำค่าที่หลุดจากหน้าต่าง (expired = (ค่า, ช่อง) หรือ None) ออก"""
+        if expired is not None:
+            self.total -= expired[0]
+            self.histogram[expired[1]] -= 1
+        else:
+            self.count += 1
+        self.total += value
+        self.histogram[bucket] += 1
+        
+        oldest = seq - self.size
+        minimums = self.minimums
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        minimums.append((seq, value))
+        if minimums[0][0] <= oldest:
+            minimums.popleft()
+        maximums = self.maximums
+        while maximums and maximums[-1][1] <= value:
+            maximums.pop()
+        maximums.append((seq, value))
+        if maximums[0][0] <= oldest:
+            maximums.popleft()
+    
+    def kth(self, k):
+        """ค่าลำดับที่ k (เริ่มจาก 0) เมื่อเรียงค่าในหน้าต่างจากน้อยไปมาก (ปัดเป็นจำนวนเต็ม)"""
+        seen = 0
+        for bpm, frequency in enumerate(self.histogram):
+            seen += frequency
+            if seen > k:
+                return bpm
+        raise IndexError(k)
+
+
+class HeartRateMonitor:
+    """ติดตามอัตราการเต้นหัวใจแบบต่อเนื่อง: รับค่าทีละค่า (หรือทีละชุดเล็กๆ) จากอุปกรณ์สวมใส่
+    
+    เก็บค่าล่าสุดใน ring buffer ขนาดคงที่ (เท่าหน้าต่างที่ใหญ่ที่สุด) และสถิติของแต่ละหน้าต่าง
+    (นับเป็นจำนวนค่า เช่นที่ 1 Hz หน้าต่าง 60 = 1 นาที) แบบปรับทีละค่า
+    งานต่อหนึ่งค่าและหน่วยความจำจึงคงที่ ไม่ว่าจะรับข้อมูลต่อเนื่องนานเท่าใด
+    
+    สถานะ (ช้ามาก ... เร็วมาก) คำนวณจากค่าเฉลี่ยของ status_window (ค่าเริ่มต้น: หน้าต่างที่เล็กที่สุด)
+    ตามเกณฑ์เดียวกับ analyze_heart_rate และแจ้งเมื่อสถานะเปลี่ยน
+    """
+    
+    MAX_BPM = 300   # ค่าที่เกินช่วง 0-300 จะถูกนับในช่องปลายสุดของฮิสโตแกรม (ใช้กับ percentile เท่านั้น)
+    
+    def __init__(self, analyzer, age, activity_level="resting", windows=(60, 300, 3600), status_window=None):
+        if not windows or min(windows) < 1:
+            raise ValueError("windows ต้องมีอย่างน้อย 1 ขนาด และแต่ละขนาดต้องมีค่าอย่างน้อย 1")
+        self.analyzer = analyzer
+        self.age = age
+        self.activity_level = activity_level
+        self.normal_range = analyzer.heart_rate_zones[analyzer.get_age_group(age)][activity_level]
+        self.windows = sorted(set(windows))
+        self.status_window = status_window if status_window is not None else self.windows[0]
+        if self.status_window not in self.windows:
+            raise ValueError(f"status_window ({self.status_window}) ต้องเป็นหนึ่งใน windows")
+        
+        self._capacity = self.windows[-1]
+        self._values = [0] * self._capacity    # ring buffer ของค่าล่าสุด
+        self._buckets = [0] * self._capacity   # ช่องฮิสโตแกรมของแต่ละค่าใน ring buffer
+        self._seq = 0                          # จำนวนค่าที่รับมาทั้งหมด
+        self._stats = {size: _RollingWindow(size) for size in self.windows}
+        self.status = None
+        self.last_timestamp = None
+    
+    def add(self, heart_rate, timestamp=None):
+        """รับค่าใหม่หนึ่งค่า คืน (timestamp, สถานะเดิม, สถานะใหม่) เมื่อสถานะเปลี่ยน หรือ None"""
+        seq = self._seq
+        slot = seq % self._capacity
+        bucket = min(max(int(round(heart_rate)), 0), self.MAX_BPM)
+        values = self._values
+        buckets = self._buckets
+        for size, window in self._stats.items():
+            # ค่าที่หลุดจากหน้าต่างขนาด size คือค่าลำดับ seq - size (ยังอยู่ใน ring buffer)
+            if seq >= size:
+                old = (seq - size) % self._capacity
+                expired = (values[old], buckets[old])
+            else:
+                expired = None
+            window.push(seq, heart_rate, bucket, expired)
+        values[slot] = heart_rate
+        buckets[slot] = bucket
+        self._seq = seq + 1
+        self.last_timestamp = timestamp
+        
+        window = self._stats[self.status_window]
+        status = self.analyzer.classify_heart_rate(window.total / window.count, self.normal_range)
+        if status == self.status:
+            return None
+        previous, self.status = self.status, status
+        return (timestamp, previous, status)
+    
+    def extend(self, heart_rates, timestamps=None):
+        """รับค่าหลายค่าตามลำดับ คืนรายการการเปลี่ยนสถานะที่เกิดขึ้น"""
+        if timestamps is None:
+            timestamps = [None] * len(heart_rates)
+        transitions = []
+        for heart_rate, timestamp in zip(heart_rates, timestamps):
+            transition = self.add(heart_rate, timestamp)
+            if transition is not None:
+                transitions.append(transition)
+        return transitions
+    
+    def __len__(self):
+        return self._seq
+    
+    def _window(self, window):
+        if window is None:
+            window = self.status_window
+        if window not in self._stats:
+            raise ValueError(f"ไม่มีหน้าต่างขนาด {window} (มี {self.windows})")
+        return self._stats[window]
+    
+    def mean(self, window=None):
+        stats = self._window(window)
+        return stats.total / stats.count if stats.count else None
+    
+    def min(self, window=None):
+        stats = self._window(window)
+        return stats.minimums[0][1] if stats.count else None
+    
+    def max(self, window=None):
+        stats = self._window(window)
+        return stats.maximums[0][1] if stats.count else None
+    
+    def percentile(self, q, window=None):
+        """เปอร์เซ็นไทล์ที่ q (0-100) ของหน้าต่าง แบบ linear เหมือน np.percentile บนค่าที่ปัดเป็นจำนวนเต็ม"""
+        stats = self._window(window)
+        if not stats.count:
+            return None
+        position = q / 100 * (stats.count - 1)
+        lower = int(position)
+        value = stats.kth(lower)
+        if position == lower:
+            return float(value)
+        return value + (position - lower) * (stats.kth(lower + 1) - value)
+    
+    def summary(self, window=None, percentiles=(5, 50, 95)):
+        """สรุปสถิติของหน้าต่าง: จำนวนค่า ค่าเฉลี่ย ต่ำสุด สูงสุด เปอร์เซ็นไทล์ และสถานะปัจจุบัน"""
+        stats = self._window(window)
+        return {
+            "window": stats.size,
+            "count": stats.count,
+            "mean": self.mean(stats.size),
+            "min": self.min(stats.size),
+            "max": self.max(stats.size),
+            "percentiles": {q: self.percentile(q, stats.size) for q in percentiles},
+            "status": self.status
+        }
+
 
 def main():
     print("\n❤️  เครื่องวิเคราะห์อัตราการเต้นหัวใจ (Heart Rate Analyzer)")
@@ -253,9 +878,9 @@ def main():
             times, heart_rates = analyzer.generate_sample_data()
             
             # สถิติเบื้องต้น
-            avg_hr = np.mean(heart_rates)
-            min_hr = np.min(heart_rates)
-            max_hr = np.max(heart_rates)
+            avg_hr = sum(heart_rates) / len(heart_rates)
+            min_hr = min(heart_rates)
+            max_hr = max(heart_rates)
             
             print(f"\n📊 สถิติในช่วง 24 ชั่วโมง:")
             print(f"   ค่าเฉลี่ย: {avg_hr:.1f} ครั้ง/นาที")
@@ -281,5 +906,18 @@ def main():
     except Exception as e:
         print(f"❌ เกิดข้อผิดพลาด: {e}")
 
+def batch_main(argv=None):
+    """โหมด batch: อ่านคำขอ JSONL ({"heart_rate": 72, "age": 30, "activity_level": "resting"})
+    แล้วเขียนผลของ analyze_heart_rate เป็น JSONL (ดู jsonl_batch)"""
+    from jsonl_batch import batch_main as run
+    
+    def make_handler(args):
+        analyzer = HeartRateAnalyzer()
+        return lambda records: analyzer.analyze_records(records, as_json=True)
+    
+    return run(make_handler, argv, description="วิเคราะห์อัตราการเต้นหัวใจจากคำขอ JSONL")
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch_main(sys.argv[2:]))
     main()
\ No newline at end of file
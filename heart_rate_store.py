@@ -0,0 +1,413 @@
+"""
+ที่เก็บข้อมูลอัตราการเต้นหัวใจแบบคอลัมน์ (Heart Rate Store) สำหรับข้อมูลของ HeartRateAnalyzer
+เก็บข้อมูลของผู้ป่วยแต่ละคนเป็นไฟล์ segment ที่เขียนต่อท้ายอย่างเดียว (append-only)
+อ่านแบบ memory-map: การค้นหาตามช่วงเวลาได้ array ที่ชี้ไปยังไฟล์โดยตรง ไม่คัดลอกข้อมูล
+
+โครงสร้างไดเรกทอรี:
+    <root>/<รหัสผู้ป่วย>/<เวลาแรก>-<ลำดับ>.hrs
+
+โครงสร้างไฟล์ segment (.hrs):
+    MAGIC (4 ไบต์) | ความยาว header (uint32) | header JSON | ส่วนข้อมูลแต่ละส่วน (จัดแนว 8 ไบต์)
+
+header เก็บจำนวนค่า เวลาแรก/สุดท้าย และสรุป min/max/ผลรวมของทั้ง segment
+ส่วนข้อมูลเป็นอาร์เรย์ little-endian:
+    timestamps              epoch วินาที (int64) เรียงจากน้อยไปมาก
+    heart_rates             ครั้ง/นาที (uint8 ถ้าทุกค่า <= 255 ไม่เช่นนั้น uint16)
+    block_first             เวลาแรกของทุกๆ block_size ค่า (ดัชนีเวลาแบบ sparse)
+    block_min/max/sum       สรุปของแต่ละ block สำหรับคำถามแบบหยาบที่ไม่ต้องอ่านค่าดิบ
+
+ตัวอย่างการใช้งาน:
+    store = HeartRateStore("hr_data")
+    store.append("HN001", timestamps, heart_rates)
+    timestamps, heart_rates = store.query("HN001", datetime(2026, 10, 13, 2), datetime(2026, 10, 13, 4))
+    python heart_rate_store.py info hr_data
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b"HRS1"
+FORMAT_VERSION = 1
+SEGMENT_EXTENSION = ".hrs"
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _as_epoch(value):
+    """แปลงเวลา (datetime หรือ epoch วินาที) เป็น epoch วินาที"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _as_epoch_array(times):
+    """แปลงรายการเวลา (list ของ datetime หรือ array ของ epoch วินาที) เป็น int64 array"""
+    times = np.asarray(times)
+    if times.dtype.kind == "O":
+        return np.array([t.timestamp() for t in times.tolist()], dtype=np.int64)
+    if times.dtype.kind == "M":
+        return times.astype("datetime64[s]").astype(np.int64)
+    return times.astype(np.int64, copy=False)
+
+
+def encode_segment(timestamps, heart_rates, seq=0, block_size=4096):
+    """สร้างไฟล์ segment เป็น bytes จาก timestamps (int64 เรียงแล้ว) และ heart_rates"""
+    timestamps = np.ascontiguousarray(timestamps, dtype="<i8")
+    heart_rates = np.asarray(heart_rates)
+    count = len(timestamps)
+    if count == 0 or count != len(heart_rates):
+        raise ValueError("timestamps และ heart_rates ต้องมีจำนวนเท่ากันและไม่ว่าง")
+    if count > 1 and (np.diff(timestamps) < 0).any():
+        raise ValueError("timestamps ต้องเรียงจากน้อยไปมาก")
+    low, high = int(heart_rates.min()), int(heart_rates.max())
+    if low < 0 or high > 65535:
+        raise ValueError("อัตราการเต้นหัวใจต้องอยู่ในช่วง 0-65535")
+    heart_rates = np.ascontiguousarray(heart_rates, dtype="<u1" if high <= 255 else "<u2")
+
+    starts = np.arange(0, count, block_size)
+    sections = {
+        "timestamps": timestamps,
+        "heart_rates": heart_rates,
+        "block_first": timestamps[starts],
+        "block_min": np.minimum.reduceat(heart_rates, starts).astype("<u2"),
+        "block_max": np.maximum.reduceat(heart_rates, starts).astype("<u2"),
+        "block_sum": np.add.reduceat(heart_rates, starts, dtype=np.int64).astype("<i8"),
+    }
+
+    # ตำแหน่งของแต่ละส่วนนับจากจุดเริ่มส่วนข้อมูล (ถัดจาก header) และจัดแนวทีละ 8 ไบต์
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data), data.dtype.str]
+        offset += _align(data.nbytes)
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "seq": seq,
+        "count": count,
+        "first": int(timestamps[0]),
+        "last": int(timestamps[-1]),
+        "min": low,
+        "max": high,
+        "sum": int(sections["block_sum"].sum()),
+        "block_size": block_size,
+        "sections": layout
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+
+    parts = [prefix, b"\0" * (_align(len(prefix)) - len(prefix))]
+    for data in sections.values():
+        raw = data.tobytes()
+        parts.append(raw)
+        parts.append(b"\0" * (_align(len(raw)) - len(raw)))
+    return b"".join(parts)
+
+
+class HeartRateSegment:
+    """ไฟล์ segment หนึ่งไฟล์ อ่านข้อมูลตรงจาก buffer (bytes หรือ mmap) โดยไม่คัดลอก"""
+
+    def __init__(self, buffer, path=None):
+        if bytes(buffer[:4]) != MAGIC:
+            raise ValueError("ไม่ใช่ไฟล์ข้อมูลอัตราการเต้นหัวใจ (.hrs)")
+        (header_len,) = struct.unpack_from("<I", buffer, 4)
+        header = json.loads(bytes(buffer[8:8 + header_len]).decode("utf-8"))
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"ไม่รองรับรูปแบบไฟล์เวอร์ชัน {header['format']}")
+
+        self.path = path
+        self.seq = header["seq"]
+        self.count = header["count"]
+        self.first = header["first"]
+        self.last = header["last"]
+        self.min = header["min"]
+        self.max = header["max"]
+        self.sum = header["sum"]
+        self.block_size = header["block_size"]
+        self._buffer = buffer
+
+        data_start = _align(8 + header_len)
+        self._sections = list(header["sections"])
+        for name, (offset, count, dtype) in header["sections"].items():
+            section = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + offset)
+            setattr(self, name, section)
+
+    @classmethod
+    def open(cls, path):
+        """เปิดไฟล์ segment แบบ memory-map (หน้าหน่วยความจำถูกอ่านจากดิสก์เมื่อใช้จริงเท่านั้น)"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def close(self):
+        """ปิด memory-map ของไฟล์ (ค่าสรุปจาก header ยังใช้ได้ แต่อ่านค่าดิบไม่ได้อีก)
+
+        array ที่ได้จาก slice()/query() ซึ่งผู้เรียกยังถืออยู่ยังอ่านได้ ไฟล์จะถูกปิดเมื่อ array เหล่านั้นถูกทิ้ง
+        """
+        for name in self._sections:
+            setattr(self, name, None)
+        close = getattr(self._buffer, "close", None)
+        if close is not None:
+            try:
+                close()
+            except BufferError:
+                pass
+        self._buffer = None
+
+    @property
+    def mean(self):
+        return self.sum / self.count
+
+    def locate(self, start=None, end=None):
+        """ช่วงตำแหน่ง [i, j) ของค่าที่มีเวลาใน [start, end) ค้นผ่านดัชนี block ก่อน
+        แล้วจึงค้นใน timestamps เฉพาะ block ที่เกี่ยวข้อง"""
+        return self._position(start, 0), self._position(end, self.count)
+
+    def _position(self, t, default):
+        if t is None:
+            return default
+        if t <= self.first:
+            return 0
+        if t > self.last:
+            return self.count
+        block = int(np.searchsorted(self.block_first, t, side="left")) - 1
+        lo = max(block, 0) * self.block_size
+        hi = min(lo + self.block_size, self.count)
+        return lo + int(np.searchsorted(self.timestamps[lo:hi], t, side="left"))
+
+    def slice(self, start=None, end=None):
+        """(timestamps, heart_rates) ในช่วง [start, end) เป็น view ของไฟล์ ไม่คัดลอกข้อมูล"""
+        i, j = self.locate(start, end)
+        return self.timestamps[i:j], self.heart_rates[i:j]
+
+
+def _combine(stats):
+    """รวมสรุป (count, min, max, sum) หลายชุดเป็น dict สรุปเดียว"""
+    count = sum(s[0] for s in stats)
+    if not count:
+        return {"count": 0, "min": None, "max": None, "mean": None}
+    return {
+        "count": count,
+        "min": min(s[1] for s in stats if s[0]),
+        "max": max(s[2] for s in stats if s[0]),
+        "mean": sum(s[3] for s in stats) / count
+    }
+
+
+def _raw_stats(heart_rates):
+    if not len(heart_rates):
+        return (0, 0, 0, 0)
+    return (len(heart_rates), int(heart_rates.min()), int(heart_rates.max()),
+            int(heart_rates.sum(dtype=np.int64)))
+
+
+class HeartRateStore:
+    """ที่เก็บข้อมูลอัตราการเต้นหัวใจของผู้ป่วยหลายคน ในไดเรกทอรี root
+
+    ผู้เขียนได้ทีละหนึ่งโปรเซส ผู้อ่านหลายโปรเซสเห็นเฉพาะไฟล์ที่เขียนเสร็จแล้ว
+    (เรียก refresh() เพื่อเห็น segment ใหม่ที่โปรเซสอื่นเพิ่มเข้ามา)
+
+    แต่ละ segment ที่เปิดอยู่ใช้ file descriptor หนึ่งตัว จึงเปิดค้างไว้ไม่เกิน max_open_segments ไฟล์
+    (LRU ตามผู้ป่วย ผู้ป่วยที่ไม่ได้ใช้นานที่สุดถูกปิดก่อน และเปิดใหม่เมื่อใช้อีกครั้ง)
+    """
+
+    def __init__(self, root, segment_size=1 << 20, block_size=4096, max_open_segments=128):
+        self.root = root
+        self.segment_size = segment_size
+        self.block_size = block_size
+        self.max_open_segments = max_open_segments
+        self._segments = OrderedDict()   # รหัสผู้ป่วย -> segment เรียงตามเวลา (ลำดับการใช้ล่าสุด)
+        self._open_segments = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _patient_dir(self, patient):
+        patient = str(patient)
+        if not patient or patient in (".", "..") or os.sep in patient or (os.altsep and os.altsep in patient):
+            raise ValueError(f"รหัสผู้ป่วยไม่ถูกต้อง: {patient!r}")
+        return os.path.join(self.root, patient)
+
+    def patients(self):
+        """รหัสผู้ป่วยทั้งหมดในที่เก็บ"""
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def segments(self, patient):
+        """segment ทั้งหมดของผู้ป่วย เรียงตามเวลา (เปิดแบบ memory-map ครั้งแรกที่ใช้)"""
+        patient = str(patient)
+        segments = self._segments.get(patient)
+        if segments is not None:
+            self._segments.move_to_end(patient)
+        else:
+            directory = self._patient_dir(patient)
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            segments = [HeartRateSegment.open(os.path.join(directory, name))
+                        for name in names if name.endswith(SEGMENT_EXTENSION)]
+            segments.sort(key=lambda segment: (segment.first, segment.seq))
+            self._segments[patient] = segments
+            self._open_segments += len(segments)
+            # ปิดผู้ป่วยที่ไม่ได้ใช้นานที่สุด (ไม่ปิดผู้ป่วยที่เพิ่งเปิด แม้มี segment เกินจำนวนที่กำหนด)
+            while self._open_segments > self.max_open_segments and len(self._segments) > 1:
+                self._close(self._segments.popitem(last=False)[1])
+        return segments
+
+    def _close(self, segments):
+        for segment in segments:
+            segment.close()
+        self._open_segments -= len(segments)
+
+    def refresh(self, patient=None):
+        """อ่านรายการ segment จากดิสก์ใหม่ (ของผู้ป่วยคนเดียว หรือทุกคนถ้าไม่ระบุ)"""
+        if patient is None:
+            while self._segments:
+                self._close(self._segments.popitem()[1])
+        else:
+            self._close(self._segments.pop(str(patient), []))
+
+    def close(self):
+        """ปิดทุก segment ที่เปิดอยู่"""
+        self.refresh()
+
+    def append(self, patient, timestamps, heart_rates):
+        """เพิ่มข้อมูลต่อท้าย (เวลาต้องเรียงและไม่ย้อนหลังข้อมูลเดิม) คืนจำนวน segment ที่เขียน
+
+        timestamps เป็น epoch วินาทีหรือ list ของ datetime (เช่นจาก generate_sample_data)
+        ข้อมูลยาวจะถูกแบ่งเป็นหลาย segment ละไม่เกิน segment_size ค่า
+        แต่ละไฟล์เขียนเป็นไฟล์ชั่วคราวแล้วแทนที่ในครั้งเดียว ผู้อ่านจึงไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+        """
+        timestamps = _as_epoch_array(timestamps)
+        heart_rates = np.asarray(heart_rates)
+        if len(timestamps) != len(heart_rates):
+            raise ValueError("timestamps และ heart_rates ต้องมีจำนวนเท่ากัน")
+        if not len(timestamps):
+            return 0
+        if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+            raise ValueError("timestamps ต้องเรียงจากน้อยไปมาก")
+        self.refresh(patient)
+        existing = self.segments(patient)
+        if existing and timestamps[0] < existing[-1].last:
+            raise ValueError("ข้อมูลใหม่ต้องมีเวลาไม่ก่อนข้อมูลล่าสุดที่เก็บไว้ (append-only)")
+
+        directory = self._patient_dir(patient)
+        os.makedirs(directory, exist_ok=True)
+        seq = max((segment.seq for segment in existing), default=-1) + 1
+        written = 0
+        for i in range(0, len(timestamps), self.segment_size):
+            blob = encode_segment(timestamps[i:i + self.segment_size],
+                                  heart_rates[i:i + self.segment_size], seq, self.block_size)
+            first = int(timestamps[i])
+            path = os.path.join(directory, f"{first:020d}-{seq:06d}{SEGMENT_EXTENSION}")
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            seq += 1
+            written += 1
+        self.refresh(patient)
+        return written
+
+    def _overlapping(self, patient, start, end):
+        start = None if start is None else _as_epoch(start)
+        end = None if end is None else _as_epoch(end)
+        for segment in self.segments(patient):
+            if (end is None or segment.first < end) and (start is None or segment.last >= start):
+                yield segment, start, end
+
+    def iter_query(self, patient, start=None, end=None):
+        """ให้ผล (timestamps, heart_rates) ของแต่ละ segment ในช่วง [start, end) เป็น view ไม่คัดลอก"""
+        for segment, start_s, end_s in self._overlapping(patient, start, end):
+            timestamps, heart_rates = segment.slice(start_s, end_s)
+            if len(timestamps):
+                yield timestamps, heart_rates
+
+    def query(self, patient, start=None, end=None):
+        """(timestamps, heart_rates) ทั้งหมดในช่วง [start, end) (start/end เป็น datetime หรือ epoch วินาที)
+
+        ถ้าช่วงอยู่ใน segment เดียวจะได้ view ของไฟล์โดยตรง หากคร่อมหลาย segment จะต่อกันเป็น array ใหม่
+        """
+        parts = list(self.iter_query(patient, start, end))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint16)
+        if len(parts) == 1:
+            return parts[0]
+        return (np.concatenate([timestamps for timestamps, _ in parts]),
+                np.concatenate([heart_rates for _, heart_rates in parts]))
+
+    def summary(self, patient, start=None, end=None):
+        """สรุป count/min/max/mean ในช่วง [start, end)
+
+        segment และ block ที่อยู่ในช่วงทั้งหมดใช้สรุปที่คำนวณไว้แล้ว
+        อ่านค่าดิบเฉพาะ block ที่ขอบของช่วงเท่านั้น
+        """
+        stats = []
+        for segment, start_s, end_s in self._overlapping(patient, start, end):
+            i, j = segment.locate(start_s, end_s)
+            if i == 0 and j == segment.count:
+                stats.append((segment.count, segment.min, segment.max, segment.sum))
+                continue
+            size = segment.block_size
+            first_block = -(-i // size)       # block แรกที่อยู่ในช่วงทั้ง block
+            # block ถัดจาก block สุดท้ายที่อยู่ในช่วงทั้ง block (block ท้าย segment นับว่าครบเสมอ)
+            last_block = len(segment.block_first) if j == segment.count else j // size
+            if first_block >= last_block:
+                stats.append(_raw_stats(segment.heart_rates[i:j]))
+                continue
+            stats.append(_raw_stats(segment.heart_rates[i:first_block * size]))
+            stats.append(_raw_stats(segment.heart_rates[last_block * size:j]))
+            blocks = slice(first_block, last_block)
+            stats.append((min(last_block * size, segment.count) - first_block * size,
+                          int(segment.block_min[blocks].min()), int(segment.block_max[blocks].max()),
+                          int(segment.block_sum[blocks].sum())))
+        return _combine(stats)
+
+    def segment_summaries(self, patient, start=None, end=None):
+        """สรุปของแต่ละ segment ที่คาบเกี่ยวกับช่วง (จาก header อย่างเดียว ไม่อ่านค่าดิบ)"""
+        return [{"first": segment.first, "last": segment.last, "count": segment.count,
+                 "min": segment.min, "max": segment.max, "mean": segment.mean}
+                for segment, _, _ in self._overlapping(patient, start, end)]
+
+
+def _parse_time(text):
+    """รับเวลาแบบ ISO (2026-10-13T02:00) หรือ epoch วินาที"""
+    try:
+        return int(text)
+    except ValueError:
+        return datetime.fromisoformat(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ที่เก็บข้อมูลอัตราการเต้นหัวใจแบบคอลัมน์")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info_parser = subparsers.add_parser("info", help="แสดงผู้ป่วยและ segment ในที่เก็บ")
+    info_parser.add_argument("root")
+    query_parser = subparsers.add_parser("query", help="สรุปข้อมูลของผู้ป่วยในช่วงเวลา")
+    query_parser.add_argument("root")
+    query_parser.add_argument("patient")
+    query_parser.add_argument("--start", type=_parse_time)
+    query_parser.add_argument("--end", type=_parse_time)
+    args = parser.parse_args()
+
+    store = HeartRateStore(args.root)
+    if args.command == "info":
+        for patient in store.patients():
+            segments = store.segments(patient)
+            count = sum(segment.count for segment in segments)
+            size = sum(os.path.getsize(segment.path) for segment in segments)
+            print(f"👤 {patient}: {len(segments)} segment, {count:,} ค่า, {size / 1e6:.1f} MB")
+    else:
+        result = store.summary(args.patient, args.start, args.end)
+        if not result["count"]:
+            print("ไม่พบข้อมูลในช่วงเวลาที่ระบุ")
+            return
+        print(f"📊 {args.patient}: {result['count']:,} ค่า, เฉลี่ย {result['mean']:.1f}, "
+              f"ต่ำสุด {result['min']}, สูงสุด {result['max']} ครั้ง/นาที")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+สถิติแบบหน้าต่างเลื่อนและความแปรปรวนของอัตราการเต้นหัวใจ (Heart Rate Variability, HRV)
+ใช้คู่กับข้อมูลของ HeartRateAnalyzer / HeartRateStore สำหรับข้อมูลยาวของผู้ป่วยจำนวนมาก
+
+ทุกฟังก์ชันทำงานแบบ vectorized ในรอบเดียวบนข้อมูล:
+    - ค่าเฉลี่ย/ส่วนเบี่ยงเบน/SDNN/RMSSD/pNN50 ใช้ผลรวมสะสม (cumulative sum) งานจึงไม่ขึ้นกับขนาดหน้าต่าง
+    - ค่าต่ำสุด/สูงสุดใช้วิธี van Herk/Gil-Werman (prefix/suffix ต่อ block) งานเป็นเชิงเส้นเช่นกัน
+    - กำลังของย่าน LF/HF ใช้ FFT ของหลายหน้าต่างพร้อมกัน (งาน ∝ จำนวนหน้าต่าง × window log window
+      จึงควรเลื่อนหน้าต่างทีละ step >= window / 2)
+iter_rolling_hrv รับข้อมูลทีละช่วง (เช่นจาก HeartRateStore.iter_query) สำหรับข้อมูลที่ใหญ่กว่าหน่วยความจำ
+
+หน่วย: ช่วงห่างระหว่างการเต้น (RR interval) เป็นมิลลิวินาที
+ข้อมูลอัตราการเต้นหัวใจ (ครั้ง/นาที) ที่วัดเป็นช่วงเวลาคงที่แปลงได้ด้วย heart_rate_to_rr
+(เป็นค่าประมาณ ค่า HRV ที่แม่นยำต้องใช้ RR ของการเต้นแต่ละครั้ง)
+ค่าที่หายไป (NaN เช่นจาก heart_rate_to_rr ของค่า <= 0) ถูกข้ามเฉพาะในหน้าต่างที่มีค่านั้น
+สถิติของหน้าต่างคำนวณจากค่าที่มีอยู่ (เหมือน np.nanmean/np.nanstd) ยกเว้นกำลังย่าน LF/HF ที่ได้ NaN
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ย่านความถี่มาตรฐานของ HRV (Hz)
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+# จำนวนค่าสูงสุดที่ FFT พร้อมกันในหนึ่งครั้ง (จำกัดหน่วยความจำของ array หน้าต่าง)
+_FFT_BATCH_VALUES = 1 << 22
+
+
+def heart_rate_to_rr(heart_rates):
+    """แปลงอัตราการเต้นหัวใจ (ครั้ง/นาที) เป็น RR interval (มิลลิวินาที) ค่า <= 0 ได้ NaN"""
+    heart_rates = np.asarray(heart_rates, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(heart_rates > 0, 60000 / heart_rates, np.nan)
+
+
+def resample_rr(rr, fs=4.0):
+    """แปลง RR ของการเต้นแต่ละครั้งเป็นข้อมูลที่สุ่มตัวอย่างสม่ำเสมอ fs Hz (interpolate เชิงเส้น)
+    สำหรับการวิเคราะห์ย่านความถี่"""
+    rr = np.asarray(rr, dtype=np.float64)
+    beat_times = np.cumsum(rr) / 1000
+    grid = np.arange(beat_times[0], beat_times[-1], 1 / fs)
+    return np.interp(grid, beat_times, rr)
+
+
+def _window_starts(n, window, step):
+    if window < 2:
+        raise ValueError("window ต้องมีค่าอย่างน้อย 2")
+    return np.arange(0, max(n - window + 1, 0), step, dtype=np.int64)
+
+
+def _window_sums(values, starts, window):
+    """ผลรวมของ values[s:s + window] ทุก s ใน starts ด้วยผลรวมสะสม (values ต้องไม่มี NaN)"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return cumulative[starts + window] - cumulative[starts]
+
+
+def _valid_window_sums(values, valid, starts, window):
+    """(ผลรวม, จำนวน) ของค่าที่ valid ในแต่ละหน้าต่าง ค่าที่ไม่ valid นับเป็น 0
+    ผลรวมสะสมจึงไม่ถูก NaN ตัวเดียวทำให้ทุกหน้าต่างถัดไปเป็น NaN"""
+    return (_window_sums(np.where(valid, values, 0.0), starts, window),
+            _window_sums(valid, starts, window))
+
+
+def rolling_extreme(values, window, func=np.minimum):
+    """ค่าต่ำสุด (func=np.minimum) หรือสูงสุด (np.maximum) ของทุกหน้าต่างที่เริ่มที่ 0 .. n - window
+
+    van Herk/Gil-Werman: แบ่งข้อมูลเป็น block ละ window ค่า คำนวณค่าสะสมจากซ้ายและจากขวาใน block
+    ค่าของหน้าต่างใดๆ คือ func(สะสมจากขวาที่จุดเริ่ม, สะสมจากซ้ายที่จุดสุดท้าย)
+    ค่า NaN ถูกข้าม (เหมือน np.nanmin/np.nanmax) หน้าต่างที่เป็น NaN ทั้งหมดได้ NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < window:
+        return np.empty(0)
+    blocks = -(-n // window)
+    fill = np.inf if func is np.minimum else -np.inf
+    missing = np.isnan(values)
+    padded = np.full(blocks * window, fill)
+    padded[:n] = np.where(missing, fill, values)
+    padded = padded.reshape(blocks, window)
+    prefix = func.accumulate(padded, axis=1).ravel()
+    suffix = func.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    count = n - window + 1
+    result = func(suffix[:count], prefix[window - 1:window - 1 + count])
+    if missing.any():
+        empty = _window_sums(~missing, np.arange(count), window) == 0
+        result[empty] = np.nan
+    return result
+
+
+def rolling_stats(values, window, step=1):
+    """สถิติของหน้าต่างเลื่อน คืน dict ของ array: start, mean, std, min, max (std แบบ ddof=1)
+
+    ค่าที่ไม่ใช่ตัวเลขจำกัด (NaN) ถูกข้าม: หน้าต่างที่ไม่มีค่าเลยได้ NaN และ std ต้องมีอย่างน้อย 2 ค่า
+    """
+    values = np.asarray(values, dtype=np.float64)
+    starts = _window_starts(len(values), window, step)
+    valid = np.isfinite(values)
+    # เลื่อนค่าด้วยค่าอ้างอิง (ค่าแรกที่มีอยู่) ก่อนหาผลรวมกำลังสอง ลดความคลาดเคลื่อนจากการลบเลขใหญ่
+    reference = values[np.argmax(valid)] if valid.any() else 0.0
+    shifted = values - reference
+    sums, counts = _valid_window_sums(shifted, valid, starts, window)
+    squares, _ = _valid_window_sums(shifted * shifted, valid, starts, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sums / counts
+        variance = np.maximum(squares - sums * mean, 0) / (counts - 1)
+    variance[counts < 2] = np.nan
+    return {
+        "start": starts,
+        "mean": mean + reference,
+        "std": np.sqrt(variance),
+        "min": rolling_extreme(values, window, np.minimum)[::step][:len(starts)],
+        "max": rolling_extreme(values, window, np.maximum)[::step][:len(starts)]
+    }
+
+
+def band_powers(rr, fs, window, step, bands=(LF_BAND, HF_BAND)):
+    """กำลังของแต่ละย่านความถี่ (ms²) ของทุกหน้าต่าง จาก RR ที่สุ่มตัวอย่างสม่ำเสมอ fs Hz
+
+    แต่ละหน้าต่างถูกลบค่าเฉลี่ยและคูณ Hann window ก่อน FFT หลายหน้าต่างพร้อมกัน
+    หน้าต่างที่มี NaN ได้กำลังเป็น NaN (ไม่กระทบหน้าต่างอื่น)
+    คืน array รูปร่าง (จำนวนหน้าต่าง, จำนวนย่าน)
+    """
+    rr = np.asarray(rr, dtype=np.float64)
+    starts = _window_starts(len(rr), window, step)
+    powers = np.empty((len(starts), len(bands)))
+    if not len(starts):
+        return powers
+    windows = sliding_window_view(rr, window)[::step][:len(starts)]
+    taper = np.hanning(window)
+    scale = 2 / (fs * (taper * taper).sum())      # ความหนาแน่นสเปกตรัมด้านเดียว (ms²/Hz)
+    freqs = np.fft.rfftfreq(window, 1 / fs)
+    masks = [(freqs >= low) & (freqs < high) for low, high in bands]
+    resolution = fs / window
+
+    batch = max(1, _FFT_BATCH_VALUES // window)
+    for first in range(0, len(starts), batch):
+        segment = windows[first:first + batch]
+        detrended = (segment - segment.mean(axis=1, keepdims=True)) * taper
+        spectrum = np.abs(np.fft.rfft(detrended, axis=1)) ** 2 * scale
+        for i, mask in enumerate(masks):
+            powers[first:first + batch, i] = spectrum[:, mask].sum(axis=1) * resolution
+    return powers
+
+
+def rolling_hrv(rr, window, step=1, fs=None):
+    """HRV ของหน้าต่างเลื่อน (หน้าต่างละ window ค่า เลื่อนทีละ step) คืน dict ของ array:
+
+        start       ตำแหน่งเริ่มของหน้าต่าง
+        mean_rr     ค่าเฉลี่ย RR (ms) และ mean_hr อัตราการเต้นเฉลี่ย (ครั้ง/นาที)
+        sdnn        ส่วนเบี่ยงเบนมาตรฐานของ RR (ddof=1)
+        rmssd       รากที่สองของค่าเฉลี่ยผลต่างกำลังสองของ RR ที่ติดกัน (window - 1 คู่ ไม่นับคู่ที่มี NaN)
+        pnn50       ร้อยละของผลต่างที่มากกว่า 50 ms
+        lf, hf, lf_hf   กำลังย่าน LF/HF และอัตราส่วน (เฉพาะเมื่อระบุ fs ของข้อมูลที่สุ่มตัวอย่างสม่ำเสมอ)
+    """
+    rr = np.asarray(rr, dtype=np.float64)
+    stats = rolling_stats(rr, window, step)
+    starts = stats["start"]
+    differences = np.diff(rr)
+    valid = np.isfinite(differences)
+    squares, pairs = _valid_window_sums(differences * differences, valid, starts, window - 1)
+    large = _window_sums(valid & (np.abs(np.where(valid, differences, 0.0)) > 50), starts, window - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = {
+            "start": starts,
+            "mean_rr": stats["mean"],
+            "mean_hr": 60000 / stats["mean"],
+            "sdnn": stats["std"],
+            "rmssd": np.sqrt(squares / pairs),
+            "pnn50": large / pairs * 100
+        }
+    if fs is not None:
+        powers = band_powers(rr, fs, window, step)
+        result["lf"] = powers[:, 0]
+        result["hf"] = powers[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["lf_hf"] = powers[:, 0] / powers[:, 1]
+    return result
+
+
+def hrv_summary(rr, fs=None):
+    """HRV ของข้อมูลทั้งชุด (หน้าต่างเดียวครอบทั้งหมด) คืน dict ของค่าเดี่ยว"""
+    rr = np.asarray(rr, dtype=np.float64)
+    result = rolling_hrv(rr, len(rr), fs=fs)
+    return {name: float(values[0]) for name, values in result.items() if name != "start"}
+
+
+def iter_rolling_hrv(chunks, window, step=1, fs=None, heart_rates=False):
+    """rolling_hrv บนข้อมูลที่มาเป็นช่วงๆ (iterable ของ array) อ่านข้อมูลรอบเดียว
+
+    เก็บเฉพาะส่วนท้ายที่ยังไม่ครบหน้าต่างไว้ต่อกับช่วงถัดไป หน่วยความจำจึงเท่ากับหนึ่งช่วงบวกหนึ่งหน้าต่าง
+    ผลของแต่ละช่วงเหมือน rolling_hrv ของข้อมูลทั้งหมด (start นับจากต้นข้อมูลทั้งหมด)
+    heart_rates=True: ข้อมูลเป็นอัตราการเต้นหัวใจ (ครั้ง/นาที) ให้แปลงเป็น RR ก่อน
+    """
+    carry = np.empty(0)
+    offset = 0   # ตำแหน่งของ carry[0] ในข้อมูลทั้งหมด
+    skip = 0     # จำนวนค่าที่ต้องข้าม เมื่อหน้าต่างถัดไปเริ่มเลยข้อมูลที่มีอยู่ (step > window)
+    for chunk in chunks:
+        chunk = heart_rate_to_rr(chunk) if heart_rates else np.asarray(chunk, dtype=np.float64)
+        dropped = min(skip, len(chunk))
+        skip -= dropped
+        offset += dropped
+        values = np.concatenate((carry, chunk[dropped:]))
+        result = rolling_hrv(values, window, step, fs)
+        consumed = len(result["start"]) * step
+        result["start"] = result["start"] + offset
+        if len(result["start"]):
+            yield result
+        carry = values[consumed:]
+        skip += max(consumed - len(values), 0)
+        offset += min(consumed, len(values))
@@ -0,0 +1,77 @@
+"""
+รายงานเวลานำเข้าโมดูล (Import-time Report) สำหรับคุมเวลาเริ่มทำงานของงาน batch และ serverless
+
+วัดด้วย python -X importtime ในโปรเซสใหม่ทุกครั้ง (ไม่มีโมดูลค้างในหน่วยความจำ)
+แสดงเวลารวมของแต่ละโมดูลและโมดูลย่อยที่ใช้เวลามากที่สุด
+
+วิธีใช้:
+    python import_report.py bmi_calculator heart_rate_analyzer symptom_checker
+    python import_report.py bmi_calculator --budget 50      # exit code 1 ถ้าเกินงบ (มิลลิวินาที)
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _parse_importtime(stderr):
+    """แปลงผลของ -X importtime เป็นรายการ (ชื่อโมดูล, ระดับซ้อน, self us, cumulative us)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module, repeat=3):
+    """วัดเวลานำเข้า module ในโปรเซสใหม่ repeat ครั้ง คืน (เวลารวม us, รายการโมดูลย่อย) ของครั้งที่เร็วที่สุด
+
+    ใช้ครั้งที่เร็วที่สุดเพื่อตัดผลของการคอมไพล์ .pyc ครั้งแรกและสัญญาณรบกวนจากเครื่อง
+    """
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=_HERE, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"นำเข้า {module} ไม่สำเร็จ:\n{completed.stderr.strip()}")
+        entries = _parse_importtime(completed.stderr)
+        total = next((cumulative for name, depth, _, cumulative in entries
+                      if name == module and depth == 0), 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="รายงานเวลานำเข้าโมดูล")
+    parser.add_argument("modules", nargs="+", help="ชื่อโมดูลที่ต้องการวัด")
+    parser.add_argument("--top", type=int, default=10, help="จำนวนโมดูลย่อยที่ใช้เวลามากที่สุดที่จะแสดง")
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบที่วัด (ใช้ครั้งที่เร็วที่สุด)")
+    parser.add_argument("--budget", type=float, help="งบเวลานำเข้าต่อโมดูล (มิลลิวินาที)")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for module in args.modules:
+        total, entries = measure_import(module, args.repeat)
+        status = ""
+        if args.budget is not None:
+            within = total / 1000 <= args.budget
+            status = "  ✅ ภายในงบ" if within else f"  ❌ เกินงบ {args.budget:g} ms"
+            if not within:
+                over_budget.append(module)
+        print(f"\n📦 {module}: {total / 1000:.1f} ms{status}")
+        for name, depth, self_us, cumulative_us in sorted(entries, key=lambda e: -e[2])[:args.top]:
+            print(f"   {self_us / 1000:8.1f} ms  (รวม {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+เครื่องมือวัดการทำงาน (Instrumentation) ของ SymptomChecker, BMICalculator และ HeartRateAnalyzer
+
+enable() ครอบเมธอดหลักของทั้งสามคลาสด้วยตัววัด บันทึกต่อเมธอด:
+    - จำนวนครั้งที่เรียกและจำนวนครั้งที่เกิด exception
+    - ฮิสโตแกรมเวลาที่ใช้ (วินาที) และฮิสโตแกรมขนาดข้อมูลนำเข้า (จำนวนอาการ/จำนวนคน/จำนวนค่า)
+watch() เพิ่มแหล่งสถิติอื่น เช่น SymptomChecker.cache_info หรือ WardMonitor.stats (แคช/คิว)
+StageProfiler สุ่มดู stack ของเธรดที่กำลังวิเคราะห์เป็นระยะ เพื่อแยกเวลาตามขั้นตอนภายใน
+
+เมื่อ disable() (ค่าเริ่มต้น) เมธอดเดิมถูกคืนกลับทั้งหมด จึงไม่มีค่าใช้จ่ายใดๆ ระหว่างไม่ได้วัด
+
+ตัวอย่างการใช้งาน:
+    import instrumentation
+    instrumentation.enable()
+    instrumentation.watch("symptom_cache", checker.cache_info)
+    with instrumentation.StageProfiler():
+        checker.check_symptoms(["ไข้", "ไอ"])
+    print(instrumentation.to_prometheus())
+"""
+
+import bisect
+import functools
+import importlib
+import inspect
+import json
+import re
+import sys
+import threading
+import time
+import weakref
+
+# เมธอดที่วัด: (โมดูล, คลาส, เมธอด, ตำแหน่งอาร์กิวเมนต์ที่ใช้เป็นขนาดข้อมูล หรือ None)
+INSTRUMENTED_METHODS = (
+    ("symptom_checker", "SymptomChecker", "check_symptoms", 0),
+    ("symptom_checker", "SymptomChecker", "check_symptoms_batch", 0),
+    ("bmi_calculator", "BMICalculator", "analyze_health", None),
+    ("bmi_calculator", "BMICalculator", "analyze_health_arrays", 0),
+    ("bmi_calculator", "BMICalculator", "analyze_health_bulk", 0),
+    ("bmi_calculator", "BMICalculator", "render_bmi_chart", None),
+    ("heart_rate_analyzer", "HeartRateAnalyzer", "analyze_heart_rate", None),
+    ("heart_rate_analyzer", "HeartRateAnalyzer", "analyze_heart_rate_arrays", 0),
+    ("heart_rate_analyzer", "HeartRateAnalyzer", "generate_sample_data", None),
+    ("heart_rate_analyzer", "HeartRateAnalyzer", "render_heart_rate_trend", 1),
+    ("heart_rate_analyzer", "HeartRateAnalyzer", "render_heart_rate_zones_chart", None),
+)
+
+# ขอบบนของช่องฮิสโตแกรม (แบบ Prometheus: ช่อง le รวมค่าที่ <= ขอบ และช่องสุดท้ายคือ +Inf)
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# โมดูลของโปรเจกต์ที่ StageProfiler ใช้ระบุขั้นตอน (เฟรมของไลบรารีอื่นนับรวมกับเฟรมของโปรเจกต์ที่เรียก)
+PROJECT_MODULES = ("symptom_checker", "knowledge_base", "symptom_lookup", "bmi_calculator",
+                   "heart_rate_analyzer", "chart_rendering")
+
+_lock = threading.Lock()
+_originals = {}      # (คลาส, ชื่อเมธอด) -> ฟังก์ชันเดิม
+_stats = {}          # "คลาส.เมธอด" -> MethodStats
+_sources = {}        # ชื่อ -> ฟังก์ชัน (หรือ weakref ของเมธอด) ที่คืน dict ของตัวเลข
+_active = {}         # thread id -> ชื่อเมธอดนอกสุดที่กำลังทำงาน (ให้ StageProfiler อ่าน)
+_stage_seconds = {}  # (เมธอด, ขั้นตอน) -> เวลาโดยประมาณจากการสุ่ม (วินาที)
+
+
+class MethodStats:
+    """สถิติของเมธอดหนึ่งเมธอด"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.size_sum = 0
+        self.size_count = 0
+        self.size_counts = [0] * (len(SIZE_BUCKETS) + 1)
+
+    def record(self, seconds, size, failed):
+        self.calls += 1
+        self.errors += failed
+        self.latency_sum += seconds
+        self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        if size is not None:
+            self.size_sum += size
+            self.size_count += 1
+            self.size_counts[bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency": {"sum": self.latency_sum, "buckets": _cumulative(LATENCY_BUCKETS, self.latency_counts)},
+            "input_size": {"sum": self.size_sum, "count": self.size_count,
+                           "buckets": _cumulative(SIZE_BUCKETS, self.size_counts)}
+        }
+
+
+def _cumulative(bounds, counts):
+    """จำนวนสะสมของแต่ละช่อง [(ขอบบน, จำนวนที่ <= ขอบบน), ..., ("+Inf", ทั้งหมด)]"""
+    total = 0
+    buckets = []
+    for bound, count in zip(bounds + ("+Inf",), counts):
+        total += count
+        buckets.append((bound, total))
+    return buckets
+
+
+def _input_size(value):
+    """ขนาดของข้อมูลนำเข้า: จำนวนสมาชิกของ array/list หรือ None ถ้าวัดไม่ได้ (เช่น generator)"""
+    size = getattr(value, "size", None)
+    if isinstance(size, int):
+        return size
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _wrap(method, name, size_argument):
+    """ครอบเมธอดด้วยตัวจับเวลา (เฉพาะตอน enable เท่านั้น)"""
+    stats = _stats.setdefault(name, MethodStats())
+
+    @functools.wraps(method)
+    def instrumented(self, *args, **kwargs):
+        thread = threading.get_ident()
+        outermost = thread not in _active
+        if outermost:
+            _active[thread] = name
+        failed = True
+        began = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - began
+            if outermost:
+                del _active[thread]
+            size = None
+            if size_argument is not None and len(args) > size_argument:
+                size = _input_size(args[size_argument])
+            with _lock:
+                stats.record(elapsed, size, failed)
+    return instrumented
+
+
+def enable(methods=None):
+    """เริ่มวัด เมธอดทั้งหมดใน INSTRUMENTED_METHODS หรือเฉพาะชื่อใน methods (เช่น "BMICalculator.analyze_health")"""
+    for module_name, class_name, method_name, size_argument in INSTRUMENTED_METHODS:
+        name = f"{class_name}.{method_name}"
+        if methods is not None and name not in methods:
+            continue
+        cls = getattr(importlib.import_module(module_name), class_name)
+        if (cls, method_name) in _originals:
+            continue
+        original = cls.__dict__[method_name]
+        _originals[cls, method_name] = original
+        setattr(cls, method_name, _wrap(original, name, size_argument))
+
+
+def disable():
+    """หยุดวัดและคืนเมธอดเดิมทั้งหมด (สถิติที่เก็บไว้ยังอยู่จนกว่าจะ reset)"""
+    for (cls, method_name), original in list(_originals.items()):
+        setattr(cls, method_name, original)
+        del _originals[cls, method_name]
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def reset():
+    """ล้างสถิติที่เก็บไว้ทั้งหมด (ไม่ลบแหล่งสถิติที่ watch ไว้)"""
+    with _lock:
+        for stats in _stats.values():
+            stats.__init__()
+        _stage_seconds.clear()
+
+
+def watch(name, source):
+    """เพิ่มแหล่งสถิติ source (ฟังก์ชันที่คืน dict ของตัวเลข) ในชื่อ name
+
+    เมธอดของวัตถุถูกเก็บแบบ weakref วัตถุจึงถูกคืนหน่วยความจำได้ตามปกติ (แหล่งจะหายไปเอง)
+    """
+    _sources[name] = weakref.WeakMethod(source) if inspect.ismethod(source) else (lambda: source)
+
+
+def unwatch(name):
+    _sources.pop(name, None)
+
+
+def _collect_sources():
+    collected = {}
+    for name, reference in list(_sources.items()):
+        source = reference()
+        if source is None:
+            del _sources[name]
+            continue
+        collected[name] = {key: value for key, value in source().items()
+                           if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    return collected
+
+
+def snapshot():
+    """สถิติทั้งหมด ณ ขณะนี้เป็น dict (methods, sources, stages)"""
+    with _lock:
+        methods = {name: stats.to_dict() for name, stats in _stats.items() if stats.calls}
+        stages = {}
+        for (method, stage), seconds in _stage_seconds.items():
+            stages.setdefault(method, {})[stage] = seconds
+    return {"timestamp": time.time(), "enabled": is_enabled(), "methods": methods,
+            "sources": _collect_sources(), "stages": stages}
+
+
+def to_json(indent=None):
+    return json.dumps(snapshot(), ensure_ascii=False, indent=indent)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(text):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", text)
+
+
+def _histogram_lines(metric, label, name, histogram, count):
+    lines = [f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {total}'
+             for bound, total in histogram["buckets"]]
+    lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram["sum"]}')
+    lines.append(f'{metric}_count{{{label}="{name}"}} {count}')
+    return lines
+
+
+def stats_lines(prefix, stats, label="method", what="analyzer method"):
+    """บรรทัด Prometheus ของ MethodStats.to_dict() หลายชุด (ชื่อ -> dict) ใช้ร่วมกับบริการอื่น เช่น analysis_service
+
+    ได้ตัวนับ {prefix}_calls_total, {prefix}_errors_total และฮิสโตแกรม {prefix}_latency_seconds,
+    {prefix}_input_size โดยแต่ละชุดแยกด้วย label
+    """
+    lines = [f"# HELP {prefix}_calls_total Number of calls per {what}.",
+             f"# TYPE {prefix}_calls_total counter"]
+    lines += [f'{prefix}_calls_total{{{label}="{name}"}} {item["calls"]}' for name, item in stats.items()]
+    lines += [f"# HELP {prefix}_errors_total Number of calls per {what} that failed.",
+              f"# TYPE {prefix}_errors_total counter"]
+    lines += [f'{prefix}_errors_total{{{label}="{name}"}} {item["errors"]}' for name, item in stats.items()]
+    lines += [f"# HELP {prefix}_latency_seconds Latency per {what}.",
+              f"# TYPE {prefix}_latency_seconds histogram"]
+    for name, item in stats.items():
+        lines += _histogram_lines(f"{prefix}_latency_seconds", label, name, item["latency"], item["calls"])
+    lines += [f"# HELP {prefix}_input_size Input size per {what}.",
+              f"# TYPE {prefix}_input_size histogram"]
+    for name, item in stats.items():
+        if item["input_size"]["count"]:
+            lines += _histogram_lines(f"{prefix}_input_size", label, name, item["input_size"],
+                                      item["input_size"]["count"])
+    return lines
+
+
+def to_prometheus(prefix="analyzer"):
+    """สถิติในรูปแบบข้อความของ Prometheus (text exposition format 0.0.4)"""
+    data = snapshot()
+    lines = stats_lines(prefix, data["methods"])
+    if data["stages"]:
+        lines += [f"# HELP {prefix}_stage_seconds_total Sampled time per internal stage of each method.",
+                  f"# TYPE {prefix}_stage_seconds_total counter"]
+        for method, stages in data["stages"].items():
+            lines += [f'{prefix}_stage_seconds_total{{method="{method}",stage="{_label(stage)}"}} {seconds}'
+                      for stage, seconds in stages.items()]
+    for source, values in data["sources"].items():
+        for key, value in values.items():
+            metric = _metric_name(f"{prefix}_{source}_{key}")
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class StageProfiler:
+    """ตัวสุ่มดู stack (sampling profiler) แยกเวลาของแต่ละเมธอดที่วัดตามขั้นตอนภายใน
+
+    ทุก interval วินาที เธรดเบื้องหลังดูเฟรมของเธรดที่กำลังอยู่ในเมธอดที่ enable ไว้
+    ขั้นตอน = ฟังก์ชันในโมดูลของโปรเจกต์ที่อยู่ลึกที่สุดใน stack (เช่น "knowledge_base.symptom_id")
+    แต่ละตัวอย่างนับเป็นเวลา interval วินาที ผลรวมอยู่ใน snapshot()["stages"] และ report()
+    ต้อง enable() ก่อน มิฉะนั้นจะไม่มีเธรดให้สุ่ม
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stage-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, previous = now - previous, now
+            if not _active:
+                continue
+            frames = sys._current_frames()
+            with _lock:
+                for thread, method in list(_active.items()):
+                    frame = frames.get(thread)
+                    stage = _project_stage(frame) if frame is not None else None
+                    if stage is not None:
+                        key = (method, stage)
+                        _stage_seconds[key] = _stage_seconds.get(key, 0.0) + elapsed
+                        self.samples += 1
+
+    def report(self, method=None):
+        """รายการ (เมธอด, ขั้นตอน, วินาที, สัดส่วนของเมธอด) เรียงจากมากไปน้อย"""
+        with _lock:
+            items = [(m, stage, seconds) for (m, stage), seconds in _stage_seconds.items()
+                     if method is None or m == method]
+        totals = {}
+        for m, _, seconds in items:
+            totals[m] = totals.get(m, 0.0) + seconds
+        return sorted(((m, stage, seconds, seconds / totals[m]) for m, stage, seconds in items),
+                      key=lambda item: -item[2])
+
+
+def _project_stage(frame):
+    """ชื่อ "โมดูล.ฟังก์ชัน" ของเฟรมแรกจากด้านในที่เป็นโค้ดของโปรเจกต์ (ข้ามตัวครอบของโมดูลนี้)"""
+    while frame is not None:
+        module = frame.f_globals.get("__name__")
+        if module in PROJECT_MODULES:
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
@@ -0,0 +1,166 @@
+"""
+โหมด batch แบบไม่โต้ตอบ (JSONL) ที่ใช้ร่วมกันระหว่าง symptom_checker, bmi_calculator และ heart_rate_analyzer
+
+อ่านคำขอจาก stdin หรือไฟล์ทีละบรรทัด (หนึ่ง JSON object ต่อบรรทัด) รวมเป็นกลุ่มย่อย (micro-batch)
+ส่งให้ตัววิเคราะห์ที่สร้างไว้ครั้งเดียว แล้วเขียนผลทีละบรรทัดตามลำดับเดิม:
+    {"line": 3, "id": "p-001", "result": {...}}
+    {"line": 4, "id": "p-002", "error": "height ต้องเป็นตัวเลขที่มากกว่า 0"}
+
+"id" ของคำขอ (ถ้ามี) ถูกส่งกลับในผลเพื่อให้จับคู่ได้ ข้อผิดพลาดของแต่ละบรรทัดรายงานในผลของบรรทัดนั้น
+โดยไม่หยุดการทำงานของบรรทัดอื่น
+
+ตัวอย่างการใช้งาน:
+    python bmi_calculator.py batch people.jsonl > results.jsonl
+    cat requests.jsonl | python heart_rate_analyzer.py batch --batch-size 10000
+"""
+
+import argparse
+import json
+import math
+import sys
+from itertools import islice
+
+DEFAULT_BATCH_SIZE = 4096
+
+
+class RecordError(ValueError):
+    """ข้อมูลของคำขอหนึ่งรายการไม่ถูกต้อง (รายงานในผลของบรรทัดนั้น)"""
+
+
+class RawJSON(str):
+    """ผลที่เข้ารหัสเป็นข้อความ JSON แล้ว เขียนลงผลโดยตรงไม่ต้องเข้ารหัสซ้ำ
+
+    ตัววิเคราะห์ใช้ประกอบผลจากส่วนที่เข้ารหัสไว้ล่วงหน้า (ชื่อหมวดหมู่ คำแนะนำ) เพื่อความเร็ว
+    """
+
+
+def number_field(record, name, default=None, integer=False, positive=True):
+    """อ่านค่าตัวเลขจากคำขอ ตรวจชนิดและ (ถ้า positive) ต้องมากกว่า 0 เหมือนโหมดโต้ตอบ"""
+    value = record.get(name, default)
+    kind = type(value)     # เทียบชนิดตรงๆ (เร็วกว่า isinstance และไม่รับ True/False เป็นตัวเลข)
+    if kind is float:
+        if not math.isfinite(value):
+            raise RecordError(f"{name} ต้องเป็นตัวเลข")
+        if integer:
+            if not value.is_integer():
+                raise RecordError(f"{name} ต้องเป็นจำนวนเต็ม")
+            value = int(value)
+    elif kind is not int:
+        raise RecordError(f"ไม่มีค่า {name}" if value is None else f"{name} ต้องเป็นตัวเลข")
+    if positive and value <= 0:
+        raise RecordError(f"{name} ต้องเป็นตัวเลขที่มากกว่า 0")
+    return value
+
+
+def process_records(handler, records):
+    """เรียก handler กับกลุ่มคำขอ (list ของ dict) คืนผลหรือ exception ของแต่ละคำขอ
+
+    handler คืน list ยาวเท่ากับ records สมาชิกเป็นผล (ค่าที่แปลงเป็น JSON ได้) หรือ exception
+    หาก handler ล้มทั้งกลุ่ม จะเรียกซ้ำทีละรายการเพื่อแยกรายการที่ผิดพลาดออก (กลุ่มที่มีรายการเดียวได้ exception นั้นเป็นผล)
+    """
+    try:
+        return handler(records)
+    except Exception as e:
+        if len(records) == 1:
+            return [e]
+    results = []
+    for record in records:
+        try:
+            results.extend(handler([record]))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def error_message(error):
+    """ข้อความของข้อผิดพลาดที่รายงานกลับในผล"""
+    if isinstance(error, KeyError):
+        return f"ไม่รู้จักค่า {error.args[0]!r}" if error.args else "ไม่รู้จักค่า"
+    return str(error) or type(error).__name__
+
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def analyze_json(handler, documents):
+    """แปลงข้อความ JSON หลายรายการเป็นคำขอแล้ววิเคราะห์พร้อมกันด้วย handler
+
+    คืนรายการ (id ของคำขอหรือ None, ผลหรือ exception) ตามลำดับเดิม ข้อความที่ไม่ใช่ JSON object ได้ RecordError
+    """
+    entries = []     # (id, ลำดับใน records หรือ exception)
+    records = []
+    for document in documents:
+        try:
+            record = json.loads(document)
+            if not isinstance(record, dict):
+                raise RecordError("คำขอต้องเป็น JSON object")
+        except ValueError as e:
+            if not isinstance(e, RecordError):
+                e = RecordError(f"JSON ไม่ถูกต้อง: {e}")
+            entries.append((None, e))
+            continue
+        entries.append((record.get("id"), len(records)))
+        records.append(record)
+
+    results = process_records(handler, records) if records else []
+    return [(record_id, results[entry] if isinstance(entry, int) else entry) for record_id, entry in entries]
+
+
+def encode_result(result):
+    """แปลงผลของหนึ่งคำขอเป็น (สำเร็จหรือไม่, ข้อความ JSON ของผลหรือของข้อความข้อผิดพลาด)"""
+    if isinstance(result, Exception):
+        return False, _encode(error_message(result))
+    return True, result if isinstance(result, RawJSON) else _encode(result)
+
+
+def run_batch(handler, lines, out, batch_size=DEFAULT_BATCH_SIZE):
+    """ประมวลผลบรรทัด JSONL ทีละกลุ่มละ batch_size บรรทัด เขียนผลลง out คืน (จำนวนคำขอ, จำนวนที่ผิดพลาด)"""
+    lines = enumerate(lines, 1)
+    total = errors = 0
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            break
+        chunk = [(line_no, line) for line_no, line in chunk if line.strip()]
+        output = []
+        for (line_no, _), (record_id, result) in zip(chunk, analyze_json(handler, [line for _, line in chunk])):
+            ok, text = encode_result(result)
+            head = f'{{"line": {line_no}' if record_id is None else f'{{"line": {line_no}, "id": {_encode(record_id)}'
+            output.append(f'{head}, "result": {text}}}' if ok else f'{head}, "error": {text}}}')
+            errors += not ok
+        total += len(output)
+        if output:
+            out.write("\n".join(output) + "\n")
+            out.flush()
+    return total, errors
+
+
+def batch_main(make_handler, argv=None, description=None, add_arguments=None):
+    """จุดเริ่มของโหมด batch ของแต่ละโปรแกรม
+
+    make_handler(args) สร้างตัววิเคราะห์ครั้งเดียวแล้วคืน handler สำหรับ process_records
+    add_arguments(parser) เพิ่มตัวเลือกเฉพาะของโปรแกรม
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("input", nargs="?", default="-", help="ไฟล์ JSONL ของคำขอ (- หรือไม่ระบุ = stdin)")
+    parser.add_argument("--output", default="-", help="ไฟล์ JSONL ของผล (- หรือไม่ระบุ = stdout)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="จำนวนคำขอที่วิเคราะห์พร้อมกันในหนึ่งกลุ่ม")
+    if add_arguments is not None:
+        add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size ต้องมากกว่า 0")
+
+    handler = make_handler(args)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        total, errors = run_batch(handler, source, out, args.batch_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"ประมวลผล {total} คำขอ ผิดพลาด {errors} รายการ", file=sys.stderr)
+    return 0
@@ -0,0 +1,362 @@
+"""
+ฐานข้อมูลโรคแบบคอมไพล์ล่วงหน้า (Compiled Knowledge Base) สำหรับ SymptomChecker
+อ่านข้อมูลโรค/อาการ/ความรุนแรง/คำแนะนำจากไฟล์ JSON หรือ CSV แล้วคอมไพล์เป็นไฟล์ไบนารี
+ที่ memory-map ได้ ใช้ร่วมกันได้ทุก SymptomChecker ในโปรเซสเดียวกันและข้ามโปรเซส
+
+โครงสร้างไฟล์ (.skb):
+    MAGIC (4 ไบต์) | ความยาว header (uint32) | header JSON | ส่วนข้อมูลแต่ละส่วน (จัดแนว 8 ไบต์)
+
+ส่วนข้อมูลเป็นอาร์เรย์จำนวนเต็ม little-endian และตารางสตริง (string table):
+    str_offsets, str_data               ตารางสตริงที่ไม่ซ้ำกัน (interned)
+    disease_name/severity/advice        รหัสสตริงของแต่ละโรค
+    disease_symptom_ptr, disease_symptoms   อาการของแต่ละโรค (ตามลำดับเดิม)
+    symptom_name                        รหัสสตริงของอาการ (เรียงตาม UTF-8 เพื่อค้นหาแบบ binary search)
+    symptom_ptr, symptom_diseases       ดัชนีอาการ -> โรค (postings)
+
+ตัวอย่างการใช้งาน:
+    python knowledge_base.py compile diseases.json diseases.skb --version 2
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import warnings
+from array import array
+from collections.abc import Mapping
+
+MAGIC = b"SKB1"
+FORMAT_VERSION = 1
+
+# ลำดับและชนิดข้อมูลของแต่ละส่วนในไฟล์
+_SECTIONS = [
+    ("str_offsets", "q"),
+    ("str_data", "B"),
+    ("disease_name", "i"),
+    ("disease_severity", "i"),
+    ("disease_advice", "i"),
+    ("disease_symptom_ptr", "q"),
+    ("disease_symptoms", "i"),
+    ("symptom_name", "i"),
+    ("symptom_ptr", "q"),
+    ("symptom_diseases", "i"),
+]
+
+
+def load_diseases(path):
+    """อ่านข้อมูลโรคจากไฟล์ JSON หรือ CSV (เลือกตามนามสกุลไฟล์)
+
+    JSON: {"ชื่อโรค": {"symptoms": [...], "severity": "...", "advice": "..."}, ...}
+          หรือรายการ [{"disease": "...", "symptoms": [...], "severity": "...", "advice": "..."}, ...]
+    CSV:  คอลัมน์ disease, symptoms, severity, advice โดยคั่นอาการด้วย "|"
+    """
+    if path.lower().endswith(".csv"):
+        diseases = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                diseases[row["disease"]] = {
+                    "symptoms": [s.strip() for s in row["symptoms"].split("|") if s.strip()],
+                    "severity": row.get("severity", ""),
+                    "advice": row.get("advice", "")
+                }
+        return diseases
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {
+            item["disease"]: {
+                "symptoms": list(item["symptoms"]),
+                "severity": item.get("severity", ""),
+                "advice": item.get("advice", "")
+            }
+            for item in data
+        }
+    return data
+
+
+def compile_diseases(diseases, version=1):
+    """คอมไพล์ข้อมูลโรค (dict แบบเดียวกับ SymptomChecker.diseases) เป็น bytes"""
+    strings = {}
+
+    def intern(text):
+        string_id = strings.get(text)
+        if string_id is None:
+            string_id = strings[text] = len(strings)
+        return string_id
+
+    # กำหนดรหัสอาการตามลำดับ UTF-8 เพื่อให้ค้นหาด้วย binary search ได้
+    vocabulary = set()
+    for info in diseases.values():
+        vocabulary.update(info["symptoms"])
+    symptom_names = sorted(vocabulary, key=lambda s: s.encode("utf-8"))
+    symptom_ids = {symptom: i for i, symptom in enumerate(symptom_names)}
+
+    data = {name: array(typecode) for name, typecode in _SECTIONS}
+    postings = [[] for _ in symptom_names]
+    data["disease_symptom_ptr"].append(0)
+    for disease_id, (disease, info) in enumerate(diseases.items()):
+        data["disease_name"].append(intern(disease))
+        data["disease_severity"].append(intern(info["severity"]))
+        data["disease_advice"].append(intern(info["advice"]))
+        seen = set()
+        for symptom in info["symptoms"]:
+            symptom_id = symptom_ids[symptom]
+            data["disease_symptoms"].append(symptom_id)
+            if symptom_id not in seen:
+                seen.add(symptom_id)
+                postings[symptom_id].append(disease_id)
+        data["disease_symptom_ptr"].append(len(data["disease_symptoms"]))
+
+    data["symptom_ptr"].append(0)
+    for symptom, disease_ids in zip(symptom_names, postings):
+        data["symptom_name"].append(intern(symptom))
+        data["symptom_diseases"].extend(disease_ids)
+        data["symptom_ptr"].append(len(data["symptom_diseases"]))
+
+    data["str_offsets"].append(0)
+    for text in strings:
+        data["str_data"].frombytes(text.encode("utf-8"))
+        data["str_offsets"].append(len(data["str_data"]))
+
+    if sys.byteorder != "little":
+        for name, arr in data.items():
+            arr.byteswap()
+
+    # ตำแหน่งของแต่ละส่วนนับจากจุดเริ่มส่วนข้อมูล (ถัดจาก header) และจัดแนวทีละ 8 ไบต์
+    sections = {}
+    offset = 0
+    for name, typecode in _SECTIONS:
+        sections[name] = [offset, len(data[name])]
+        offset += _align(len(data[name]) * data[name].itemsize)
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "version": version,
+        "n_diseases": len(diseases),
+        "n_symptoms": len(symptom_names),
+        "sections": sections
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+
+    parts = [prefix, b"\0" * (_align(len(prefix)) - len(prefix))]
+    for name, typecode in _SECTIONS:
+        raw = data[name].tobytes()
+        parts.append(raw)
+        parts.append(b"\0" * (_align(len(raw)) - len(raw)))
+    return b"".join(parts)
+
+
+def compile_knowledge_base(source, out_path, version=1):
+    """คอมไพล์ไฟล์ JSON/CSV (หรือ dict) เป็นไฟล์ .skb
+
+    เขียนไฟล์ชั่วคราวแล้วแทนที่ในครั้งเดียว เพื่อให้โปรเซสที่กำลังอ่านไฟล์เดิมไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+    """
+    diseases = load_diseases(source) if isinstance(source, str) else source
+    blob = compile_diseases(diseases, version)
+    tmp_path = f"{out_path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class CompiledKnowledgeBase:
+    """ฐานข้อมูลโรคที่คอมไพล์แล้ว อ่านข้อมูลตรงจาก buffer (bytes หรือ mmap) โดยไม่คัดลอก"""
+
+    def __init__(self, buffer, path=None):
+        if bytes(buffer[:4]) != MAGIC:
+            raise ValueError("ไม่ใช่ไฟล์ฐานข้อมูลโรคที่คอมไพล์แล้ว (.skb)")
+        (header_len,) = struct.unpack_from("<I", buffer, 4)
+        header = json.loads(bytes(buffer[8:8 + header_len]).decode("utf-8"))
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"ไม่รองรับรูปแบบไฟล์เวอร์ชัน {header['format']}")
+
+        self.path = path
+        self.version = header["version"]
+        self.n_diseases = header["n_diseases"]
+        self.n_symptoms = header["n_symptoms"]
+        self._buffer = buffer
+
+        view = memoryview(buffer)
+        data_start = _align(8 + header_len)
+        for name, typecode in _SECTIONS:
+            offset, count = header["sections"][name]
+            offset += data_start
+            size = array(typecode).itemsize
+            section = view[offset:offset + count * size].cast(typecode)
+            if sys.byteorder != "little" and size > 1:
+                section = array(typecode, section)
+                section.byteswap()
+            setattr(self, "_" + name, section)
+
+        self.diseases = DiseasesView(self)
+
+    @classmethod
+    def from_diseases(cls, diseases, version=1):
+        """คอมไพล์ dict ข้อมูลโรคเป็นฐานข้อมูลในหน่วยความจำ"""
+        return cls(compile_diseases(diseases, version))
+
+    @classmethod
+    def open(cls, path):
+        """เปิดไฟล์ .skb แบบ memory-map (หน้าหน่วยความจำใช้ร่วมกันได้ระหว่างโปรเซส)"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def string(self, string_id):
+        """อ่านสตริงจากตารางสตริง"""
+        offsets = self._str_offsets
+        return str(self._str_data[offsets[string_id]:offsets[string_id + 1]], "utf-8")
+
+    def symptom_id(self, symptom):
+        """หารหัสอาการ (binary search บนตารางอาการที่เรียงไว้) คืน None ถ้าไม่พบ"""
+        key = symptom.encode("utf-8")
+        offsets = self._str_offsets
+        names = self._symptom_name
+        data = self._str_data
+        lo, hi = 0, self.n_symptoms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            string_id = names[mid]
+            candidate = bytes(data[offsets[string_id]:offsets[string_id + 1]])
+            if candidate < key:
+                lo = mid + 1
+            elif candidate == key:
+                return mid
+            else:
+                hi = mid
+        return None
+
+    def symptom_name(self, symptom_id):
+        return self.string(self._symptom_name[symptom_id])
+
+    def symptoms(self):
+        """รายชื่ออาการทั้งหมดในฐานข้อมูล (เรียงตามรหัสอาการ)"""
+        return [self.symptom_name(i) for i in range(self.n_symptoms)]
+
+    def postings(self, symptom_id):
+        """รหัสโรคทั้งหมดที่มีอาการนี้ (เรียงจากน้อยไปมาก)"""
+        return self._symptom_diseases[self._symptom_ptr[symptom_id]:self._symptom_ptr[symptom_id + 1]]
+
+    def incidence_arrays(self):
+        """อาร์เรย์ดิบของดัชนี (symptom_ptr, symptom_diseases, disease_symptom_ptr) สำหรับงานแบบ vectorized"""
+        return self._symptom_ptr, self._symptom_diseases, self._disease_symptom_ptr
+
+    def disease_symptom_ids(self, disease_id):
+        """รหัสอาการของโรค ตามลำดับในข้อมูลต้นฉบับ"""
+        ptr = self._disease_symptom_ptr
+        return self._disease_symptoms[ptr[disease_id]:ptr[disease_id + 1]]
+
+    def disease_size(self, disease_id):
+        """จำนวนอาการของโรค (ตัวหารของเปอร์เซ็นต์ความเป็นไปได้)"""
+        return self._disease_symptom_ptr[disease_id + 1] - self._disease_symptom_ptr[disease_id]
+
+    def disease_name(self, disease_id):
+        return self.string(self._disease_name[disease_id])
+
+    def disease_severity(self, disease_id):
+        return self.string(self._disease_severity[disease_id])
+
+    def disease_advice(self, disease_id):
+        return self.string(self._disease_advice[disease_id])
+
+    def disease_info(self, disease_id):
+        """ข้อมูลโรคในรูปแบบเดียวกับ SymptomChecker.diseases[ชื่อโรค]"""
+        return {
+            "symptoms": [self.symptom_name(i) for i in self.disease_symptom_ids(disease_id)],
+            "severity": self.disease_severity(disease_id),
+            "advice": self.disease_advice(disease_id)
+        }
+
+
+class DiseasesView(Mapping):
+    """มุมมองแบบอ่านอย่างเดียวของฐานข้อมูลที่คอมไพล์แล้ว ให้ใช้งานเหมือน dict ชื่อโรค -> ข้อมูล
+
+    ข้อมูลของแต่ละโรคเป็น dict ใหม่ทุกครั้งที่อ่าน การแก้ไขจึงไม่มีผลกับฐานข้อมูล
+    ให้เพิ่ม/แทนที่/ลบโรคผ่าน SymptomChecker.add_disease / remove_disease
+    """
+
+    def __init__(self, kb):
+        self._kb = kb
+        self._ids = None
+
+    def _disease_ids(self):
+        if self._ids is None:
+            self._ids = {self._kb.disease_name(i): i for i in range(self._kb.n_diseases)}
+        return self._ids
+
+    def __getitem__(self, disease):
+        return self._kb.disease_info(self._disease_ids()[disease])
+
+    def __iter__(self):
+        return (self._kb.disease_name(i) for i in range(self._kb.n_diseases))
+
+    def __len__(self):
+        return self._kb.n_diseases
+
+    def __setitem__(self, disease, info):
+        raise TypeError("ฐานข้อมูลที่คอมไพล์แล้วแก้ไขโดยตรงไม่ได้ "
+                        "ใช้ checker.add_disease(ชื่อโรค, อาการ, ความรุนแรง, คำแนะนำ) แทน")
+
+    def __delitem__(self, disease):
+        raise TypeError("ฐานข้อมูลที่คอมไพล์แล้วแก้ไขโดยตรงไม่ได้ ใช้ checker.remove_disease(ชื่อโรค) แทน")
+
+
+# ฐานข้อมูลที่เปิดไว้แล้วในโปรเซสนี้: path -> (สถานะไฟล์, ฐานข้อมูล, ฐานข้อมูลมาจากไฟล์นี้หรือไม่)
+# (False = ไฟล์ปัจจุบันเก่ากว่าจึงถูกปฏิเสธ และยังใช้ฐานข้อมูลเดิม)
+_open_knowledge_bases = {}
+
+
+def open_knowledge_base(path, allow_downgrade=False):
+    """เปิดไฟล์ .skb โดยใช้ออบเจกต์ร่วมกันภายในโปรเซส
+
+    หากไฟล์ถูกแทนที่ (เช่นจาก compile_knowledge_base) จะเปิดไฟล์ใหม่ให้อัตโนมัติ
+    ตัวตรวจสอบที่ยังอ้างถึงเวอร์ชันเก่าใช้งานต่อได้จนกว่าจะเรียก reload_knowledge_base()
+    ไฟล์ใหม่ที่มี version ใน header ต่ำกว่าฐานข้อมูลที่เปิดอยู่ (เช่นคัดลอกไฟล์เก่ามาทับ) ถูกปฏิเสธ:
+    เตือนด้วย RuntimeWarning แล้วใช้เวอร์ชันเดิมต่อ เว้นแต่ allow_downgrade=True (ย้อนเวอร์ชันโดยตั้งใจ)
+    """
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    file_state = (st.st_ino, st.st_size, st.st_mtime_ns)
+    cached = _open_knowledge_bases.get(path)
+    if cached is not None and cached[0] == file_state and (cached[2] or not allow_downgrade):
+        return cached[1]
+    kb = CompiledKnowledgeBase.open(path)
+    if cached is not None and kb.version < cached[1].version and not allow_downgrade:
+        warnings.warn(f"ไม่ใช้ {path} เวอร์ชัน {kb.version} ซึ่งเก่ากว่าเวอร์ชัน {cached[1].version} ที่เปิดอยู่",
+                      RuntimeWarning, stacklevel=2)
+        _open_knowledge_bases[path] = (file_state, cached[1], False)
+        return cached[1]
+    _open_knowledge_bases[path] = (file_state, kb, True)
+    return kb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="คอมไพล์ฐานข้อมูลโรคจาก JSON/CSV เป็นไฟล์ .skb")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="คอมไพล์ไฟล์ JSON/CSV")
+    compile_parser.add_argument("source")
+    compile_parser.add_argument("output")
+    compile_parser.add_argument("--version", type=int, default=1)
+    info_parser = subparsers.add_parser("info", help="แสดงข้อมูลของไฟล์ .skb")
+    info_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        compile_knowledge_base(args.source, args.output, args.version)
+        kb = CompiledKnowledgeBase.open(args.output)
+        print(f"✅ คอมไพล์แล้ว: {args.output} ({kb.n_diseases} โรค, {kb.n_symptoms} อาการ, เวอร์ชัน {kb.version})")
+    else:
+        kb = CompiledKnowledgeBase.open(args.path)
+        print(f"📦 {args.path}: {kb.n_diseases} โรค, {kb.n_symptoms} อาการ, เวอร์ชัน {kb.version}")
+
+if __name__ == "__main__":
+    main()
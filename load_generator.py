@@ -0,0 +1,127 @@
+"""
+ตัวสร้างโหลดสำหรับ analysis_service (ทำงานภายในเครื่องเท่านั้น ใช้ asyncio streams ไม่ต้องติดตั้งอะไรเพิ่ม)
+
+เปิดการเชื่อมต่อแบบ keep-alive หลายเส้นพร้อมกัน แต่ละเส้นส่ง POST ต่อเนื่องตลอดระยะเวลาที่กำหนด
+แล้วรายงานจำนวนคำขอต่อวินาทีที่ทำได้จริงและ latency (p50/p95/p99/สูงสุด)
+
+ตัวอย่างการใช้งาน:
+    python load_generator.py --url http://127.0.0.1:8080/bmi --connections 64 --seconds 10
+    python load_generator.py --url http://127.0.0.1:8080/symptoms --body '{"symptoms": ["ไข้", "ไอ"]}'
+    python load_generator.py --url http://127.0.0.1:8080/symptoms --body-file queries.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from itertools import islice
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# ตัวอย่างคำขอของแต่ละ endpoint (สุ่มค่าเพื่อไม่ให้ผลซ้ำกันทุกคำขอ)
+SAMPLE_BODIES = {
+    "/bmi": lambda rng: {"weight": round(rng.uniform(40, 120), 1), "height": round(rng.uniform(150, 195), 1),
+                         "age": rng.randint(18, 80), "gender": rng.choice(["ชาย", "หญิง"])},
+    "/heart-rate": lambda rng: {"heart_rate": rng.randint(45, 180), "age": rng.randint(18, 80),
+                                "activity_level": rng.choice(["resting", "normal", "exercise"])},
+    "/symptoms": lambda rng: {"symptoms": rng.sample(["ไข้", "ไอ", "ปวดหัว", "เจ็บคอ", "น้ำมูกไหล",
+                                                      "ปวดกล้ามเนื้อ", "คลื่นไส้", "ท้องเสีย"], 3)},
+}
+
+
+async def _connection(host, port, path, bodies, deadline, latencies, status_counts):
+    """หนึ่งการเชื่อมต่อ keep-alive ส่งคำขอทีละคำขอจนถึง deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    index = 0
+    try:
+        while time.perf_counter() < deadline:
+            body = bodies[index % len(bodies)]
+            index += 1
+            began = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - began)
+            status_counts[status] = status_counts.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, connections=32, seconds=10.0, body=None, seed=0, body_file=None, max_bodies=100000):
+    """ยิงโหลดไปที่ url คืน dict ของ requests, rps, latency (ms) และจำนวนตาม status
+
+    body_file: ไฟล์ JSONL ของคำขอ (เช่นจาก synthetic_knowledge_base.py) ใช้ max_bodies บรรทัดแรกวนซ้ำ
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if body is not None:
+        bodies = [body.encode("utf-8")]
+    elif body_file is not None:
+        with open(body_file, "rb") as f:
+            bodies = [line.strip() for line in islice(f, max_bodies) if line.strip()]
+        if not bodies:
+            raise ValueError(f"ไม่มีคำขอใน {body_file}")
+    elif path in SAMPLE_BODIES:
+        rng = random.Random(seed)
+        bodies = [json.dumps(SAMPLE_BODIES[path](rng), ensure_ascii=False).encode("utf-8") for _ in range(1000)]
+    else:
+        raise ValueError(f"ไม่มีตัวอย่างคำขอของ {path} กรุณาระบุ --body")
+
+    latencies = []
+    status_counts = {}
+    began = time.perf_counter()
+    deadline = began + seconds
+    results = await asyncio.gather(*(_connection(parts.hostname or "127.0.0.1", parts.port or 80, path, bodies,
+                                                 deadline, latencies, status_counts)
+                                     for _ in range(connections)), return_exceptions=True)
+    elapsed = time.perf_counter() - began
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures and not latencies:
+        raise failures[0]
+
+    report = {"url": url, "connections": connections, "seconds": elapsed, "requests": len(latencies),
+              "rps": len(latencies) / elapsed, "status": status_counts, "connection_errors": len(failures)}
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        report["latency_ms"] = {"p50": p50, "p95": p95, "p99": p99, "max": max(latencies) * 1000}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="สร้างโหลดให้ analysis_service แล้ววัด RPS และ p99 latency")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/bmi")
+    parser.add_argument("--connections", type=int, default=32, help="จำนวนการเชื่อมต่อพร้อมกัน")
+    parser.add_argument("--seconds", type=float, default=10.0, help="ระยะเวลาทดสอบ")
+    parser.add_argument("--body", help="JSON ของคำขอ (ไม่ระบุ = สุ่มตามชนิดของ endpoint)")
+    parser.add_argument("--body-file", help="ไฟล์ JSONL ของคำขอที่จะส่งวนไป (หนึ่งคำขอต่อบรรทัด)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="พิมพ์ผลเป็น JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.url, args.connections, args.seconds, args.body, args.seed,
+                                      args.body_file))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"🎯 {report['url']}  การเชื่อมต่อ {report['connections']}  เวลา {report['seconds']:.1f} วินาที")
+    print(f"   คำขอทั้งหมด {report['requests']:,}  ({report['rps']:,.0f} คำขอ/วินาที)")
+    print("   status: " + ", ".join(f"{status}={count:,}" for status, count in sorted(report["status"].items())))
+    if report["connection_errors"]:
+        print(f"   ⚠️ การเชื่อมต่อล้มเหลว {report['connection_errors']} เส้น")
+    if "latency_ms" in report:
+        latency = report["latency_ms"]
+        print(f"   latency p50 {latency['p50']:.2f} ms  p95 {latency['p95']:.2f} ms  "
+              f"p99 {latency['p99']:.2f} ms  สูงสุด {latency['max']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
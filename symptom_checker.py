@@ -3,64 +3,510 @@
 ตัวอย่าง AI ทางการแพทย์อย่างง่ายสำหรับนักเรียนมัธยม
 """
 
+import heapq
+import sys
+from collections import OrderedDict
+
+from knowledge_base import CompiledKnowledgeBase, open_knowledge_base
+from symptom_lookup import SymptomLookup
+
+# ฐานข้อมูลโรคและอาการ (แบบง่าย)
+DEFAULT_DISEASES = {
+    "ไข้หวัด": {
+        "symptoms": ["ไข้", "ไอ", "น้ำมูกไหล", "เจ็บคอ", "ปวดศีรษะ"],
+        "severity": "เล็กน้อย",
+        "advice": "พักผ่อน ดื่มน้ำมากๆ กินยาลดไข้ หากอาการไม่ดีขึ้นใน 3 วัน ควรพบแพทย์"
+    },
+    "ไข้เลือดออก": {
+        "symptoms": ["ไข้สูง", "ปวดศีรษะ", "ปวดกล้ามเนื้อ", "ผื่นแดง", "เลือดออกง่าย"],
+        "severity": "รุนแรง",
+        "advice": "ควรพบแพทย์ทันที! ดื่มน้ำมากๆ ห้ามกินยาแอสไพริน"
+    },
+    "ภูมิแพ้": {
+        "symptoms": ["จาม", "น้ำมูกไหล", "คันตา", "คันจมูก"],
+        "severity": "เล็กน้อย",
+        "advice": "หลีกเลี่ยงสิ่งที่ทำให้แพ้ กินยาแก้แพ้ ล้างหน้าและมือบ่อยๆ"
+    },
+    "ไข้หวัดใหญ่": {
+        "symptoms": ["ไข้สูง", "หนาวสั่น", "ปวดกล้ามเนื้อ", "อ่อนเพลีย", "ไอแห้ง"],
+        "severity": "ปานกลาง",
+        "advice": "พักผ่อนมากๆ ดื่มน้ำ กินยาลดไข้ สวมหน้ากาก หากหายใจลำบากให้พบแพทย์"
+    },
+    "อาหารเป็นพิษ": {
+        "symptoms": ["ท้องเสีย", "อาเจียน", "ปวดท้อง", "ไข้", "คลื่นไส้"],
+        "severity": "ปานกลาง",
+        "advice": "ดื่มน้ำเกลือแร่ งดอาหารหนักๆ หากอาเจียนมากหรือมีเลือดปนให้พบแพทย์"
+    }
+}
+
+# คำพ้องความหมายที่ผู้ใช้มักพิมพ์ -> ชื่ออาการในฐานข้อมูล
+DEFAULT_SYNONYMS = {
+    "มีไข้": "ไข้",
+    "ตัวร้อน": "ไข้",
+    "ตัวร้อนมาก": "ไข้สูง",
+    "ปวดหัว": "ปวดศีรษะ",
+    "เจ็บหัว": "ปวดศีรษะ",
+    "คอแห้ง": "เจ็บคอ",
+    "ไอไม่มีเสมหะ": "ไอแห้ง",
+    "ท้องร่วง": "ท้องเสีย",
+    "อ้วก": "อาเจียน",
+    "พะอืดพะอม": "คลื่นไส้",
+    "ปวดเมื่อย": "ปวดกล้ามเนื้อ",
+    "เพลีย": "อ่อนเพลีย",
+    "หนาว": "หนาวสั่น",
+    "ผื่น": "ผื่นแดง",
+    "เลือดกำเดาไหล": "เลือดออกง่าย",
+}
+
+_default_knowledge_base = None
+
+
+def default_knowledge_base():
+    """ฐานข้อมูลตัวอย่างที่คอมไพล์แล้ว (สร้างครั้งเดียวและใช้ร่วมกันทุก SymptomChecker)"""
+    global _default_knowledge_base
+    if _default_knowledge_base is None:
+        _default_knowledge_base = CompiledKnowledgeBase.from_diseases(DEFAULT_DISEASES)
+    return _default_knowledge_base
+
 class SymptomChecker:
-    def __init__(self):
-        # ฐานข้อมูลโรคและอาการ (แบบง่าย)
-        self.diseases = {
-            "ไข้หวัด": {
-                "symptoms": ["ไข้", "ไอ", "น้ำมูกไหล", "เจ็บคอ", "ปวดศีรษะ"],
-                "severity": "เล็กน้อย",
-                "advice": "พักผ่อน ดื่มน้ำมากๆ กินยาลดไข้ หากอาการไม่ดีขึ้นใน 3 วัน ควรพบแพทย์"
-            },
-            "ไข้เลือดออก": {
-                "symptoms": ["ไข้สูง", "ปวดศีรษะ", "ปวดกล้ามเนื้อ", "ผื่นแดง", "เลือดออกง่าย"],
-                "severity": "รุนแรง",
-                "advice": "ควรพบแพทย์ทันที! ดื่มน้ำมากๆ ห้ามกินยาแอสไพริน"
-            },
-            "ภูมิแพ้": {
-                "symptoms": ["จาม", "น้ำมูกไหล", "คันตา", "คันจมูก"],
-                "severity": "เล็กน้อย",
-                "advice": "หลีกเลี่ยงสิ่งที่ทำให้แพ้ กินยาแก้แพ้ ล้างหน้าและมือบ่อยๆ"
-            },
-            "ไข้หวัดใหญ่": {
-                "symptoms": ["ไข้สูง", "หนาวสั่น", "ปวดกล้ามเนื้อ", "อ่อนเพลีย", "ไอแห้ง"],
-                "severity": "ปานกลาง",
-                "advice": "พักผ่อนมากๆ ดื่มน้ำ กินยาลดไข้ สวมหน้ากาก หากหายใจลำบากให้พบแพทย์"
-            },
-            "อาหารเป็นพิษ": {
-                "symptoms": ["ท้องเสีย", "อาเจียน", "ปวดท้อง", "ไข้", "คลื่นไส้"],
-                "severity": "ปานกลาง",
-                "advice": "ดื่มน้ำเกลือแร่ งดอาหารหนักๆ หากอาเจียนมากหรือมีเลือดปนให้พบแพทย์"
-            }
+    def __init__(self, knowledge_base=None, cache_size=None):
+        """knowledge_base: path ไฟล์ .skb, CompiledKnowledgeBase หรือ dict ข้อมูลโรค
+        (ไม่ระบุ = ฐานข้อมูลตัวอย่าง)
+        cache_size: จำนวนผลลัพธ์สูงสุดที่จำไว้ (LRU) สำหรับชุดอาการที่ถามซ้ำ (None = ไม่ใช้แคช)"""
+        self._kb_version = 0
+        self._cache = OrderedDict() if cache_size else None
+        self._cache_size = cache_size
+        self._cache_version = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+        if knowledge_base is None:
+            self.knowledge_base = default_knowledge_base()
+        elif isinstance(knowledge_base, str):
+            self.knowledge_base = open_knowledge_base(knowledge_base)
+        elif isinstance(knowledge_base, CompiledKnowledgeBase):
+            self.knowledge_base = knowledge_base
+        else:
+            self.diseases = knowledge_base
+    
+    @property
+    def knowledge_base(self):
+        """ฐานข้อมูลที่คอมไพล์แล้วซึ่งใช้ในการวิเคราะห์ (ใช้ร่วมกันได้หลาย SymptomChecker)"""
+        return self._kb
+    
+    @knowledge_base.setter
+    def knowledge_base(self, kb):
+        self._kb = kb
+        self._diseases = None
+        self._kb_version += 1
+    
+    @property
+    def diseases(self):
+        """ฐานข้อมูลโรค (กำหนดค่าใหม่แล้วดัชนีจะถูกสร้างใหม่อัตโนมัติ)
+        
+        หากใช้ฐานข้อมูลที่คอมไพล์แล้ว (รวมถึงฐานข้อมูลตัวอย่าง) จะได้มุมมองแบบอ่านอย่างเดียว:
+        การกำหนดหรือลบ diseases[ชื่อโรค] ยก TypeError และการแก้ข้อมูลภายในไม่มีผล
+        ให้ใช้ add_disease / remove_disease หรือกำหนด diseases ใหม่ทั้ง dict
+        """
+        if self._diseases is None:
+            return self._kb.diseases
+        return self._diseases
+    
+    @diseases.setter
+    def diseases(self, value):
+        self._diseases = value
+        self.rebuild_index()
+    
+    def rebuild_index(self):
+        """คอมไพล์ self.diseases เป็นดัชนีอาการ -> โรค ใหม่ทั้งหมด
+        
+        ต้องเรียกเองหากแก้ไขข้อมูลภายใน self.diseases โดยตรง
+        """
+        if self._diseases is not None:
+            self._kb = CompiledKnowledgeBase.from_diseases(self._diseases)
+            self._kb_version += 1
+    
+    def reload_knowledge_base(self):
+        """เปลี่ยนไปใช้ไฟล์ .skb เวอร์ชันล่าสุด (หากไฟล์ถูกแทนที่) คืน True ถ้ามีการเปลี่ยน
+        
+        ไฟล์ที่มี version ต่ำกว่าฐานข้อมูลที่เปิดอยู่ไม่ถูกนำมาใช้ (ดู knowledge_base.open_knowledge_base)
+        """
+        if self._diseases is not None or self._kb.path is None:
+            return False
+        kb = open_knowledge_base(self._kb.path)
+        if kb is self._kb:
+            return False
+        self.knowledge_base = kb
+        return True
+    
+    def add_disease(self, disease, symptoms, severity, advice):
+        """เพิ่ม (หรือแทนที่) โรคในฐานข้อมูลแล้วปรับดัชนี"""
+        if self._diseases is None:
+            self._diseases = dict(self._kb.diseases)
+        self._diseases[disease] = {
+            "symptoms": list(symptoms),
+            "severity": severity,
+            "advice": advice
+        }
+        self.rebuild_index()
+    
+    def remove_disease(self, disease):
+        """ลบโรคออกจากฐานข้อมูลแล้วปรับดัชนี"""
+        if self._diseases is None:
+            self._diseases = dict(self._kb.diseases)
+        del self._diseases[disease]
+        self.rebuild_index()
+    
+    def all_symptoms(self):
+        """รายชื่ออาการทั้งหมดที่ระบบรู้จัก"""
+        return self._kb.symptoms()
+    
+    def symptom_lookup(self, synonyms=None):
+        """ดัชนีค้นหาอาการจากข้อความอิสระ (สร้างครั้งเดียวต่อฐานข้อมูลแล้วใช้ซ้ำ)
+        
+        synonyms: dict คำพ้องความหมาย -> ชื่ออาการ (ไม่ระบุ = DEFAULT_SYNONYMS)
+        รหัสอาการที่ได้จาก resolve_id ตรงกับรหัสในฐานข้อมูล (knowledge_base.symptom_id)
+        """
+        cached = getattr(self, "_lookup_cache", None)
+        if cached is not None and cached[0] is self._kb and cached[1] is synonyms:
+            return cached[2]
+        lookup = SymptomLookup(self._kb.symptoms(),
+                               DEFAULT_SYNONYMS if synonyms is None else synonyms)
+        self._lookup_cache = (self._kb, synonyms, lookup)
+        return lookup
+    
+    def session(self):
+        """เริ่มการกรอกอาการแบบโต้ตอบ (SymptomSession) บนฐานข้อมูลของตัวตรวจสอบนี้"""
+        return SymptomSession(self)
+    
+    def cache_info(self):
+        """สถิติของแคชผลลัพธ์ ใช้ปรับขนาดแคชให้เหมาะสม"""
+        return {
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "evictions": self._cache_evictions,
+            "size": len(self._cache) if self._cache is not None else 0,
+            "maxsize": self._cache_size
         }
     
-    def check_symptoms(self, user_symptoms):
-        """วิเคราะห์อาการและให้คำแนะนำ"""
+    def cache_clear(self):
+        """ล้างแคชผลลัพธ์และรีเซ็ตสถิติ"""
+        if self._cache is not None:
+            self._cache.clear()
+        self._cache_hits = self._cache_misses = self._cache_evictions = 0
+    
+    def check_symptoms(self, user_symptoms, top_k=None, min_percentage=0):
+        """วิเคราะห์อาการและให้คำแนะนำ
+        
+        top_k: คืนเฉพาะ k โรคที่เป็นไปได้มากที่สุด (ใช้ heap ขนาด k แทนการเรียงทุกโรค)
+        min_percentage: ตัดโรคที่มีเปอร์เซ็นต์ความเป็นไปได้ต่ำกว่าค่านี้ออก
+        """
+        if self._cache is None:
+            return self._check_symptoms(user_symptoms, top_k, min_percentage)
+        
+        # อาการซ้ำทำให้เปอร์เซ็นต์เปลี่ยน จึงไม่ใช้แคชกับกรณีนี้
+        symptom_set = frozenset(user_symptoms)
+        if len(symptom_set) != len(user_symptoms):
+            return self._check_symptoms(user_symptoms, top_k, min_percentage)
+        
+        # ฐานข้อมูลเปลี่ยน ผลที่จำไว้ใช้ไม่ได้แล้ว
+        if self._cache_version != self._kb_version:
+            self._cache.clear()
+            self._cache_version = self._kb_version
+        
+        key = (symptom_set, top_k, min_percentage)
+        cached = self._cache.get(key)
+        if cached is None:
+            self._cache_misses += 1
+            results = self._check_symptoms(user_symptoms, top_k, min_percentage)
+            # เก็บเป็น tuple/frozenset เพื่อไม่ให้ผู้เรียกแก้ไขข้อมูลในแคชได้
+            self._cache[key] = tuple(
+                (r["disease"], r["percentage"], frozenset(r["matching_symptoms"]), r["severity"], r["advice"])
+                for r in results
+            )
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+                self._cache_evictions += 1
+            return results
+        
+        self._cache_hits += 1
+        self._cache.move_to_end(key)
+        # สร้างผลลัพธ์ชุดใหม่ทุกครั้ง โดยเรียงอาการที่ตรงกันตามลำดับที่ผู้ใช้ระบุในครั้งนี้
+        return [
+            {
+                "disease": disease,
+                "percentage": percentage,
+                "matching_symptoms": [s for s in user_symptoms if s in matching],
+                "severity": severity,
+                "advice": advice
+            }
+            for disease, percentage, matching, severity, advice in cached
+        ]
+    
+    def _check_symptoms(self, user_symptoms, top_k=None, min_percentage=0):
+        """วิเคราะห์อาการจริง (ไม่ผ่านแคช)"""
+        if top_k is not None and top_k <= 0:
+            return []
+        kb = self._kb
+        
+        # ให้แต่ละอาการ (ที่ไม่ซ้ำ) ของผู้ใช้มีบิตของตัวเอง แล้วสะสม bitset ของอาการที่ตรงกัน
+        # เฉพาะโรคที่มีอาการร่วมกันอย่างน้อย 1 อาการ (ผ่านดัชนีอาการ -> โรค)
+        known_symptoms = []
+        query_bits = {}
+        bit_counts = []
+        hits = {}
+        for symptom in user_symptoms:
+            symptom_id = kb.symptom_id(symptom)
+            if symptom_id is None:
+                continue
+            bit = query_bits.get(symptom_id)
+            if bit is None:
+                bit = query_bits[symptom_id] = len(query_bits)
+                bit_counts.append(0)
+                flag = 1 << bit
+                for disease_id in kb.postings(symptom_id):
+                    hits[disease_id] = hits.get(disease_id, 0) | flag
+            bit_counts[bit] += 1
+            known_symptoms.append((symptom, bit))
+        
+        # คำนวณเปอร์เซ็นต์ความเป็นไปได้ (อาการที่ผู้ใช้ระบุซ้ำจะถูกนับซ้ำเหมือนเดิม)
+        has_duplicates = len(known_symptoms) != len(bit_counts)
+        max_matches = len(known_symptoms)
+        ranked = []  # heap ของ (เปอร์เซ็นต์, -รหัสโรค) เมื่อใช้ top_k
+        for disease_id, disease_hits in hits.items():
+            size = kb.disease_size(disease_id)
+            
+            # ตัดทิ้งทันทีถ้าแม้ตรงทุกอาการก็ยังไม่ผ่านเกณฑ์หรือไม่ติดอันดับ
+            upper_bound = max_matches / size * 100
+            if upper_bound < min_percentage:
+                continue
+            if top_k is not None and len(ranked) >= top_k and upper_bound < ranked[0][0]:
+                continue
+            
+            if has_duplicates:
+                matches = sum(bit_counts[bit] for bit in range(len(bit_counts)) if disease_hits >> bit & 1)
+            else:
+                matches = bin(disease_hits).count("1")
+            match_percentage = (matches / size) * 100
+            if match_percentage < min_percentage:
+                continue
+            
+            entry = (match_percentage, -disease_id)
+            if top_k is None:
+                ranked.append(entry)
+            elif len(ranked) < top_k:
+                heapq.heappush(ranked, entry)
+            elif entry > ranked[0]:
+                heapq.heapreplace(ranked, entry)
+        
+        # เรียงลำดับตามเปอร์เซ็นต์ (เท่ากันให้โรคที่อยู่ก่อนในฐานข้อมูลมาก่อน)
+        ranked.sort(key=lambda x: (-x[0], -x[1]))
+        
+        # สร้างผลลัพธ์เฉพาะโรคที่ผ่านการคัดเลือก
         possible_diseases = []
+        for match_percentage, negative_id in ranked:
+            disease_id = -negative_id
+            disease_hits = hits[disease_id]
+            possible_diseases.append({
+                "disease": kb.disease_name(disease_id),
+                "percentage": match_percentage,
+                # อาการที่ตรงกัน (เรียงตามลำดับที่ผู้ใช้ระบุ)
+                "matching_symptoms": [s for s, bit in known_symptoms if disease_hits >> bit & 1],
+                "severity": kb.disease_severity(disease_id),
+                "advice": kb.disease_advice(disease_id)
+            })
+        
+        return possible_diseases
+    
+    def _incidence_matrix(self):
+        """เมทริกซ์ความสัมพันธ์ โรค x อาการ แบบ sparse (เก็บเป็นคอลัมน์ตามอาการ)
+        
+        คืนค่า (symptom_ptr, symptom_diseases, disease_sizes) โดย
+        symptom_diseases[symptom_ptr[i]:symptom_ptr[i + 1]] คือโรคที่มีอาการรหัส i
+        อาร์เรย์อ้างอิงข้อมูลในฐานข้อมูลที่คอมไพล์แล้วโดยตรง (ไม่คัดลอก)
+        """
+        import numpy as np
         
-        # ตรวจสอบอาการกับแต่ละโรค
-        for disease, info in self.diseases.items():
-            # นับจำนวนอาการที่ตรงกัน
-            matching_symptoms = []
+        cached = getattr(self, "_matrix_cache", None)
+        if cached is not None and cached[0] == self._kb_version:
+            return cached[1]
+        
+        symptom_ptr, symptom_diseases, disease_symptom_ptr = self._kb.incidence_arrays()
+        symptom_ptr = np.frombuffer(symptom_ptr, dtype=np.int64)
+        symptom_diseases = np.frombuffer(symptom_diseases, dtype=np.int32)
+        disease_sizes = np.diff(np.frombuffer(disease_symptom_ptr, dtype=np.int64)).astype(np.float64)
+        
+        matrix = (symptom_ptr, symptom_diseases, disease_sizes)
+        self._matrix_cache = (self._kb_version, matrix)
+        return matrix
+    
+    def _disease_size_index(self):
+        """โรคจัดกลุ่มตามจำนวนอาการ (ใช้ใน SymptomSession)
+        
+        คืนค่า (sizes, size_codes, size_order, size_starts) โดย sizes คือจำนวนอาการที่ต่างกันทั้งหมด (น้อยไปมาก)
+        size_codes[d] คือลำดับใน sizes ของจำนวนอาการของโรค d
+        และ size_order[size_starts[i]:size_starts[i + 1]] คือรหัสโรคที่มี sizes[i] อาการ เรียงจากน้อยไปมาก
+        """
+        import numpy as np
+        
+        cached = getattr(self, "_size_index_cache", None)
+        if cached is not None and cached[0] == self._kb_version:
+            return cached[1]
+        
+        sizes, size_codes = np.unique(self._incidence_matrix()[2], return_inverse=True)
+        size_order = np.argsort(size_codes, kind="stable")
+        size_starts = np.searchsorted(size_codes[size_order], np.arange(len(sizes) + 1))
+        index = (sizes.tolist(), size_codes, size_order, size_starts)
+        self._size_index_cache = (self._kb_version, index)
+        return index
+    
+    def iter_check_symptoms_batch(self, symptom_lists, chunk_size=1024, top_k=None, min_percentage=0):
+        """วิเคราะห์อาการของผู้ป่วยหลายคน ทีละกลุ่ม (chunk) แล้วส่งผลคืนทีละคนตามลำดับ
+        
+        หน่วยความจำที่ใช้ขึ้นกับ chunk_size ไม่ใช่จำนวนผู้ป่วยทั้งหมด
+        top_k และ min_percentage ทำงานเหมือนใน check_symptoms
+        """
+        symptom_ptr, symptom_diseases, disease_sizes = self._incidence_matrix()
+        n_diseases = self._kb.n_diseases
+        
+        chunk = []
+        for user_symptoms in symptom_lists:
+            chunk.append(user_symptoms)
+            if len(chunk) >= chunk_size:
+                yield from self._score_chunk(chunk, symptom_ptr, symptom_diseases,
+                                             disease_sizes, n_diseases, top_k, min_percentage)
+                chunk = []
+        if chunk:
+            yield from self._score_chunk(chunk, symptom_ptr, symptom_diseases,
+                                         disease_sizes, n_diseases, top_k, min_percentage)
+    
+    def check_symptoms_batch(self, symptom_lists, chunk_size=1024, top_k=None, min_percentage=0):
+        """วิเคราะห์อาการของผู้ป่วยหลายคนในครั้งเดียว (ผลเหมือนเรียก check_symptoms ทีละคน)"""
+        return list(self.iter_check_symptoms_batch(symptom_lists, chunk_size, top_k, min_percentage))
+    
+    def _score_chunk(self, chunk, symptom_ptr, symptom_diseases, disease_sizes, n_diseases,
+                     top_k=None, min_percentage=0):
+        """ให้คะแนนผู้ป่วยหนึ่งกลุ่มด้วยการคูณเมทริกซ์ sparse ผู้ป่วย x อาการ กับ อาการ x โรค"""
+        import numpy as np
+        
+        kb = self._kb
+        
+        # เข้ารหัสอาการของผู้ป่วยเป็นเมทริกซ์ sparse (แถว = ผู้ป่วย, คอลัมน์ = รหัสอาการ)
+        rows = []
+        cols = []
+        known_per_row = []
+        for row, user_symptoms in enumerate(chunk):
+            known_symptoms = []
             for symptom in user_symptoms:
-                if symptom in info["symptoms"]:
-                    matching_symptoms.append(symptom)
+                symptom_id = kb.symptom_id(symptom)
+                if symptom_id is None:
+                    continue
+                known_symptoms.append(symptom)
+                rows.append(row)
+                cols.append(symptom_id)
+            known_per_row.append(known_symptoms)
+        
+        results = [[] for _ in chunk]
+        if rows:
+            rows = np.array(rows, dtype=np.int64)
+            cols = np.array(cols, dtype=np.int64)
+            
+            # ผลคูณเมทริกซ์: กระจายแต่ละ (ผู้ป่วย, อาการ) ไปยังทุกโรคที่มีอาการนั้น
+            starts = symptom_ptr[cols]
+            lengths = symptom_ptr[cols + 1] - starts
+            total = int(lengths.sum())
+            offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            pair_diseases = symptom_diseases[np.repeat(starts, lengths) + offsets]
+            pair_keys = np.repeat(rows, lengths) * n_diseases + pair_diseases
+            pair_entries = np.repeat(np.arange(len(cols)), lengths)
+            
+            # รวมคู่ (ผู้ป่วย, โรค) เดียวกันเป็นกลุ่ม การเรียงแบบ stable ทำให้อาการในกลุ่มอยู่ตามลำดับที่ผู้ใช้ระบุ
+            order = np.argsort(pair_keys, kind="stable")
+            pair_keys = pair_keys[order]
+            group_starts = np.flatnonzero(np.r_[True, pair_keys[1:] != pair_keys[:-1]])
+            counts = np.diff(np.r_[group_starts, total])
+            keys = pair_keys[group_starts]
+            key_rows = keys // n_diseases
+            key_diseases = keys % n_diseases
+            percentages = counts / disease_sizes[key_diseases] * 100
+            
+            # เรียงตามผู้ป่วย -> เปอร์เซ็นต์จากมากไปน้อย -> ลำดับโรคในฐานข้อมูล
+            ranked = np.lexsort((key_diseases, -percentages, key_rows))
+            if min_percentage:
+                ranked = ranked[percentages[ranked] >= min_percentage]
+            if top_k is not None:
+                # ลำดับภายในกลุ่มผู้ป่วยเดียวกัน (0, 1, 2, ...) แล้วเก็บเฉพาะ k อันดับแรก
+                ranked_rows = key_rows[ranked]
+                row_starts = np.flatnonzero(np.r_[True, ranked_rows[1:] != ranked_rows[:-1]])
+                rank_in_row = np.arange(len(ranked)) - np.repeat(row_starts, np.diff(np.r_[row_starts, len(ranked)]))
+                ranked = ranked[rank_in_row < top_k]
             
-            # คำนวณเปอร์เซ็นต์ความเป็นไปได้
-            if matching_symptoms:
-                match_percentage = (len(matching_symptoms) / len(info["symptoms"])) * 100
-                possible_diseases.append({
-                    "disease": disease,
-                    "percentage": match_percentage,
-                    "matching_symptoms": matching_symptoms,
-                    "severity": info["severity"],
-                    "advice": info["advice"]
+            entry_symptoms = [symptom for known_symptoms in known_per_row for symptom in known_symptoms]
+            sorted_entries = pair_entries[order].tolist()
+            group_starts = group_starts.tolist()
+            counts = counts.tolist()
+            # ชื่อ/ความรุนแรง/คำแนะนำของโรคที่ซ้ำกันในกลุ่ม ถอดรหัสจากฐานข้อมูลครั้งเดียว
+            disease_texts = {}
+            for group, row, disease_id, percentage in zip(ranked.tolist(),
+                                                          key_rows[ranked].tolist(),
+                                                          key_diseases[ranked].tolist(),
+                                                          percentages[ranked].tolist()):
+                texts = disease_texts.get(disease_id)
+                if texts is None:
+                    texts = disease_texts[disease_id] = (kb.disease_name(disease_id),
+                                                         kb.disease_severity(disease_id),
+                                                         kb.disease_advice(disease_id))
+                start = group_starts[group]
+                results[row].append({
+                    "disease": texts[0],
+                    "percentage": percentage,
+                    "matching_symptoms": [entry_symptoms[e] for e in
+                                          sorted_entries[start:start + counts[group]]],
+                    "severity": texts[1],
+                    "advice": texts[2]
                 })
         
-        # เรียงลำดับตามเปอร์เซ็นต์
-        possible_diseases.sort(key=lambda x: x["percentage"], reverse=True)
+        return results
+    
+    def check_records(self, records, top_k=None, min_percentage=0, resolve=True):
+        """วิเคราะห์คำขอหลายรายการ (dict ที่มี "symptoms" เป็นรายการข้อความ เช่นจากโหมด batch)
         
-        return possible_diseases
+        resolve=True: แปลงข้อความอิสระและคำพ้องเป็นชื่ออาการมาตรฐานด้วย symptom_lookup() แบบโหมดโต้ตอบ
+        คืนรายการ dict (symptoms ที่ใช้วิเคราะห์, unknown_symptoms ที่ไม่รู้จัก, results จาก check_symptoms)
+        หรือ RecordError ของรายการที่ข้อมูลไม่ถูกต้อง รายการที่ถูกต้องวิเคราะห์พร้อมกันด้วย check_symptoms_batch
+        """
+        from jsonl_batch import RecordError
+        
+        lookup = self.symptom_lookup() if resolve else None
+        canonical_names = {}     # ข้อความที่ผู้ใช้พิมพ์ -> ชื่ออาการมาตรฐาน (None = ไม่รู้จัก) ข้อความซ้ำจึงหาครั้งเดียว
+        outputs = [None] * len(records)
+        valid, symptom_lists, unknown_lists = [], [], []
+        for i, record in enumerate(records):
+            symptoms = record.get("symptoms")
+            if not isinstance(symptoms, list) or not all(isinstance(s, str) for s in symptoms):
+                outputs[i] = RecordError("symptoms ต้องเป็นรายการข้อความ")
+                continue
+            known, unknown = [], []
+            for symptom in symptoms:
+                if symptom in canonical_names:
+                    canonical = canonical_names[symptom]
+                elif lookup is not None:
+                    canonical = canonical_names[symptom] = lookup.resolve(symptom)
+                else:
+                    canonical = canonical_names[symptom] = (
+                        symptom if self._kb.symptom_id(symptom) is not None else None)
+                if canonical is not None:
+                    known.append(canonical)
+                else:
+                    unknown.append(symptom)
+            valid.append(i)
+            symptom_lists.append(known)
+            unknown_lists.append(unknown)
+        
+        results = self.check_symptoms_batch(symptom_lists, top_k=top_k, min_percentage=min_percentage)
+        for i, known, unknown, result in zip(valid, symptom_lists, unknown_lists, results):
+            outputs[i] = {"symptoms": known, "unknown_symptoms": unknown, "results": result}
+        return outputs
     
     def display_results(self, results):
         """แสดงผลการวิเคราะห์"""
@@ -86,6 +532,140 @@ class SymptomChecker:
         print("    ควรพบแพทย์เพื่อการวินิจฉัยที่แม่นยำ")
         print("="*50)
 
+class SymptomSession:
+    """การกรอกอาการแบบโต้ตอบ: เพิ่ม/ลบอาการทีละอย่างแล้วดูอันดับโรคได้ทันที
+    
+    เก็บจำนวนอาการที่ตรงกันของทุกโรคใน array และจำนวนโรคในแต่ละกลุ่ม (จำนวนที่ตรงกัน, จำนวนอาการของโรค)
+    ซึ่งในกลุ่มเดียวกันเปอร์เซ็นต์เท่ากันทั้งหมด การเพิ่มหรือลบหนึ่งอาการจึงเป็นการบวกแบบ vectorized
+    บน postings ของอาการนั้น (counts[postings] += 1) ไม่ต้องวนทีละโรคใน Python
+    และการหา top(k) ไล่ดูเฉพาะกลุ่มที่เปอร์เซ็นต์สูงสุดที่ยังมีโรคอยู่ โดยไม่ต้องคิดเปอร์เซ็นต์ของทุกโรค
+    (ผลของ top(k) เหมือนกับ checker.check_symptoms(session.symptoms, top_k=k))
+    """
+    
+    def __init__(self, checker):
+        self.checker = checker
+        self.symptoms = []
+        self._reset()
+    
+    def _reset(self):
+        import numpy as np
+        
+        self._kb = self.checker.knowledge_base
+        self._kb_version = self.checker._kb_version
+        self._symptom_ptr, self._symptom_diseases, _ = self.checker._incidence_matrix()
+        self._sizes, self._size_codes, self._size_order, self._size_starts = self.checker._disease_size_index()
+        self._counts = np.zeros(self._kb.n_diseases, dtype=np.int32)   # รหัสโรค -> จำนวนอาการที่ตรงกัน
+        # _groups[จำนวนที่ตรงกัน, ลำดับจำนวนอาการใน _sizes] = จำนวนโรคในกลุ่ม (แถว 0 ไม่ใช้)
+        self._groups = np.zeros((len(self.symptoms) + 2, len(self._sizes)), dtype=np.int64)
+        for symptom in self.symptoms:
+            self._update(symptom, 1)
+    
+    def _sync(self):
+        # ฐานข้อมูลของ checker เปลี่ยน ต้องนับใหม่จากอาการที่มีอยู่
+        if self._kb_version != self.checker._kb_version:
+            self._reset()
+    
+    def _update(self, symptom, delta):
+        import numpy as np
+        
+        symptom_id = self._kb.symptom_id(symptom)
+        if symptom_id is None:
+            return False
+        ptr = self._symptom_ptr
+        diseases = self._symptom_diseases[ptr[symptom_id]:ptr[symptom_id + 1]]
+        if delta > 0 and len(self._groups) < len(self.symptoms) + 2:
+            # จำนวนที่ตรงกันสูงสุดคือจำนวนอาการในรายการ (รวมอาการที่กำลังเพิ่ม)
+            self._groups = np.vstack([self._groups, np.zeros((len(self.symptoms) + 2 - len(self._groups),
+                                                              len(self._sizes)), dtype=np.int64)])
+        # postings ของแต่ละอาการไม่มีโรคซ้ำ การบวกผ่าน index จึงนับครบทุกโรค
+        old_counts = self._counts[diseases]
+        self._counts[diseases] = old_counts + delta
+        # ย้ายโรคจากกลุ่มเดิมไปกลุ่มใหม่ (ตำแหน่งใน _groups แบบแบน: จำนวนที่ตรงกัน * width + ลำดับจำนวนอาการ)
+        width = len(self._sizes)
+        groups = old_counts * width + self._size_codes[diseases]
+        moved = (np.bincount(groups + delta * width, minlength=self._groups.size)
+                 - np.bincount(groups, minlength=self._groups.size))
+        self._groups += moved.reshape(self._groups.shape)
+        return True
+    
+    def _group_members(self, count, size_code, limit):
+        """รหัสโรคที่น้อยที่สุด limit รหัสในกลุ่ม (count, size_code) (ไล่รายชื่อโรคที่มีจำนวนอาการนั้นทีละช่วง)"""
+        import numpy as np
+        
+        diseases = self._size_order[self._size_starts[size_code]:self._size_starts[size_code + 1]]
+        # ช่วงละประมาณสองเท่าของระยะที่คาดว่าจะพบครบ limit โรค (โรคในกลุ่มกระจายอยู่ทั่วรายชื่อ)
+        step = max(4096, 2 * limit * len(diseases) // int(self._groups[count, size_code]))
+        found = []
+        n_found = 0
+        for start in range(0, len(diseases), step):
+            block = diseases[start:start + step]
+            members = block[self._counts[block] == count]
+            found.append(members)
+            n_found += len(members)
+            if n_found >= limit:
+                break
+        return np.concatenate(found)[:limit].tolist()
+    
+    def add(self, symptom):
+        """เพิ่มอาการ คืน False หากไม่รู้จักอาการนี้ (อาการจะไม่ถูกเพิ่ม)"""
+        self._sync()
+        if not self._update(symptom, 1):
+            return False
+        self.symptoms.append(symptom)
+        return True
+    
+    def remove(self, symptom):
+        """ลบอาการ (ครั้งแรกที่พบ) คืน False หากไม่มีอาการนี้ในรายการ"""
+        self._sync()
+        if symptom not in self.symptoms:
+            return False
+        self.symptoms.remove(symptom)
+        self._update(symptom, -1)
+        return True
+    
+    def clear(self):
+        """ล้างอาการทั้งหมด"""
+        self.symptoms = []
+        self._reset()
+    
+    def top(self, k=3, min_percentage=0):
+        """อันดับโรคที่เป็นไปได้มากที่สุด k อันดับจากอาการปัจจุบัน"""
+        import numpy as np
+        
+        self._sync()
+        kb = self._kb
+        
+        # รวมกลุ่มที่มีเปอร์เซ็นต์เท่ากัน (เช่น 1/2 กับ 2/4) แล้วไล่จากเปอร์เซ็นต์สูงสุด
+        by_percentage = {}
+        counts, size_codes = np.nonzero(self._groups[1:])
+        for count, size_code in zip((counts + 1).tolist(), size_codes.tolist()):
+            match_percentage = (count / self._sizes[size_code]) * 100
+            if match_percentage >= min_percentage:
+                by_percentage.setdefault(match_percentage, []).append((count, size_code))
+        
+        ranked = []
+        for match_percentage in sorted(by_percentage, reverse=True):
+            needed = k - len(ranked)
+            if needed <= 0:
+                break
+            members = [self._group_members(count, size_code, needed)
+                       for count, size_code in by_percentage[match_percentage]]
+            for disease_id in list(heapq.merge(*members))[:needed]:
+                ranked.append((match_percentage, disease_id))
+        
+        results = []
+        for match_percentage, disease_id in ranked:
+            disease_symptoms = set(kb.disease_symptom_ids(disease_id))
+            results.append({
+                "disease": kb.disease_name(disease_id),
+                "percentage": match_percentage,
+                "matching_symptoms": [s for s in self.symptoms
+                                      if kb.symptom_id(s) in disease_symptoms],
+                "severity": kb.disease_severity(disease_id),
+                "advice": kb.disease_advice(disease_id)
+            })
+        return results
+
 def main():
     print("\n🏥 ยินดีต้อนรับสู่ระบบตรวจสอบอาการเบื้องต้น")
     print("    (AI for Medicine - ตัวอย่างสำหรับนักเรียน)")
@@ -94,9 +674,8 @@ def main():
     checker = SymptomChecker()
     
     # แสดงรายการอาการที่มีในระบบ
-    all_symptoms = set()
-    for info in checker.diseases.values():
-        all_symptoms.update(info["symptoms"])
+    all_symptoms = checker.all_symptoms()
+    lookup = checker.symptom_lookup()
     
     print("\n📋 อาการที่ระบบรู้จัก:")
     for i, symptom in enumerate(sorted(all_symptoms), 1):
@@ -111,18 +690,47 @@ def main():
         symptom = input("   อาการ: ").strip()
         if symptom.lower() == 'จบ':
             break
-        if symptom and symptom in all_symptoms:
-            user_symptoms.append(symptom)
-            print(f"   ✅ เพิ่มอาการ: {symptom}")
-        elif symptom:
-            print(f"   ❓ ไม่พบอาการนี้ในระบบ: {symptom}")
+        if not symptom:
+            continue
+        canonical = lookup.resolve(symptom)
+        if canonical is not None:
+            user_symptoms.append(canonical)
+            print(f"   ✅ เพิ่มอาการ: {canonical}")
+        else:
+            suggestions = lookup.suggest(symptom, limit=3)
+            if suggestions:
+                print(f"   ❓ ไม่พบอาการนี้ในระบบ: {symptom} (หมายถึง: {', '.join(s for s, _ in suggestions)} ?)")
+            else:
+                print(f"   ❓ ไม่พบอาการนี้ในระบบ: {symptom}")
     
     if user_symptoms:
         print(f"\n🔍 กำลังวิเคราะห์อาการ: {', '.join(user_symptoms)}")
-        results = checker.check_symptoms(user_symptoms)
+        results = checker.check_symptoms(user_symptoms, top_k=3)
         checker.display_results(results)
     else:
         print("\n❌ คุณยังไม่ได้ระบุอาการใดๆ")
 
+def batch_main(argv=None):
+    """โหมด batch: อ่านคำขอ JSONL ({"symptoms": ["มีไข้", "ไอ"]}) แล้วเขียนผลการวิเคราะห์เป็น JSONL
+    (ดู jsonl_batch)"""
+    from jsonl_batch import batch_main as run
+    
+    def add_arguments(parser):
+        parser.add_argument("--kb", help="ไฟล์ฐานข้อมูล .skb (ไม่ระบุ = ฐานข้อมูลตัวอย่าง)")
+        parser.add_argument("--top-k", type=int, default=3, help="จำนวนโรคสูงสุดต่อคำขอ (0 = ทั้งหมด)")
+        parser.add_argument("--min-percentage", type=float, default=0, help="เปอร์เซ็นต์ขั้นต่ำของโรคที่แสดง")
+        parser.add_argument("--no-resolve", action="store_true",
+                            help="ใช้ชื่ออาการตามที่ระบุ ไม่แปลงข้อความอิสระ/คำพ้อง")
+    
+    def make_handler(args):
+        checker = SymptomChecker(args.kb)
+        top_k = args.top_k or None
+        return lambda records: checker.check_records(records, top_k, args.min_percentage,
+                                                     resolve=not args.no_resolve)
+    
+    return run(make_handler, argv, description="วิเคราะห์อาการจากคำขอ JSONL", add_arguments=add_arguments)
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch_main(sys.argv[2:]))
     main()
\ No newline at end of file
@@ -0,0 +1,282 @@
+"""
+ตัวสร้างฐานข้อมูลโรคและคำถามผู้ป่วยจำลองขนาดใหญ่ (Synthetic Knowledge Base) สำหรับทดสอบโหลดของ SymptomChecker
+
+ฐานข้อมูลตัวอย่างมีเพียง 5 โรค จึงไม่บอกพฤติกรรมของตัวตรวจสอบที่ขนาดจริง ตัวสร้างนี้จำลอง:
+    - โรคได้หลายหมื่นโรค แต่ละโรคมีจำนวนอาการตามช่วงที่กำหนด
+    - ความนิยมของอาการแบบ Zipf (อาการอันดับ r ถูกเลือกด้วยความน่าจะเป็น ∝ 1 / r^s)
+      อาการอันดับต้นๆ จึงอยู่ในโรคจำนวนมาก ขณะที่อาการส่วนใหญ่พบในไม่กี่โรค
+    - ความชุกของโรคแบบ Zipf เช่นกัน (โรคที่พบบ่อยถูกสุ่มเป็นคำถามบ่อยกว่า)
+    - คำถามของผู้ป่วย: สุ่มโรคแล้วเลือกอาการบางส่วนของโรคนั้น พร้อมสัญญาณรบกวน
+      (แทนอาการด้วยอาการอื่นที่ไม่เกี่ยวข้อง หรือพิมพ์ชื่ออาการผิด)
+
+ผลเหมือนเดิมทุกครั้งเมื่อใช้ seed เดิม การสุ่มทำแบบ vectorized ด้วย numpy (คำถามหนึ่งล้านรายการใช้เวลาไม่กี่วินาที)
+
+ตัวอย่างการใช้งาน:
+    python synthetic_knowledge_base.py --diseases 50000 --kb synthetic.skb --queries 1000000 --queries-output queries.jsonl
+    python symptom_checker.py batch queries.jsonl --kb synthetic.skb --no-resolve > results.jsonl
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from knowledge_base import CompiledKnowledgeBase, compile_knowledge_base
+
+# ส่วนประกอบของชื่ออาการ: ลักษณะอาการ + ตำแหน่ง + ระดับ
+_QUALIFIERS = ["ปวด", "เจ็บ", "บวม", "คัน", "ชา", "แสบ", "อักเสบที่", "มีผื่นที่", "ตึง", "ร้อนที่",
+               "อ่อนแรงที่", "กระตุกที่", "มีก้อนที่", "เป็นแผลที่", "ซีดที่", "มีเลือดออกที่"]
+_BODY_PARTS = ["หัว", "ตา", "หู", "จมูก", "คอ", "ไหล่", "แขน", "ข้อศอก", "ข้อมือ", "มือ", "นิ้ว", "หน้าอก",
+               "หลัง", "เอว", "ท้อง", "ท้องน้อย", "สะโพก", "ขา", "เข่า", "ข้อเท้า", "เท้า", "ผิวหนัง",
+               "ริมฝีปาก", "ลิ้น", "เหงือก", "ฟัน", "ต้นคอ", "กระดูกสันหลัง", "ซี่โครง", "ขาหนีบ"]
+_INTENSITIES = ["", "เล็กน้อย", "มาก", "เรื้อรัง", "เฉียบพลัน", "ตอนกลางคืน", "หลังอาหาร", "เป็นพักๆ"]
+
+SEVERITIES = ("เล็กน้อย", "ปานกลาง", "รุนแรง")
+_SEVERITY_WEIGHTS = (0.5, 0.35, 0.15)
+_ADVICE = {
+    "เล็กน้อย": ["พักผ่อน ดื่มน้ำมากๆ สังเกตอาการ", "ดูแลตัวเองที่บ้าน หากไม่ดีขึ้นใน 3 วันควรพบแพทย์"],
+    "ปานกลาง": ["ควรพบแพทย์ภายใน 1-2 วัน", "ปรึกษาเภสัชกรหรือแพทย์เพื่อรับการรักษาที่เหมาะสม"],
+    "รุนแรง": ["ควรพบแพทย์โดยเร็ว", "ไปโรงพยาบาลทันทีหากอาการแย่ลง"],
+}
+
+
+def symptom_vocabulary(n_symptoms, rng):
+    """ชื่ออาการภาษาไทยที่ไม่ซ้ำกัน n_symptoms ชื่อ เรียงแบบสุ่ม (ลำดับ = อันดับความนิยม)"""
+    names = [f"{qualifier}{part}{intensity}" for intensity in _INTENSITIES
+             for qualifier in _QUALIFIERS for part in _BODY_PARTS]
+    names = [names[i] for i in rng.permutation(len(names))]
+    # ชื่อเกินจำนวนที่ประกอบได้ ใช้ชื่อเดิมต่อท้ายด้วยหมายเลขชนิด
+    base = len(names)
+    for i in range(base, n_symptoms):
+        names.append(f"{names[i % base]} ชนิดที่ {i // base + 1}")
+    return names[:n_symptoms]
+
+
+def zipf_probabilities(n, exponent):
+    """ความน่าจะเป็นของอันดับ 1..n แบบ Zipf (∝ 1 / r^exponent) exponent=0 คือสุ่มเท่ากัน"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+# จำนวนรอบสูงสุดของการสุ่มแบบใส่คืนแล้วตัดตัวซ้ำ ก่อนเปลี่ยนไปสุ่มแบบไม่ใส่คืนทีละโรค
+_MAX_SAMPLING_ROUNDS = 8
+
+
+def _sample_ranks(cumulative, size, rng):
+    """สุ่มอันดับตามการแจกแจงสะสม (inverse CDF ด้วย searchsorted)"""
+    return np.minimum(np.searchsorted(cumulative, rng.random(size), side="right"), len(cumulative) - 1)
+
+
+class SyntheticKnowledgeBase:
+    """ฐานข้อมูลโรคจำลองในรูปอาร์เรย์ (CSR: disease_ptr, disease_symptoms) พร้อมตัวสร้างคำถามที่สอดคล้องกัน
+
+    n_symptoms: ขนาดคำศัพท์อาการ (ไม่ระบุ = n_diseases // 4 อย่างน้อย 100)
+    symptoms_per_disease: ช่วง (ต่ำสุด, สูงสุด) ของจำนวนอาการต่อโรค
+    symptom_exponent: เลขชี้กำลัง Zipf ของความนิยมของอาการ
+    disease_exponent: เลขชี้กำลัง Zipf ของความชุกของโรค (ใช้ตอนสุ่มคำถาม)
+    """
+
+    def __init__(self, n_diseases, n_symptoms=None, symptoms_per_disease=(3, 12), symptom_exponent=1.0,
+                 disease_exponent=0.8, seed=0):
+        low, high = symptoms_per_disease
+        if n_symptoms is None:
+            n_symptoms = max(100, n_diseases // 4)
+        if not 1 <= low <= high <= n_symptoms:
+            raise ValueError("symptoms_per_disease ต้องอยู่ในช่วง 1 ถึงจำนวนอาการ")
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.vocabulary = symptom_vocabulary(n_symptoms, rng)
+        self.disease_names = [f"โรคจำลอง{i:0{len(str(n_diseases - 1))}d}" for i in range(n_diseases)]
+        self.symptom_cdf = np.cumsum(zipf_probabilities(n_symptoms, symptom_exponent))
+        self.disease_cdf = np.cumsum(zipf_probabilities(n_diseases, disease_exponent))
+
+        sizes = rng.integers(low, high + 1, n_diseases)
+        self.disease_ptr = np.zeros(n_diseases + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.disease_ptr[1:])
+        # เมทริกซ์อาการ (โรค x ช่อง) เติม -1 ในช่องที่เกินจำนวนอาการของโรค
+        self.padded = np.full((n_diseases, high), -1, dtype=np.int32)
+        pending = np.arange(n_diseases)
+        for _ in range(_MAX_SAMPLING_ROUNDS):
+            if not len(pending):
+                break
+            # สุ่มแบบใส่คืนเกินจำนวนที่ต้องการ แล้วเก็บเฉพาะอาการที่ไม่ซ้ำตามลำดับที่สุ่มได้
+            # โรคที่ได้อาการไม่ซ้ำไม่ครบ (อาการยอดนิยมซ้ำมาก) สุ่มใหม่ในรอบถัดไป
+            draws = _sample_ranks(self.symptom_cdf, (len(pending), 2 * high + 4), rng)
+            order = np.argsort(draws, axis=1, kind="stable")
+            ranked = np.take_along_axis(draws, order, axis=1)
+            first = np.ones(ranked.shape, dtype=bool)
+            first[:, 1:] = ranked[:, 1:] != ranked[:, :-1]
+            keep = np.zeros(draws.shape, dtype=bool)
+            np.put_along_axis(keep, order, first, axis=1)
+            # ย้ายอาการที่ไม่ซ้ำไปไว้หน้าแถวโดยคงลำดับเดิม
+            slots = np.argsort(~keep, axis=1, kind="stable")[:, :high]
+            unique = np.take_along_axis(draws, slots, axis=1)
+            wanted = sizes[pending]
+            done = keep.sum(axis=1) >= wanted
+            filled = np.where(np.arange(high) < wanted[done, None], unique[done], -1)
+            self.padded[pending[done]] = filled
+            pending = pending[~done]
+        # โรคที่ยังไม่ครบ (จำนวนอาการต่อโรคใกล้ขนาดคำศัพท์และ Zipf ชันมาก) สุ่มแบบไม่ใส่คืนตามความนิยมโดยตรง
+        if len(pending):
+            probabilities = zipf_probabilities(n_symptoms, symptom_exponent)
+            for disease in pending.tolist():
+                self.padded[disease, :sizes[disease]] = rng.choice(n_symptoms, sizes[disease], replace=False,
+                                                                   p=probabilities)
+        self.disease_symptoms = self.padded[self.padded >= 0]
+
+        severities = rng.choice(len(SEVERITIES), n_diseases, p=_SEVERITY_WEIGHTS)
+        advice = rng.integers(0, 2, n_diseases)
+        self.severity = [SEVERITIES[code] for code in severities.tolist()]
+        self.advice = [_ADVICE[severity][choice] for severity, choice in zip(self.severity, advice.tolist())]
+
+    @property
+    def n_diseases(self):
+        return len(self.disease_names)
+
+    @property
+    def n_symptoms(self):
+        return len(self.vocabulary)
+
+    def to_diseases(self):
+        """ข้อมูลโรคแบบเดียวกับ SymptomChecker.diseases (ส่งให้ SymptomChecker(...) ได้โดยตรง)"""
+        names = np.array(self.vocabulary, dtype=object)[self.disease_symptoms].tolist()
+        ptr = self.disease_ptr.tolist()
+        return {
+            disease: {"symptoms": names[ptr[i]:ptr[i + 1]], "severity": self.severity[i], "advice": self.advice[i]}
+            for i, disease in enumerate(self.disease_names)
+        }
+
+    def compile(self, version=1):
+        """คอมไพล์เป็น CompiledKnowledgeBase ในหน่วยความจำ"""
+        return CompiledKnowledgeBase.from_diseases(self.to_diseases(), version)
+
+    def save(self, path, version=1):
+        """เขียนเป็นไฟล์ .skb (เปิดด้วย SymptomChecker(path) หรือ --kb ของโหมด batch)"""
+        return compile_knowledge_base(self.to_diseases(), path, version)
+
+    def query_ids(self, n_queries, seed=None, symptoms_per_query=(2, 5), noise=0.1, typo_rate=0.0):
+        """สุ่มคำถามในรูปอาร์เรย์ คืน (รหัสโรคที่เป็นต้นเหตุ, เมทริกซ์รหัสอาการ (คำถาม x ช่อง, เติม -1 ท้ายแถว))
+
+        แต่ละคำถามเลือกอาการของโรคแบบไม่ซ้ำ (ไม่เกินจำนวนอาการของโรค) แล้วแต่ละอาการมีโอกาส noise
+        ที่จะถูกแทนด้วยอาการอื่นตามความนิยม (อาการที่ไม่เกี่ยวกับโรค) และโอกาส typo_rate ที่จะถูกพิมพ์ผิด
+        รหัสตั้งแต่ n_symptoms ขึ้นไปคือชื่อที่พิมพ์ผิด (ดู query_vocabulary())
+        """
+        rng = np.random.default_rng(self.seed + 1 if seed is None else seed)
+        low, high = symptoms_per_query
+        diseases = _sample_ranks(self.disease_cdf, n_queries, rng)
+        rows = self.padded[diseases]
+        sizes = (self.disease_ptr[1:] - self.disease_ptr[:-1])[diseases]
+        counts = np.minimum(rng.integers(low, high + 1, n_queries), sizes)
+
+        # เรียงช่องของแต่ละแถวแบบสุ่ม (ช่องว่างไปอยู่ท้าย) แล้วใช้ counts ช่องแรก
+        keys = rng.random(rows.shape)
+        keys[rows < 0] = 2.0
+        order = np.argsort(keys, axis=1)[:, :high]
+        symptoms = np.take_along_axis(rows, order, axis=1)
+        if noise:
+            replace = rng.random(symptoms.shape) < noise
+            symptoms[replace] = _sample_ranks(self.symptom_cdf, int(replace.sum()), rng)
+        symptoms[np.arange(symptoms.shape[1]) >= counts[:, None]] = -1
+        if noise:
+            # อาการที่สุ่มแทนอาจซ้ำกับอาการอื่นในคำถามเดียวกัน: ตัดตัวซ้ำออกแล้วเลื่อนช่องที่เหลือมาไว้หน้าแถว
+            for column in range(1, symptoms.shape[1]):
+                duplicate = (symptoms[:, :column] == symptoms[:, column:column + 1]).any(axis=1)
+                symptoms[duplicate, column] = -1
+            symptoms = np.take_along_axis(symptoms, np.argsort(symptoms < 0, axis=1, kind="stable"), axis=1)
+        if typo_rate:
+            typos = (rng.random(symptoms.shape) < typo_rate) & (symptoms >= 0)
+            typos[typos] = self._typo_names()[1][symptoms[typos]]
+            symptoms[typos] += self.n_symptoms
+        return diseases, symptoms
+
+    def _typo_names(self):
+        """(ชื่อที่พิมพ์ผิดของแต่ละอาการ (ตัดอักษรตัวสุดท้าย), array บอกว่าใช้เป็นคำพิมพ์ผิดได้หรือไม่)
+
+        ชื่อที่ตัดแล้วว่างหรือบังเอิญตรงกับชื่ออาการจริง (เช่น "... ชนิดที่ 12" -> "... ชนิดที่ 1") ใช้ไม่ได้
+        อาการนั้นจึงไม่ถูกพิมพ์ผิด มิฉะนั้นคำถามที่ตั้งใจให้ผิดจะกลายเป็นอาการที่ถูกต้อง
+        """
+        cached = getattr(self, "_typo_cache", None)
+        if cached is None:
+            known = set(self.vocabulary)
+            names = [name[:-1].rstrip() for name in self.vocabulary]
+            usable = np.array([bool(name) and name not in known for name in names])
+            cached = self._typo_cache = (names, usable)
+        return cached
+
+    def query_vocabulary(self):
+        """ชื่ออาการตามรหัสของ query_ids(): ชื่อจริงตามด้วยชื่อที่พิมพ์ผิด (ตัดอักษรตัวสุดท้าย)"""
+        return self.vocabulary + self._typo_names()[0]
+
+    def queries(self, n_queries, seed=None, symptoms_per_query=(2, 5), noise=0.1, typo_rate=0.0):
+        """คำถามของผู้ป่วยจำลอง คืน (รายการชุดอาการ, รายชื่อโรคที่เป็นต้นเหตุ)
+
+        typo_rate > 0 ใช้ทดสอบการค้นหาแบบ fuzzy (symptom_lookup) ของ check_records
+        """
+        diseases, symptoms = self.query_ids(n_queries, seed, symptoms_per_query, noise, typo_rate)
+        valid = symptoms >= 0
+        names = np.array(self.query_vocabulary(), dtype=object)[symptoms[valid]].tolist()
+        ends = np.cumsum(valid.sum(axis=1)).tolist()
+        lists = [names[start:end] for start, end in zip([0] + ends[:-1], ends)]
+        return lists, [self.disease_names[i] for i in diseases.tolist()]
+
+    def write_queries(self, path, n_queries, seed=None, symptoms_per_query=(2, 5), noise=0.1, typo_rate=0.0,
+                      chunk_size=100000):
+        """เขียนคำถามเป็น JSONL ({"id", "symptoms", "disease"}) สำหรับโหมด batch และ load_generator
+
+        สร้างทีละ chunk_size คำถามจาก seed ต่อเนื่อง จึงใช้หน่วยความจำคงที่ไม่ว่าจำนวนคำถามเท่าใด
+        ชื่ออาการและชื่อโรคเข้ารหัส JSON ไว้ครั้งเดียว แล้วประกอบแต่ละบรรทัดจากส่วนที่เข้ารหัสแล้ว
+        """
+        seed = self.seed + 1 if seed is None else seed
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        # ส่วนของชื่ออาการ: ช่องแรกไม่มีจุลภาคนำหน้า ช่องถัดไปมี ช่องว่าง (-1) เป็นข้อความว่าง
+        encoded = [encode(name) for name in self.query_vocabulary()]
+        first = np.array(encoded + [""], dtype=object)
+        rest = np.array([", " + text for text in encoded] + [""], dtype=object)
+        encoded_diseases = np.array([f'], "disease": {encode(name)}}}\n' for name in self.disease_names],
+                                    dtype=object)
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk, start in enumerate(range(0, n_queries, chunk_size)):
+                count = min(chunk_size, n_queries - start)
+                diseases, symptoms = self.query_ids(count, seed + chunk, symptoms_per_query, noise, typo_rate)
+                parts = np.empty((count, symptoms.shape[1] + 2), dtype=object)
+                parts[:, 0] = [f'{{"id": {i}, "symptoms": [' for i in range(start, start + count)]
+                parts[:, 1] = first[symptoms[:, 0]]
+                parts[:, 2:-1] = rest[symptoms[:, 1:]]
+                parts[:, -1] = encoded_diseases[diseases]
+                f.write("".join(parts.ravel().tolist()))
+        return n_queries
+
+def main():
+    parser = argparse.ArgumentParser(description="สร้างฐานข้อมูลโรคและคำถามผู้ป่วยจำลองสำหรับทดสอบโหลด")
+    parser.add_argument("--diseases", type=int, default=10000, help="จำนวนโรค")
+    parser.add_argument("--symptoms", type=int, help="จำนวนอาการในคำศัพท์ (ไม่ระบุ = จำนวนโรค / 4)")
+    parser.add_argument("--symptoms-per-disease", type=int, nargs=2, default=(3, 12), metavar=("MIN", "MAX"))
+    parser.add_argument("--zipf", type=float, default=1.0, help="เลขชี้กำลัง Zipf ของความนิยมของอาการ")
+    parser.add_argument("--kb", help="ไฟล์ .skb ที่จะเขียน")
+    parser.add_argument("--queries", type=int, default=0, help="จำนวนคำถามที่จะสร้าง")
+    parser.add_argument("--queries-output", default="queries.jsonl", help="ไฟล์ JSONL ของคำถาม")
+    parser.add_argument("--symptoms-per-query", type=int, nargs=2, default=(2, 5), metavar=("MIN", "MAX"))
+    parser.add_argument("--noise", type=float, default=0.1, help="โอกาสที่อาการในคำถามเป็นอาการที่ไม่เกี่ยวข้อง")
+    parser.add_argument("--typo-rate", type=float, default=0.0, help="โอกาสที่ชื่ออาการถูกพิมพ์ผิด")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    kb = SyntheticKnowledgeBase(args.diseases, args.symptoms, tuple(args.symptoms_per_disease), args.zipf,
+                                seed=args.seed)
+    print(f"🧬 สร้างฐานข้อมูล {kb.n_diseases:,} โรค {kb.n_symptoms:,} อาการ "
+          f"({len(kb.disease_symptoms):,} คู่โรค-อาการ) ใน {time.perf_counter() - began:.2f} วินาที")
+    if args.kb:
+        began = time.perf_counter()
+        kb.save(args.kb)
+        print(f"💾 บันทึก {args.kb} ใน {time.perf_counter() - began:.2f} วินาที")
+    if args.queries:
+        began = time.perf_counter()
+        kb.write_queries(args.queries_output, args.queries, symptoms_per_query=tuple(args.symptoms_per_query),
+                         noise=args.noise, typo_rate=args.typo_rate)
+        print(f"📝 เขียนคำถาม {args.queries:,} รายการลง {args.queries_output} "
+              f"ใน {time.perf_counter() - began:.2f} วินาที")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# โมดูลของโปรเจกต์อยู่ที่รากของ repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+from analysis_service import MAX_BODY_BYTES, AnalysisService
+
+
+async def request(reader, writer, method, target, body=b""):
+    """ส่งหนึ่งคำขอบนการเชื่อมต่อเดิม คืน (status, headers, body)"""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ")[1])
+    response_headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            response_headers[name.strip().lower()] = value.strip()
+    content = await reader.readexactly(int(response_headers["content-length"]))
+    return status, response_headers, content.decode("utf-8")
+
+
+async def finish(reader, writer):
+    """ปิดฝั่งส่งแล้วรอให้บริการปิดการเชื่อมต่อ (handler ของ connection จบก่อนปิดบริการ)"""
+    writer.write_eof()
+    rest = await reader.read()
+    writer.close()
+    return rest
+
+
+def run_with_service(scenario, **options):
+    """เปิดบริการแบบ workers=0 บนพอร์ตว่าง แล้วรัน scenario(host, port)"""
+    async def main():
+        service = AnalysisService(workers=0, batch_window=0.001, **options)
+        server = await service.start("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        try:
+            return await scenario(host, port)
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+def test_keep_alive_serves_several_requests_on_one_connection():
+    async def scenario(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        body = json.dumps({"weight": 70, "height": 170, "age": 30, "gender": "ชาย"}).encode("utf-8")
+        first = await request(reader, writer, "POST", "/bmi", body)
+        second = await request(reader, writer, "POST", "/heart-rate",
+                               b'{"heart_rate": 72, "age": 30, "activity_level": "resting"}')
+        third = await request(reader, writer, "POST", "/symptoms", '{"symptoms": ["มีไข้", "ไอ"]}'.encode("utf-8"))
+        health = await request(reader, writer, "GET", "/health")
+        await finish(reader, writer)
+        return first, second, third, health
+
+    first, second, third, health = run_with_service(scenario)
+    for status, headers, content in (first, second, third, health):
+        assert status == 200
+        assert headers["connection"] == "keep-alive"
+        assert isinstance(json.loads(content), dict)
+    assert json.loads(first[2])["bmi"] == 24.2
+    assert json.loads(health[2])["workers"] == 0
+
+
+def test_error_responses():
+    async def scenario(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        not_found = await request(reader, writer, "GET", "/nothing")
+        wrong_method = await request(reader, writer, "GET", "/bmi")
+        wrong_get = await request(reader, writer, "POST", "/metrics")
+        bad_body = await request(reader, writer, "POST", "/bmi", b"{not json")
+        writer.write(b"POST /bmi HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY_BYTES + 1))
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        closed = await finish(reader, writer)
+        return not_found, wrong_method, wrong_get, bad_body, head, closed
+
+    not_found, wrong_method, wrong_get, bad_body, too_large, closed = run_with_service(scenario)
+    assert not_found[0] == 404
+    assert wrong_method[0] == 405 and "POST" in json.loads(wrong_method[2])["error"]
+    assert wrong_get[0] == 405 and "GET" in json.loads(wrong_get[2])["error"]
+    # body ที่ไม่ใช่ JSON ตอบ 400 แต่ยังใช้การเชื่อมต่อต่อได้
+    assert bad_body[0] == 400 and bad_body[1]["connection"] == "keep-alive"
+    assert too_large.startswith(b"HTTP/1.1 413 Payload Too Large\r\n")
+    assert b"Connection: close" in too_large
+    assert closed.endswith(b"}")
+
+
+def test_metrics_in_prometheus_and_json_format():
+    async def scenario(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        await request(reader, writer, "POST", "/bmi", b'{"weight": 70, "height": 170, "age": 30}')
+        await request(reader, writer, "GET", "/nothing")
+        text = await request(reader, writer, "GET", "/metrics")
+        data = await request(reader, writer, "GET", "/metrics?format=json")
+        await finish(reader, writer)
+        return text, data
+
+    (status, headers, text), (json_status, json_headers, data) = run_with_service(scenario)
+    assert status == 200
+    assert headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = text.splitlines()
+    assert "# TYPE service_request_calls_total counter" in lines
+    assert 'service_request_calls_total{endpoint="/bmi"} 1' in lines
+    assert 'service_request_errors_total{endpoint="other"} 1' in lines
+    assert 'service_batch_calls_total{analysis="bmi"} 1' in lines
+    assert "service_pending_requests 0" in lines
+    assert "service_open_connections 1" in lines
+    for line in lines:
+        assert line.startswith("#") or len(line.rsplit(" ", 1)) == 2
+
+    assert json_status == 200 and json_headers["content-type"].startswith("application/json")
+    metrics = json.loads(data)
+    assert metrics["requests"]["/bmi"]["calls"] == 1
+    assert metrics["requests"]["/metrics"]["calls"] == 1
+    assert metrics["batches"]["bmi"]["calls"] == 1
+    assert metrics["pending"] == 0 and metrics["connections"] == 1
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmark import BENCHMARKS, _percentile, compare, main, measure, run_benchmarks, scaling_exponent
+
+pytestmark = pytest.mark.filterwarnings("ignore:Glyph")
+
+
+def result(name, scale, p50_ms, peak_memory_bytes=0):
+    return {"benchmark": name, "scale": scale, "p50_ms": p50_ms, "peak_memory_bytes": peak_memory_bytes}
+
+
+def test_percentile_matches_numpy():
+    values = sorted(np.random.default_rng(0).exponential(1, 101).tolist())
+    for q in (0, 50, 95, 99, 100):
+        assert _percentile(values, q) == pytest.approx(np.percentile(values, q))
+    assert _percentile([3.0], 99) == 3.0
+
+
+def test_measure_reports_latency_throughput_and_memory():
+    stats = measure(lambda: bytearray(1 << 20), items=10, min_time=0, min_calls=5)
+    assert stats["calls"] == 5
+    assert 0 < stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert stats["throughput"] == pytest.approx(10 / (stats["p50_ms"] / 1000))
+    assert stats["peak_memory_bytes"] >= 1 << 20
+
+
+def test_scaling_exponent():
+    assert scaling_exponent([10, 100, 1000], [1, 100, 10000]) == pytest.approx(2)
+    assert scaling_exponent([10], [1]) is None
+
+
+def test_compare_flags_regressions_above_threshold():
+    baseline = {"results": [result("a", 1, 10.0, 1 << 20), result("a", 2, 10.0), result("b", 1, 5.0)]}
+    current = {"results": [result("a", 1, 12.0, (1 << 20) + 1000), result("a", 2, 13.0, 1 << 22),
+                           result("c", 1, 100.0)]}
+    # 12 ms อยู่ในเกณฑ์ 25%, หน่วยความจำเพิ่มน้อยกว่าสัญญาณรบกวน, หน่วยความจำเดิม 0 เทียบอัตราส่วนไม่ได้
+    # และ c ไม่มีใน baseline
+    assert compare(current, baseline, 0.25) == [("a", 2, "p50_ms", 10.0, 13.0, pytest.approx(1.3))]
+    assert [r[:3] for r in compare(current, baseline, 0.1)] == [("a", 1, "p50_ms"), ("a", 2, "p50_ms")]
+
+
+@pytest.mark.parametrize("name, setup", [(name, setup) for name, _, _, setup in BENCHMARKS
+                                         if name != "bmi.analyze_health_parallel"])
+def test_every_benchmark_runs_at_small_scale(name, setup):
+    # ใช้ขนาดเล็กกว่าที่วัดจริง (bmi.analyze_health_parallel ทดสอบไว้ใน test_bmi_cohort)
+    call, items = setup(2 if "generate" in name else 100, np.random.default_rng(0))
+    assert items > 0
+    call()
+
+
+def test_run_benchmarks_and_baseline_gate(tmp_path, capsys):
+    data = run_benchmarks("heart_rate.generate_sample_data_arrays", quick=True, min_time=0)
+    assert [r["scale"] for r in data["results"]] == [1, 24]
+    assert set(data["scaling"]) == {"heart_rate.generate_sample_data_arrays"}
+    assert data["meta"]["quick"] is True
+
+    output = tmp_path / "current.json"
+    assert main(["--filter", "generate_sample_data_arrays", "--quick", "--min-time", "0",
+                 "--output", str(output)]) == 0
+    saved = json.loads(output.read_text(encoding="utf-8"))
+    assert len(saved["results"]) == 2
+
+    for item in saved["results"]:
+        item["p50_ms"] /= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(saved), encoding="utf-8")
+    assert main(["--filter", "generate_sample_data_arrays", "--quick", "--min-time", "0",
+                 "--baseline", str(baseline)]) == 1
+    assert "p50_ms" in capsys.readouterr().out
+    assert main(["--filter", "no-such-benchmark"]) == 2
+    capsys.readouterr()
+    assert main(["--list"]) == 0
+    listed = capsys.readouterr().out
+    assert all(name in listed for name, _, _, _ in BENCHMARKS)
@@ -0,0 +1,60 @@
+import json
+from collections.abc import Mapping
+
+import numpy as np
+import pytest
+
+from bmi_calculator import BMICalculator
+
+
+@pytest.fixture
+def calculator():
+    return BMICalculator()
+
+
+@pytest.mark.parametrize("weight", [40, 70, 100, 160])
+def test_health_result_is_dict_compatible(calculator, weight):
+    result = calculator.analyze_health(weight, 170, 30, "ชาย")
+    expected = result.to_dict()
+    assert isinstance(result, Mapping)
+    assert result == expected and dict(result) == expected
+    assert dict(result.items()) == expected and list(result.keys()) == list(expected)
+    assert result.get("bmi") == expected["bmi"] and result.get("missing", 0) == 0
+    assert isinstance(result["health_risks"], list)
+    assert isinstance(result["advice"]["recommendations"], list)
+    assert json.loads(json.dumps(result.to_dict(), ensure_ascii=False)) == expected
+
+
+def test_editing_result_copies_does_not_touch_shared_tables(calculator):
+    result = calculator.analyze_health(120, 170, 30, "ชาย")
+    result["health_risks"].append("อื่นๆ")
+    result["advice"]["recommendations"].clear()
+    again = calculator.analyze_health(120, 170, 30, "ชาย")
+    assert "อื่นๆ" not in again["health_risks"]
+    assert again["advice"]["recommendations"]
+    with pytest.raises(KeyError):
+        result["gender"]
+
+
+def test_arrays_match_single_analysis(calculator):
+    rng = np.random.default_rng(5)
+    weights = np.r_[rng.uniform(30, 200, 500).round(1), [18.5 * 1.7 ** 2, 25 * 1.7 ** 2, 30 * 1.7 ** 2]]
+    heights = np.r_[rng.uniform(120, 210, 500).round(1), [170, 170, 170]]
+    expected = [calculator.analyze_health(w, h, 30, "หญิง").to_dict()
+                for w, h in zip(weights.tolist(), heights.tolist())]
+    arrays = calculator.analyze_health_arrays(weights, heights)
+    names = calculator.category_names()
+    assert [names[code] for code in arrays["category_code"].tolist()] == [e["category"] for e in expected]
+    for field in ("bmi", "ideal_weight", "weight_diff"):
+        assert arrays[field].tolist() == [e[field] for e in expected]
+
+
+def test_bulk_results_match_single_analysis(calculator):
+    rng = np.random.default_rng(6)
+    weights = rng.uniform(30, 200, 300).round(1)
+    heights = rng.uniform(120, 210, 300).round(1)
+    expected = [calculator.analyze_health(w, h, 30, "ชาย") for w, h in zip(weights.tolist(), heights.tolist())]
+    results = calculator.analyze_health_bulk(weights, heights)
+    assert len(results) == len(expected)
+    assert results.to_dicts() == [result.to_dict() for result in expected]
+    assert list(results) == expected and results[7] == expected[7]
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+import bmi_cohort
+from bmi_calculator import BMICalculator
+from bmi_cohort import CohortStats, RowError, analyze_cohort_csv, analyze_health_parallel, shutdown_pools
+
+
+def write_csv(path, rows):
+    path.write_text("weight,height,age,gender\n" + "".join(f"{w},{h},30,ชาย\n" for w, h in rows),
+                    encoding="utf-8")
+
+
+def stats_of(rows):
+    """สถิติที่คาดหวังจากการวิเคราะห์แถวที่ถูกต้องโดยตรง"""
+    calculator = BMICalculator()
+    stats = CohortStats(calculator.category_names())
+    weights = np.array([w for w, _ in rows], dtype=float)
+    heights = np.array([h for _, h in rows], dtype=float)
+    result = calculator.analyze_health_arrays(weights, heights)
+    stats.update(result["bmi"], result["category_code"], result["weight_diff"])
+    return stats
+
+
+def test_empty_cohort_is_valid_json():
+    stats = CohortStats(BMICalculator().category_names())
+    data = json.loads(json.dumps(stats.to_dict(), allow_nan=False))
+    assert data["bmi_min"] is None and data["bmi_max"] is None and data["bmi_variance"] is None
+    restored = CohortStats.from_dict(data)
+    other = stats_of([(70, 170), (90, 180)])
+    assert restored.merge(other).bmi_min == other.bmi_min
+
+
+def test_non_finite_measurements_are_invalid(tmp_path):
+    path = tmp_path / "cohort.csv"
+    write_csv(path, [(70, 170), ("inf", 170), (70, "nan"), ("-inf", 160), (80, 175)])
+    for workers in (1, 2):
+        stats = analyze_cohort_csv(str(path), chunk_size=2, workers=workers)
+        assert (stats.count, stats.invalid) == (2, 3)
+        json.dumps(stats.to_dict(), allow_nan=False)
+        expected = stats_of([(70, 170), (80, 175)])
+        assert stats.bmi_min == expected.bmi_min and stats.bmi_max == expected.bmi_max
+
+
+def test_parallel_matches_serial_and_reuses_pool():
+    rng = np.random.default_rng(4)
+    weights = rng.uniform(30, 150, 10001)
+    heights = rng.uniform(120, 210, 10001)
+    expected = BMICalculator().analyze_health_arrays(weights, heights)
+    try:
+        for workers in (1, 2):
+            result = analyze_health_parallel(weights, heights, workers=workers, shard_size=1000)
+            assert result.keys() == expected.keys()
+            for key in expected:
+                assert result[key].dtype == expected[key].dtype
+                np.testing.assert_array_equal(result[key], expected[key])
+        pool = bmi_cohort._pools[2]
+        analyze_health_parallel(weights, heights, workers=2, shard_size=1000)
+        assert bmi_cohort._pools[2] is pool
+    finally:
+        shutdown_pools()
+    assert not bmi_cohort._pools
+
+
+def test_parallel_reports_first_invalid_row():
+    weights = np.full(5000, 70.0)
+    heights = np.full(5000, 170.0)
+    weights[3210] = np.nan
+    heights[4321] = 0
+    try:
+        for workers in (1, 2):
+            with pytest.raises(RowError) as error:
+                analyze_health_parallel(weights, heights, workers=workers, shard_size=1000)
+            assert error.value.row == 3210
+    finally:
+        shutdown_pools()
@@ -0,0 +1,121 @@
+import sys
+
+import numpy as np
+import pytest
+
+from bmi_calculator import BMICalculator
+from chart_rendering import lttb_indices, minmax_envelope
+from heart_rate_analyzer import HeartRateAnalyzer
+
+# เครื่องทดสอบอาจไม่มีฟอนต์ภาษาไทย
+pytestmark = pytest.mark.filterwarnings("ignore:Glyph")
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def test_bmi_chart_reuses_template_and_matches_fresh_render():
+    calculator = BMICalculator()
+    first = calculator.render_bmi_chart(22.0, "น้ำหนักปกติ")
+    chart = calculator._bmi_chart_template[0]
+    second = calculator.render_bmi_chart(31.5, "อ้วน")
+    assert first.startswith(PNG) and second.startswith(PNG)
+    assert first != second
+    assert calculator._bmi_chart_template[0] is chart
+    # วาดเฉพาะส่วนที่เปลี่ยนบนพื้นหลังเดิม ต้องได้ภาพเดียวกับการวาดใหม่ทั้งรูป
+    assert second == BMICalculator().render_bmi_chart(31.5, "อ้วน")
+    assert calculator.render_bmi_chart(22.0, "น้ำหนักปกติ") == first
+
+
+def test_render_formats_and_paths(tmp_path):
+    calculator = BMICalculator()
+    svg = calculator.render_bmi_chart(25.0, "น้ำหนักเกิน", format="svg")
+    assert svg.startswith(b"<?xml") and b"<svg" in svg
+
+    path = tmp_path / "bmi.png"
+    assert calculator.render_bmi_chart(25.0, "น้ำหนักเกิน", path=str(path)) == str(path)
+    assert path.read_bytes() == calculator.render_bmi_chart(25.0, "น้ำหนักเกิน")
+    # รูปแบบไฟล์มาจากนามสกุลของ path
+    svg_path = tmp_path / "bmi.svg"
+    calculator.render_bmi_chart(25.0, "น้ำหนักเกิน", path=str(svg_path))
+    assert svg_path.read_bytes().startswith(b"<?xml")
+
+
+def test_heart_rate_charts_update_per_patient():
+    analyzer = HeartRateAnalyzer()
+    young = analyzer.render_heart_rate_zones_chart(30)
+    chart, ax, bars, labels = analyzer._zones_chart_template
+    old = analyzer.render_heart_rate_zones_chart(70)
+    assert young.startswith(PNG) and young != old
+    assert analyzer._zones_chart_template[0] is chart
+    assert "Max HR: 150" in ax.get_title()
+    assert bars[-1].get_x() + bars[-1].get_width() == pytest.approx(150)
+    assert labels[0].get_text() == "75-90"
+
+    trend = analyzer.render_heart_rate_trend([0, 60, 120, 180], [70, 72, 95, 68], 30)
+    trend_chart = analyzer._trend_chart_template[0]
+    other = analyzer.render_heart_rate_trend([0, 60, 120], [110, 120, 115], 10)
+    assert trend.startswith(PNG) and trend != other
+    assert analyzer._trend_chart_template[0] is trend_chart
+    assert list(analyzer._trend_chart_template[3]["trend"].get_ydata()) == [110, 120, 115]
+
+
+def test_rendering_does_not_create_pyplot_figures():
+    BMICalculator().render_bmi_chart(22.0, "น้ำหนักปกติ")
+    HeartRateAnalyzer().render_heart_rate_zones_chart(40)
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    # ไม่ผ่าน pyplot จึงไม่มี figure ค้างให้ปิด
+    assert pyplot is None or not pyplot.get_fignums()
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10000)
+    y = np.full(10000, 70.0)
+    y[4321] = 180
+    y[7777] = 35
+    selected = lttb_indices(x, y, 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 9999
+    assert (np.diff(selected) > 0).all()
+    assert 4321 in selected and 7777 in selected
+    assert np.array_equal(lttb_indices(x[:50], y[:50], 100), np.arange(50))
+
+
+def test_minmax_envelope_matches_buckets():
+    y = np.random.default_rng(4).integers(40, 200, 1003)
+    starts, lows, highs = minmax_envelope(y, 10)
+    assert starts[0] == 0 and len(starts) == 10
+    for i, start in enumerate(starts):
+        stop = starts[i + 1] if i + 1 < len(starts) else len(y)
+        assert lows[i] == y[start:stop].min() and highs[i] == y[start:stop].max()
+    assert len(minmax_envelope(y[:4], 10)[0]) == 4
+    assert len(minmax_envelope(y[:0], 10)[0]) == 0
+
+
+@pytest.mark.parametrize("values", [np.random.default_rng(5).integers(45, 190, 5000),
+                                    np.random.default_rng(6).normal(80, 20, 500), np.array([72] * 8)])
+def test_histogram_from_counts_matches_numpy(values):
+    counts, edges, mean = HeartRateAnalyzer()._heart_rate_histogram(values)
+    expected_counts, expected_edges = np.histogram(values, bins=20)
+    assert np.array_equal(counts, expected_counts)
+    assert np.allclose(edges, expected_edges)
+    assert mean == pytest.approx(values.mean())
+
+
+def test_long_trace_is_decimated_but_keeps_extremes():
+    analyzer = HeartRateAnalyzer()
+    timestamps, heart_rates = analyzer.generate_sample_data_arrays(24 * 7, 1, seed=0, start=1_700_000_000)
+    heart_rates[123456] = 30
+    trace = analyzer._prepare_trend(timestamps, heart_rates, 2000)
+    assert len(trace["x"]) == len(trace["y"]) == 2000
+    _, lows, highs = trace["envelope"]
+    assert lows.min() == heart_rates.min() == 30 and highs.max() == heart_rates.max()
+    assert trace["counts"].sum() == len(heart_rates)
+
+    png = analyzer.render_heart_rate_trend(timestamps, heart_rates, 30)
+    assert png.startswith(PNG)
+    parts = analyzer._trend_chart_template[3]
+    assert len(parts["trend"].get_xdata()) == 2000 and parts["envelope"] is not None
+    # ข้อมูลสั้นวาดครบทุกจุดพร้อม marker
+    analyzer.render_heart_rate_trend(timestamps[:100], heart_rates[:100], 30)
+    assert len(parts["trend"].get_xdata()) == 100 and parts["trend"].get_marker() == "o"
+    assert analyzer._trend_chart_template[3]["envelope"] is None
@@ -0,0 +1,148 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from heart_rate_analyzer import DAILY_ACTIVITY_PROFILE, MAX_AGE, HeartRateAnalyzer
+from jsonl_batch import RecordError
+
+
+@pytest.fixture
+def analyzer():
+    return HeartRateAnalyzer()
+
+
+@pytest.mark.parametrize("ages", [[10 ** 23], [MAX_AGE + 1], [-1], [float("nan")], ["30"]])
+def test_arrays_reject_implausible_ages(analyzer, ages):
+    with pytest.raises(ValueError):
+        analyzer.analyze_heart_rate_arrays([70], ages)
+
+
+def test_records_report_huge_age_per_record(analyzer):
+    results = analyzer.analyze_records([{"heart_rate": 70, "age": 10 ** 23},
+                                        {"heart_rate": 70, "age": MAX_AGE}])
+    assert isinstance(results[0], RecordError)
+    assert results[1] == analyzer.analyze_heart_rate(70, MAX_AGE)
+
+
+@pytest.mark.parametrize("activity_level", ["resting", "normal", "exercise"])
+def test_arrays_match_single_analysis(analyzer, activity_level):
+    rng = np.random.default_rng(2)
+    ages = np.r_[rng.integers(0, MAX_AGE + 1, 400), [0, 1, 12, 13, 17, 18, 35, 36, 60, 61, MAX_AGE]]
+    heart_rates = rng.integers(30, 220, len(ages))
+    result = analyzer.analyze_heart_rate_arrays(heart_rates, ages, activity_level)
+    groups = analyzer.age_group_names()
+    statuses, advice, colors = analyzer.status_labels(result["status_code"])
+    for i, (heart_rate, age) in enumerate(zip(heart_rates.tolist(), ages.tolist())):
+        expected = analyzer.analyze_heart_rate(heart_rate, age, activity_level)
+        assert groups[result["age_group_code"][i]] == expected["age_group"]
+        assert (statuses[i], advice[i], colors[i]) == (expected["status"], expected["advice"], expected["color"])
+        assert (result["normal_min"][i], result["normal_max"][i]) == (expected["normal_range"]["min"],
+                                                                  expected["normal_range"]["max"])
+        assert result["max_hr"][i] == expected["max_hr"]
+        assert {"low": result["target_low"][i], "high": result["target_high"][i]} == expected["target_zone"]
+
+
+@pytest.mark.parametrize("codes", [-1, 3, [0, 1, 256], np.array([2, -1], dtype=np.int64)])
+def test_activity_codes_out_of_range_are_rejected(analyzer, codes):
+    with pytest.raises(ValueError):
+        analyzer.get_activity_codes(codes)
+    with pytest.raises(ValueError):
+        analyzer.analyze_heart_rate_arrays([70] * np.size(codes), [30] * np.size(codes), codes)
+
+
+def test_activity_codes_accept_names_and_valid_codes(analyzer):
+    assert analyzer.get_activity_codes([0, 1, 2]).tolist() == [0, 1, 2]
+    assert analyzer.get_activity_codes(np.uint8(2)) == 2
+    assert analyzer.get_activity_codes(["exercise", "resting"]).tolist() == [2, 0]
+    with pytest.raises(KeyError):
+        analyzer.get_activity_codes("sleeping")
+
+
+def test_sample_arrays_are_seeded_and_independent_of_chunking(analyzer):
+    start = 1_700_000_000
+    timestamps, heart_rates = analyzer.generate_sample_data_arrays(6, 60, patients=3, seed=7, start=start)
+    assert timestamps.dtype == np.int64 and heart_rates.dtype == np.int16
+    assert heart_rates.shape == (3, 360)
+    assert np.array_equal(timestamps, start + 60 * np.arange(360))
+
+    chunks = list(analyzer.iter_sample_data_chunks(6, 60, patients=3, seed=7, start=start, chunk_size=50))
+    assert [len(t) for t, _ in chunks] == [50] * 7 + [10]
+    assert np.array_equal(np.concatenate([hr for _, hr in chunks], axis=1), heart_rates)
+    # ผู้ป่วยคนแรกได้ข้อมูลเดิมไม่ว่าจะสร้างพร้อมกันกี่คน
+    _, single = analyzer.generate_sample_data_arrays(6, 60, seed=7, start=start)
+    assert single.ndim == 1 and np.array_equal(single, heart_rates[0])
+    _, other = analyzer.generate_sample_data_arrays(6, 60, seed=8, start=start)
+    assert not np.array_equal(other, single)
+
+
+def test_sample_arrays_follow_daily_profile(analyzer):
+    timestamps, heart_rates = analyzer.generate_sample_data_arrays(48, 300, patients=4, seed=1, start=1_700_000_000)
+    assert len(timestamps) == 48 * 12
+    bounds = {}
+    for start_hour, hr_min, hr_max in DAILY_ACTIVITY_PROFILE:
+        bounds.update({hour: (hr_min, hr_max) for hour in range(start_hour, 24)})
+    for timestamp, column in zip(timestamps, heart_rates.T):
+        hr_min, hr_max = bounds[datetime.fromtimestamp(int(timestamp)).hour]
+        assert (column >= max(50, hr_min - 5)).all() and (column <= min(200, hr_max + 5)).all()
+
+
+def test_sample_arrays_defaults_and_errors(analyzer):
+    timestamps, heart_rates = analyzer.generate_sample_data_arrays(seed=0)
+    assert len(timestamps) == len(analyzer.generate_sample_data()[0]) == 96
+    assert np.all(np.diff(timestamps) == 900)
+    timestamps, heart_rates = analyzer.generate_sample_data_arrays(0, patients=2)
+    assert timestamps.shape == (0,) and heart_rates.shape == (2, 0)
+    with pytest.raises(ValueError):
+        analyzer.generate_sample_data_arrays(1, 0)
+
+
+def test_monitor_matches_full_recomputation(analyzer):
+    rng = np.random.default_rng(3)
+    values = np.r_[rng.normal(75, 15, 700), [35.4, 250.6, 80]].tolist()
+    monitor = analyzer.monitor(30, windows=(50, 10, 200), status_window=10)
+    assert monitor.windows == [10, 50, 200]
+    for i, value in enumerate(values):
+        monitor.add(value, timestamp=i)
+        if i % 37 and i != len(values) - 1:
+            continue
+        for size in monitor.windows:
+            recent = values[max(0, i + 1 - size):i + 1]
+            assert monitor.mean(size) == pytest.approx(np.mean(recent))
+            assert monitor.min(size) == min(recent) and monitor.max(size) == max(recent)
+            for q in (0, 5, 50, 95, 100):
+                assert monitor.percentile(q, size) == pytest.approx(np.percentile(np.round(recent), q))
+    assert len(monitor) == len(values)
+    # หน่วยความจำเท่าหน้าต่างที่ใหญ่ที่สุดเสมอ
+    assert len(monitor._values) == 200
+    assert monitor.summary(50)["count"] == 50 and monitor.last_timestamp == len(values) - 1
+
+
+def test_monitor_reports_status_transitions(analyzer):
+    normal_range = analyzer.heart_rate_zones[analyzer.get_age_group(30)]["resting"]
+    normal = (normal_range["min"] + normal_range["max"]) / 2
+    values = [normal] * 5 + [normal_range["max"] + 30] * 5 + [normal_range["min"] - 30] * 4 + [normal] * 5
+    monitor = analyzer.monitor(30, windows=(3, 10))
+    transitions = monitor.extend(values, timestamps=range(100, 100 + len(values)))
+    # สถานะมาจากค่าเฉลี่ยของ 3 ค่าล่าสุด (status_window เริ่มต้นคือหน้าต่างที่เล็กที่สุด)
+    expected = []
+    status = None
+    for i in range(len(values)):
+        current = analyzer.classify_heart_rate(np.mean(values[max(0, i - 2):i + 1]), normal_range)
+        if current != status:
+            expected.append((100 + i, status, current))
+            status = current
+    assert transitions == expected
+    assert len(expected) > 3 and expected[-1][2] == monitor.status == "ปกติ"
+    assert monitor.add(normal) is None
+
+
+def test_monitor_rejects_bad_windows(analyzer):
+    with pytest.raises(ValueError):
+        analyzer.monitor(30, windows=())
+    with pytest.raises(ValueError):
+        analyzer.monitor(30, windows=(10,), status_window=5)
+    monitor = analyzer.monitor(30, windows=(10,))
+    assert monitor.mean() is None and monitor.percentile(50) is None
+    with pytest.raises(ValueError):
+        monitor.mean(60)
@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from heart_rate_store import HeartRateSegment, HeartRateStore, encode_segment
+
+
+@pytest.fixture
+def trace():
+    rng = np.random.default_rng(4)
+    timestamps = 1_760_000_000 + np.cumsum(rng.integers(0, 30, 5000))   # มีเวลาซ้ำได้
+    heart_rates = rng.integers(40, 200, len(timestamps))
+    return timestamps, heart_rates
+
+
+@pytest.mark.parametrize("high", [200, 300])
+def test_segment_round_trips(trace, high):
+    timestamps, heart_rates = trace
+    heart_rates = np.minimum(heart_rates * high // 200, high)
+    segment = HeartRateSegment(encode_segment(timestamps, heart_rates, seq=3, block_size=64))
+    assert segment.seq == 3 and segment.count == len(timestamps)
+    assert (segment.first, segment.last) == (timestamps[0], timestamps[-1])
+    assert (segment.min, segment.max, segment.sum) == (heart_rates.min(), heart_rates.max(), heart_rates.sum())
+    assert segment.heart_rates.dtype.itemsize == (1 if high <= 255 else 2)
+    np.testing.assert_array_equal(segment.timestamps, timestamps)
+    np.testing.assert_array_equal(segment.heart_rates, heart_rates)
+
+
+def test_store_query_and_summary_match_raw_data(tmp_path, trace):
+    timestamps, heart_rates = trace
+    store = HeartRateStore(str(tmp_path), segment_size=700, block_size=32)
+    assert store.append("HN001", timestamps[:2000], heart_rates[:2000]) == 3
+    assert store.append("HN001", timestamps[2000:], heart_rates[2000:]) == 5
+    reopened = HeartRateStore(str(tmp_path))
+    assert reopened.patients() == ["HN001"]
+    rng = np.random.default_rng(9)
+    bounds = [(None, None), (timestamps[0], timestamps[-1] + 1), (timestamps[10], timestamps[10]),
+              (timestamps[-1] + 1, None)]
+    bounds += [tuple(sorted(rng.integers(timestamps[0] - 100, timestamps[-1] + 100, 2).tolist())) for _ in range(50)]
+    for start, end in bounds:
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        got_timestamps, got_heart_rates = reopened.query("HN001", start, end)
+        np.testing.assert_array_equal(got_timestamps, timestamps[mask])
+        np.testing.assert_array_equal(got_heart_rates, heart_rates[mask])
+        summary = reopened.summary("HN001", start, end)
+        assert summary["count"] == mask.sum()
+        if mask.any():
+            selected = heart_rates[mask]
+            assert (summary["min"], summary["max"]) == (selected.min(), selected.max())
+            assert summary["mean"] == pytest.approx(selected.mean())
+
+
+def test_append_accepts_datetimes_and_rejects_going_back(tmp_path):
+    store = HeartRateStore(str(tmp_path))
+    times = [datetime(2026, 10, 13, 2, minute) for minute in range(10)]
+    store.append("HN002", times, list(range(60, 70)))
+    timestamps, heart_rates = store.query("HN002", times[2], times[5])
+    assert timestamps.tolist() == [int(t.timestamp()) for t in times[2:5]]
+    assert heart_rates.tolist() == [62, 63, 64]
+    with pytest.raises(ValueError):
+        store.append("HN002", times[:1], [70])
+
+
+def open_files():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="ต้องนับ file descriptor จาก /proc")
+def test_open_segments_are_bounded(tmp_path):
+    store = HeartRateStore(str(tmp_path), max_open_segments=8)
+    for patient in range(40):
+        store.append(f"HN{patient:03d}", [1_760_000_000 + patient, 1_760_000_060], [70, 80 + patient])
+    store.close()
+    before = open_files()
+    for patient in range(40):
+        assert store.summary(f"HN{patient:03d}")["max"] == 80 + patient
+        assert open_files() - before <= 8
+    # ข้อมูลที่ query ไว้ยังอ่านได้หลังผู้ป่วยถูกปิดออกจากแคช และอ่านผู้ป่วยเดิมซ้ำได้
+    timestamps, heart_rates = store.query("HN000")
+    for patient in range(1, 40):
+        store.summary(f"HN{patient:03d}")
+    assert heart_rates.tolist() == [70, 80]
+    assert store.query("HN000")[1].tolist() == [70, 80]
+    del timestamps, heart_rates
+    store.close()
+    assert open_files() == before
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from heart_rate_variability import (HF_BAND, LF_BAND, band_powers, heart_rate_to_rr, hrv_summary, iter_rolling_hrv,
+                                    resample_rr, rolling_extreme, rolling_hrv, rolling_stats)
+
+
+def naive_windows(values, window, step):
+    return [values[start:start + window] for start in range(0, len(values) - window + 1, step)]
+
+
+def naive_hrv(rr, window, step):
+    """HRV ทีละหน้าต่างแบบตรงไปตรงมา (ข้ามค่า NaN)"""
+    rows = {"mean_rr": [], "sdnn": [], "rmssd": [], "pnn50": []}
+    for values in naive_windows(rr, window, step):
+        differences = np.diff(values)
+        differences = differences[np.isfinite(differences)]
+        rows["mean_rr"].append(np.nanmean(values))
+        rows["sdnn"].append(np.nanstd(values, ddof=1))
+        rows["rmssd"].append(np.sqrt(np.mean(differences ** 2)))
+        rows["pnn50"].append(np.mean(np.abs(differences) > 50) * 100)
+    return {name: np.array(values) for name, values in rows.items()}
+
+
+def assert_matches_naive(rr, window, step):
+    result = rolling_hrv(rr, window, step)
+    expected = naive_hrv(rr, window, step)
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+@pytest.fixture
+def heart_rates():
+    return np.random.default_rng(7).normal(75, 8, 2000)
+
+
+def test_missing_reading_only_affects_its_windows(heart_rates):
+    heart_rates[100] = 0
+    rr = heart_rate_to_rr(heart_rates)
+    result = rolling_hrv(rr, 60, 30)
+    for name in ("mean_rr", "sdnn", "rmssd"):
+        assert not np.isnan(result[name]).any(), name
+    assert_matches_naive(rr, 60, 30)
+
+
+def test_missing_first_reading(heart_rates):
+    heart_rates[0] = 0
+    heart_rates[[500, 501, 1500]] = -1
+    assert_matches_naive(heart_rate_to_rr(heart_rates), 60, 7)
+
+
+def test_window_without_readings_is_nan(heart_rates):
+    rr = heart_rate_to_rr(heart_rates)
+    rr[120:180] = np.nan
+    stats = rolling_stats(rr, 60, 60)
+    assert np.isnan(stats["mean"][2]) and np.isnan(stats["std"][2])
+    assert np.isnan(stats["min"][2]) and np.isnan(stats["max"][2])
+    assert not np.isnan(stats["mean"][3:]).any()
+    np.testing.assert_allclose(stats["min"][3], np.nanmin(rr[180:240]))
+
+
+# ---------------------------------------------------------------------------
+# ข้อมูลปกติ: เทียบกับการคำนวณทีละหน้าต่าง
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("window, step", [(2, 1), (60, 1), (60, 30), (64, 100)])
+def test_rolling_stats_matches_naive(window, step):
+    values = np.random.default_rng(1).normal(800, 50, 1000)
+    stats = rolling_stats(values, window, step)
+    windows = naive_windows(values, window, step)
+    np.testing.assert_array_equal(stats["start"], np.arange(0, len(values) - window + 1, step))
+    np.testing.assert_allclose(stats["mean"], [w.mean() for w in windows])
+    np.testing.assert_allclose(stats["std"], [w.std(ddof=1) for w in windows])
+    np.testing.assert_array_equal(stats["min"], [w.min() for w in windows])
+    np.testing.assert_array_equal(stats["max"], [w.max() for w in windows])
+
+
+def test_rolling_stats_is_stable_for_large_offsets():
+    values = 1e9 + np.random.default_rng(2).normal(0, 1, 500)
+    stats = rolling_stats(values, 50, 10)
+    np.testing.assert_allclose(stats["std"], [w.std(ddof=1) for w in naive_windows(values, 50, 10)], rtol=1e-6)
+
+
+@pytest.mark.parametrize("n, window", [(10, 10), (11, 3), (100, 7), (5, 6)])
+def test_rolling_extreme_matches_naive(n, window):
+    values = np.random.default_rng(n).random(n)
+    expected = [w for w in naive_windows(values, window, 1)]
+    np.testing.assert_array_equal(rolling_extreme(values, window, np.minimum), [w.min() for w in expected])
+    np.testing.assert_array_equal(rolling_extreme(values, window, np.maximum), [w.max() for w in expected])
+
+
+def test_window_must_have_two_values():
+    with pytest.raises(ValueError):
+        rolling_stats(np.ones(10), 1)
+
+
+def test_band_powers_match_naive_periodogram():
+    fs, window, step = 4.0, 256, 64
+    t = np.arange(2000) / fs
+    rr = 800 + 30 * np.sin(2 * np.pi * 0.1 * t) + 10 * np.sin(2 * np.pi * 0.25 * t)
+    powers = band_powers(rr, fs, window, step)
+    taper = np.hanning(window)
+    freqs = np.fft.rfftfreq(window, 1 / fs)
+    for row, values in zip(powers, naive_windows(rr, window, step)):
+        spectrum = np.abs(np.fft.rfft((values - values.mean()) * taper)) ** 2 * 2 / (fs * (taper ** 2).sum())
+        for power, (low, high) in zip(row, (LF_BAND, HF_BAND)):
+            band = (freqs >= low) & (freqs < high)
+            np.testing.assert_allclose(power, spectrum[band].sum() * fs / window)
+    # กำลังของคลื่นไซน์แอมพลิจูด A ประมาณ A² / 2
+    np.testing.assert_allclose(powers[:, 0], 30 ** 2 / 2, rtol=0.1)
+    np.testing.assert_allclose(powers[:, 1], 10 ** 2 / 2, rtol=0.1)
+
+
+def test_rolling_hrv_matches_naive_and_summary():
+    rr = np.random.default_rng(3).normal(800, 60, 3000)
+    assert_matches_naive(rr, 300, 150)
+    result = rolling_hrv(rr, 300, 150)
+    np.testing.assert_allclose(result["mean_hr"], 60000 / result["mean_rr"])
+    summary = hrv_summary(rr)
+    np.testing.assert_allclose(summary["sdnn"], rr.std(ddof=1))
+    np.testing.assert_allclose(summary["rmssd"], np.sqrt(np.mean(np.diff(rr) ** 2)))
+
+
+def test_rolling_hrv_band_ratio():
+    fs = 4.0
+    rr = resample_rr(np.random.default_rng(4).normal(800, 40, 2000), fs)
+    result = rolling_hrv(rr, 512, 256, fs=fs)
+    np.testing.assert_allclose(result["lf_hf"], result["lf"] / result["hf"])
+    np.testing.assert_allclose(np.column_stack((result["lf"], result["hf"])), band_powers(rr, fs, 512, 256))
+
+
+def concatenate_results(results):
+    results = list(results)
+    return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+
+
+@pytest.mark.parametrize("window, step, chunk_size", [(60, 1, 97), (60, 30, 50), (60, 30, 1000),
+                                                      (20, 45, 13), (20, 45, 7), (64, 64, 64)])
+def test_iter_rolling_hrv_matches_unchunked(window, step, chunk_size):
+    heart_rates = np.random.default_rng(5).normal(75, 8, 1500)
+    heart_rates[[0, 333, 334, 900]] = 0
+    chunks = [heart_rates[i:i + chunk_size] for i in range(0, len(heart_rates), chunk_size)]
+    chunked = concatenate_results(iter_rolling_hrv(chunks, window, step, fs=1.0, heart_rates=True))
+    expected = rolling_hrv(heart_rate_to_rr(heart_rates), window, step, fs=1.0)
+    assert chunked.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_allclose(chunked[name], expected[name], rtol=1e-9, err_msg=name)
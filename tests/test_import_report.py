@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from import_report import _parse_importtime, main, measure_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       193 |        193 |   collections.abc
+import time:       293 |        293 |   types
+import time:       774 |       3431 | bmi_calculator
+"""
+
+
+def run_python(code):
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout.split()
+
+
+def test_scalar_analysis_does_not_load_numpy_or_matplotlib():
+    loaded = run_python(
+        "import sys\n"
+        "from bmi_calculator import BMICalculator\n"
+        "from heart_rate_analyzer import HeartRateAnalyzer\n"
+        "BMICalculator().analyze_health(70, 170, 30, 'ชาย')\n"
+        "HeartRateAnalyzer().analyze_heart_rate(72, 30)\n"
+        "print('numpy' in sys.modules, 'matplotlib' in sys.modules)\n"
+        "BMICalculator().calculate_bmi_array([70], [170])\n"
+        "print('numpy' in sys.modules, 'matplotlib' in sys.modules)\n")
+    assert loaded == ["False", "False", "True", "False"]
+
+
+def test_parse_importtime():
+    assert _parse_importtime(SAMPLE) == [("collections.abc", 1, 193, 193), ("types", 1, 293, 293),
+                                         ("bmi_calculator", 0, 774, 3431)]
+
+
+def test_budget_sets_exit_code(capsys):
+    assert main(["bmi_calculator", "--repeat", "1", "--budget", "100000"]) == 0
+    assert "bmi_calculator" in capsys.readouterr().out
+    assert main(["bmi_calculator", "--repeat", "1", "--budget", "0"]) == 1
+    assert "เกินงบ" in capsys.readouterr().out
+
+
+def test_failed_import_is_reported():
+    with pytest.raises(RuntimeError):
+        measure_import("no_such_module_here", repeat=1)
@@ -0,0 +1,109 @@
+import gc
+import itertools
+import json
+import time
+
+import numpy as np
+import pytest
+
+import instrumentation
+from bmi_calculator import BMICalculator
+from heart_rate_analyzer import HeartRateAnalyzer
+from symptom_checker import SymptomChecker
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+
+
+@pytest.fixture(autouse=True)
+def clean_instrumentation():
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+    for name in list(instrumentation._sources):
+        instrumentation.unwatch(name)
+
+
+def test_disabled_methods_are_untouched():
+    original = BMICalculator.__dict__["analyze_health"]
+    instrumentation.enable()
+    assert instrumentation.is_enabled()
+    assert BMICalculator.__dict__["analyze_health"] is not original
+    instrumentation.disable()
+    assert not instrumentation.is_enabled()
+    assert BMICalculator.__dict__["analyze_health"] is original
+
+
+def test_counts_errors_and_input_sizes():
+    instrumentation.enable(["BMICalculator.analyze_health_arrays", "HeartRateAnalyzer.analyze_heart_rate"])
+    calculator = BMICalculator()
+    analyzer = HeartRateAnalyzer()
+    calculator.analyze_health_arrays(np.full(300, 70.0), np.full(300, 170.0))
+    calculator.analyze_health_arrays([70.0], [170.0])
+    calculator.analyze_health(70, 170, 30, "ชาย")   # ไม่ได้เลือกไว้ จึงไม่ถูกนับ
+    analyzer.analyze_heart_rate(72, 30)
+    with pytest.raises(KeyError):
+        analyzer.analyze_heart_rate(72, 30, "sleeping")
+
+    methods = instrumentation.snapshot()["methods"]
+    assert set(methods) == {"BMICalculator.analyze_health_arrays", "HeartRateAnalyzer.analyze_heart_rate"}
+    arrays = methods["BMICalculator.analyze_health_arrays"]
+    assert arrays["calls"] == 2 and arrays["errors"] == 0
+    assert arrays["input_size"]["sum"] == 301 and arrays["input_size"]["count"] == 2
+    assert dict(arrays["input_size"]["buckets"])[1] == 1 and dict(arrays["input_size"]["buckets"])[256] == 1
+    assert arrays["latency"]["buckets"][-1] == ("+Inf", 2)
+    heart_rate = methods["HeartRateAnalyzer.analyze_heart_rate"]
+    assert heart_rate["calls"] == 2 and heart_rate["errors"] == 1 and heart_rate["input_size"]["count"] == 0
+
+    # สถิติยังอยู่หลัง disable จนกว่าจะ reset
+    instrumentation.disable()
+    analyzer.analyze_heart_rate(72, 30)
+    assert instrumentation.snapshot()["methods"]["HeartRateAnalyzer.analyze_heart_rate"]["calls"] == 2
+    instrumentation.reset()
+    assert instrumentation.snapshot()["methods"] == {}
+
+
+def test_json_and_prometheus_export():
+    instrumentation.enable(["SymptomChecker.check_symptoms"])
+    checker = SymptomChecker()
+    instrumentation.watch("symptom_cache", checker.cache_info)
+    instrumentation.watch("queue", lambda: {"depth": 3, "name": "ward", "full": False})
+    checker.check_symptoms(["ไข้", "ไอ"])
+
+    data = json.loads(instrumentation.to_json())
+    assert data["enabled"] is True
+    assert data["methods"]["SymptomChecker.check_symptoms"]["input_size"]["sum"] == 2
+    assert data["sources"]["queue"] == {"depth": 3}
+    assert "misses" in data["sources"]["symptom_cache"]
+
+    lines = instrumentation.to_prometheus().splitlines()
+    assert 'analyzer_calls_total{method="SymptomChecker.check_symptoms"} 1' in lines
+    assert 'analyzer_input_size_bucket{method="SymptomChecker.check_symptoms",le="2"} 1' in lines
+    assert 'analyzer_latency_seconds_count{method="SymptomChecker.check_symptoms"} 1' in lines
+    assert "# TYPE analyzer_queue_depth gauge" in lines and "analyzer_queue_depth 3" in lines
+    assert not any("queue_name" in line or "queue_full" in line for line in lines)
+
+    # แหล่งสถิติที่เป็นเมธอดถูกเก็บแบบ weakref หายไปเองเมื่อวัตถุถูกคืนหน่วยความจำ
+    del checker
+    gc.collect()
+    assert "symptom_cache" not in instrumentation.snapshot()["sources"]
+
+
+def test_stage_profiler_attributes_time_to_internal_stages():
+    instrumentation.enable(["SymptomChecker.check_symptoms"])
+    kb = SyntheticKnowledgeBase(2000, seed=0)
+    checker = SymptomChecker(kb.to_diseases())
+    queries, _ = kb.queries(5000, seed=0)
+    with instrumentation.StageProfiler(interval=0.0005) as profiler:
+        deadline = time.perf_counter() + 0.3
+        for i in itertools.count():
+            # ผลถูกแคชไว้ รอบถัดไปจึงล้างแคชก่อน
+            if i and i % len(queries) == 0:
+                checker.cache_clear()
+            checker.check_symptoms(queries[i % len(queries)])
+            if time.perf_counter() > deadline:
+                break
+    assert profiler.samples > 0
+    report = profiler.report("SymptomChecker.check_symptoms")
+    assert report and all(method == "SymptomChecker.check_symptoms" for method, _, _, _ in report)
+    assert all(stage.split(".")[0] in instrumentation.PROJECT_MODULES for _, stage, _, _ in report)
+    assert sum(share for _, _, _, share in report) == pytest.approx(1)
+    assert "analyzer_stage_seconds_total" in instrumentation.to_prometheus()
@@ -0,0 +1,77 @@
+import io
+import json
+
+from bmi_calculator import BMICalculator
+from heart_rate_analyzer import HeartRateAnalyzer
+from jsonl_batch import RecordError, process_records, run_batch
+
+
+def failing_handler(records):
+    """handler ที่ล้มทั้งกลุ่มเมื่อมีรายการที่มี "boom" (เหมือนตัววิเคราะห์ที่ยกข้อผิดพลาดที่ไม่คาดคิด)"""
+    if any("boom" in record for record in records):
+        raise OverflowError("ค่าใหญ่เกินไป")
+    return [record["value"] * 2 for record in records]
+
+
+def test_single_record_batch_returns_error_instead_of_raising():
+    results = process_records(failing_handler, [{"boom": 1}])
+    assert len(results) == 1
+    assert isinstance(results[0], OverflowError)
+
+
+def test_mixed_batch_isolates_failing_record():
+    results = process_records(failing_handler, [{"value": 1}, {"boom": 1}, {"value": 3}])
+    assert results[0] == 2
+    assert isinstance(results[1], OverflowError)
+    assert results[2] == 6
+
+
+def run_lines(handler, lines, batch_size):
+    out = io.StringIO()
+    total, errors = run_batch(handler, lines, out, batch_size)
+    return total, errors, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_run_batch_reports_errors_inline_for_every_batch_size():
+    lines = ['{"value": 1}', '{"boom": 1}', "not json", '{"id": "x", "value": 5}']
+    expected = None
+    for batch_size in (1, 2, 4096):
+        total, errors, rows = run_lines(failing_handler, lines, batch_size)
+        assert (total, errors) == (4, 2)
+        assert rows[0] == {"line": 1, "result": 2}
+        assert rows[1] == {"line": 2, "error": "ค่าใหญ่เกินไป"}
+        assert "error" in rows[2]
+        assert rows[3] == {"line": 4, "id": "x", "result": 10}
+        assert expected is None or rows == expected
+        expected = rows
+
+
+def test_heart_rate_batch_of_one_with_huge_age():
+    analyzer = HeartRateAnalyzer()
+    lines = ['{"heart_rate": 70, "age": 100000000000000000000000}', '{"heart_rate": 70, "age": 30}']
+    for batch_size in (1, 4096):
+        total, errors, rows = run_lines(analyzer.analyze_records, lines, batch_size)
+        assert (total, errors) == (2, 1)
+        assert "error" in rows[0]
+        assert rows[1]["result"] == analyzer.analyze_heart_rate(70, 30)
+
+
+def test_record_error_is_value_error():
+    assert issubclass(RecordError, ValueError)
+
+
+def test_bmi_batch_rejects_results_outside_float_range():
+    calculator = BMICalculator()
+    lines = ['{"weight": 1e308, "height": 1e-200, "age": 30, "gender": "ชาย"}',
+             '{"weight": 70, "height": 1e200, "age": 30, "gender": "หญิง"}',
+             '{"weight": 70, "height": 170, "age": 30, "gender": "ชาย"}']
+    expected = calculator.analyze_health(70, 170, 30, "ชาย").to_dict()
+    for batch_size in (1, 4096):
+        total, errors, rows = run_lines(calculator.analyze_records, lines, batch_size)
+        assert (total, errors) == (3, 2)
+        assert "error" in rows[0] and "error" in rows[1]
+        assert rows[2]["result"] == expected
+    records = [json.loads(line) for line in lines]
+    results = calculator.analyze_records(records)
+    assert isinstance(results[0], RecordError) and isinstance(results[1], RecordError)
+    assert results[2] == expected
@@ -0,0 +1,65 @@
+import pytest
+
+from knowledge_base import CompiledKnowledgeBase, compile_knowledge_base, open_knowledge_base
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+from symptom_checker import DEFAULT_DISEASES, SymptomChecker
+
+
+def replace_file(path, diseases, version):
+    """คอมไพล์ทับไฟล์เดิม (ได้ inode ใหม่จาก os.replace จึงถือเป็นไฟล์ใหม่เสมอ)"""
+    compile_knowledge_base(diseases, str(path), version)
+
+
+def test_newer_version_is_picked_up(tmp_path):
+    path = tmp_path / "diseases.skb"
+    replace_file(path, DEFAULT_DISEASES, 1)
+    checker = SymptomChecker(str(path))
+    assert checker.knowledge_base.version == 1
+    replace_file(path, dict(DEFAULT_DISEASES, ใหม่={"symptoms": ["ไข้"], "severity": "", "advice": ""}), 2)
+    assert checker.reload_knowledge_base()
+    assert checker.knowledge_base.version == 2
+    assert "ใหม่" in checker.diseases
+
+
+def test_older_version_is_refused(tmp_path):
+    path = tmp_path / "diseases.skb"
+    replace_file(path, DEFAULT_DISEASES, 3)
+    checker = SymptomChecker(str(path))
+    replace_file(path, {"เก่า": {"symptoms": ["ไอ"], "severity": "", "advice": ""}}, 2)
+    with pytest.warns(RuntimeWarning):
+        assert not checker.reload_knowledge_base()
+    assert checker.knowledge_base.version == 3
+    assert open_knowledge_base(str(path)) is checker.knowledge_base    # เตือนครั้งเดียวต่อไฟล์
+    assert open_knowledge_base(str(path), allow_downgrade=True).version == 2
+    assert open_knowledge_base(str(path)).version == 2
+
+
+def test_compiled_diseases_view_is_read_only():
+    checker = SymptomChecker()
+    with pytest.raises(TypeError, match="add_disease"):
+        checker.diseases["ใหม่"] = {"symptoms": ["ไข้"], "severity": "", "advice": ""}
+    with pytest.raises(TypeError, match="remove_disease"):
+        del checker.diseases["ไข้หวัด"]
+    checker.add_disease("ใหม่", ["ไข้"], "เล็กน้อย", "พักผ่อน")
+    checker.remove_disease("ไข้หวัด")
+    assert "ใหม่" in checker.diseases and "ไข้หวัด" not in checker.diseases
+    assert "ไข้หวัด" in SymptomChecker().diseases    # ฐานข้อมูลตัวอย่างที่ใช้ร่วมกันไม่ถูกแก้
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_compiled_file_round_trips(tmp_path, seed):
+    diseases = SyntheticKnowledgeBase(300, seed=seed).to_diseases()
+    diseases["โรคไม่มีอาการ"] = {"symptoms": [], "severity": "", "advice": "คำแนะนำ\nหลายบรรทัด"}
+    path = tmp_path / "synthetic.skb"
+    compile_knowledge_base(diseases, str(path), 7)
+    kb = CompiledKnowledgeBase.open(str(path))
+    assert kb.version == 7 and kb.n_diseases == len(diseases)
+    assert list(kb.diseases) == list(diseases)
+    assert dict(kb.diseases) == diseases
+    assert sorted(kb.symptoms()) == kb.symptoms()
+    assert set(kb.symptoms()) == {s for info in diseases.values() for s in info["symptoms"]}
+    assert kb.symptom_id("ไม่มีอาการนี้") is None
+    for symptom_id, symptom in enumerate(kb.symptoms()):
+        assert kb.symptom_id(symptom) == symptom_id
+        assert [kb.disease_name(i) for i in kb.postings(symptom_id)] == \
+            [name for name, info in diseases.items() if symptom in info["symptoms"]]
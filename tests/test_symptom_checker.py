@@ -0,0 +1,116 @@
+"""ทดสอบเชิงเปรียบเทียบ: ทุกเส้นทางของการวิเคราะห์อาการต้องให้ผลเหมือนการไล่ตรวจทุกโรคแบบเดิม"""
+
+import pytest
+
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+from symptom_checker import SymptomChecker
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    kb = SyntheticKnowledgeBase(400, n_symptoms=120, symptoms_per_disease=(2, 8), seed=11)
+    queries, _ = kb.queries(300, symptoms_per_query=(1, 6), noise=0.2, typo_rate=0.1)
+    # อาการซ้ำในคำถามเดียวกัน (นับซ้ำ) และคำถามว่าง
+    queries += [query + query[:1] for query in queries[:30]] + [[]]
+    return kb.to_diseases(), queries
+
+
+def reference_check(diseases, user_symptoms):
+    """check_symptoms แบบเดิม: ไล่ตรวจทุกโรค แล้วเรียงตามเปอร์เซ็นต์ (เท่ากันคงลำดับในฐานข้อมูล)"""
+    results = []
+    for disease, info in diseases.items():
+        matching = [symptom for symptom in user_symptoms if symptom in info["symptoms"]]
+        if matching:
+            results.append({"disease": disease, "percentage": len(matching) / len(info["symptoms"]) * 100,
+                            "matching_symptoms": matching, "severity": info["severity"], "advice": info["advice"]})
+    results.sort(key=lambda result: result["percentage"], reverse=True)
+    return results
+
+
+def test_index_matches_full_scan(synthetic):
+    diseases, queries = synthetic
+    checker = SymptomChecker(diseases)
+    for query in queries:
+        assert checker.check_symptoms(query) == reference_check(diseases, query)
+
+
+def test_index_follows_knowledge_base_changes(synthetic):
+    diseases, queries = synthetic
+    checker = SymptomChecker(dict(diseases))
+    removed = next(iter(diseases))
+    checker.remove_disease(removed)
+    checker.add_disease("โรคใหม่", ["อาการใหม่"] + diseases[removed]["symptoms"][:1], "เล็กน้อย", "พักผ่อน")
+    for query in queries[:50] + [["อาการใหม่"]]:
+        assert checker.check_symptoms(query) == reference_check(checker.diseases, query)
+
+
+@pytest.mark.parametrize("top_k, min_percentage", [(None, 0), (3, 0), (1, 0), (None, 40), (5, 25)])
+def test_batch_matches_single_queries(synthetic, top_k, min_percentage):
+    diseases, queries = synthetic
+    checker = SymptomChecker(diseases)
+    expected = [checker.check_symptoms(query, top_k=top_k, min_percentage=min_percentage) for query in queries]
+    assert checker.check_symptoms_batch(queries, chunk_size=64, top_k=top_k,
+                                        min_percentage=min_percentage) == expected
+
+
+@pytest.mark.parametrize("top_k, min_percentage", [(1, 0), (3, 0), (10, 30), (None, 50), (0, 0)])
+def test_top_k_matches_truncated_full_ranking(synthetic, top_k, min_percentage):
+    diseases, queries = synthetic
+    checker = SymptomChecker(diseases)
+    for query in queries:
+        ranked = [result for result in checker.check_symptoms(query) if result["percentage"] >= min_percentage]
+        assert checker.check_symptoms(query, top_k=top_k, min_percentage=min_percentage) == ranked[:top_k]
+
+
+def test_cache_matches_uncached(synthetic):
+    diseases, queries = synthetic
+    plain = SymptomChecker(diseases)
+    cached = SymptomChecker(diseases, cache_size=32)
+    for top_k in (None, 3):
+        for query in queries + queries[::-1]:
+            assert cached.check_symptoms(query, top_k=top_k) == plain.check_symptoms(query, top_k=top_k)
+    info = cached.cache_info()
+    assert info["hits"] and info["evictions"] and info["size"] == 32
+
+
+def test_cache_is_invalidated_when_knowledge_base_changes(synthetic):
+    diseases, queries = synthetic
+    checker = SymptomChecker(dict(diseases), cache_size=64)
+    query = queries[0] + ["อาการใหม่"]
+    checker.check_symptoms(query)
+    checker.add_disease("โรคใหม่", ["อาการใหม่"], "เล็กน้อย", "พักผ่อน")
+    assert "โรคใหม่" in [result["disease"] for result in checker.check_symptoms(query)]
+    assert checker.check_symptoms(query) == SymptomChecker(checker.diseases).check_symptoms(query)
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_session_matches_check_symptoms(synthetic, k):
+    diseases, queries = synthetic
+    checker = SymptomChecker(diseases)
+    for query in queries[:100]:
+        session = checker.session()
+        for symptom in dict.fromkeys(query):
+            session.add(symptom)
+            assert session.top(k) == checker.check_symptoms(session.symptoms, top_k=k)
+        if session.symptoms:
+            session.remove(session.symptoms[0])
+            assert session.top(k, min_percentage=20) == checker.check_symptoms(session.symptoms, top_k=k,
+                                                                               min_percentage=20)
+
+
+def test_session_with_repeated_symptoms_and_removal(synthetic):
+    diseases, queries = synthetic
+    checker = SymptomChecker(diseases)
+    session = checker.session()
+    query = [symptom for symptom in queries[0] if checker.knowledge_base.symptom_id(symptom) is not None]
+    assert len(query) >= 2
+    # อาการซ้ำนับซ้ำเหมือน check_symptoms (จำนวนที่ตรงกันเกินจำนวนอาการของโรคได้)
+    for symptom in query + query:
+        session.add(symptom)
+    for k in (1, 5, 50):
+        assert session.top(k) == checker.check_symptoms(session.symptoms, top_k=k)
+    for symptom in query + query:
+        assert session.remove(symptom)
+        assert session.top(5, min_percentage=30) == checker.check_symptoms(session.symptoms, top_k=5,
+                                                                           min_percentage=30)
+    assert session.top(5) == [] and not session._counts.any() and not session._groups[1:].any()
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pytest
+
+from symptom_lookup import SymptomLookup, normalize
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+
+
+def brute_force_suggest(lookup, terms, text, limit, min_similarity):
+    """เทียบค่า Dice กับทุกคำในคลังคำ (ผลอ้างอิงของ suggest) terms: [(n-gram ของคำ, รหัสอาการ)]"""
+    key = normalize(text)
+    if not key or limit < 1:
+        return []
+    grams = lookup._grams(key)
+    best = {}
+    for term_grams, symptom_id in terms:
+        overlap = len(grams & term_grams)
+        if not overlap:
+            continue
+        score = 2 * overlap / (len(grams) + len(term_grams))
+        if score >= min_similarity and score > best.get(symptom_id, -1.0):
+            best[symptom_id] = score
+    exact = lookup.resolve_id(text)
+    if exact is not None:
+        best[exact] = 1.0
+    ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [(lookup.vocabulary[symptom_id], score) for symptom_id, score in ranked]
+
+
+@pytest.fixture(scope="module")
+def medium():
+    # 5000 คำเกินจำนวนชื่อที่ประกอบได้ จึงมีชื่อ "... ชนิดที่ 2" ที่ n-gram ส่วนใหญ่พบบ่อยมาก
+    vocabulary = SyntheticKnowledgeBase(100, n_symptoms=5000, seed=5).vocabulary
+    synonyms = {name.replace("ปวด", "เจ็บปวด"): name for name in vocabulary[:3000:7] if "ปวด" in name}
+    synonyms.update({name[::-1]: name for name in vocabulary[:200:5]})
+    rng = np.random.default_rng(5)
+    names = [vocabulary[i] for i in rng.integers(0, len(vocabulary), 80)]
+    queries = ([name[:-1] for name in names] + [name[:len(name) // 2] for name in names[:30]]
+               + list(synonyms)[:20] + ["ปวดหัว", "ไข้", "ชนิดที่ 3", "ปวดมือหลังอาหร", "x", "  "])
+    lookup = SymptomLookup(vocabulary, synonyms)
+    ids = {symptom: i for i, symptom in enumerate(vocabulary)}
+    terms = [(name, i) for i, name in enumerate(vocabulary)]
+    terms += [(synonym, ids[symptom]) for synonym, symptom in synonyms.items()]
+    return lookup, [(lookup._grams(normalize(name)), i) for name, i in terms], queries
+
+
+@pytest.mark.parametrize("limit, min_similarity", [(1, 0.5), (3, 0.5), (5, 0.5), (10, 0.3), (5, 0.8)])
+def test_suggest_matches_brute_force(medium, limit, min_similarity):
+    lookup, terms, queries = medium
+    for query in queries:
+        assert lookup.suggest(query, limit=limit, min_similarity=min_similarity) == brute_force_suggest(
+            lookup, terms, query, limit, min_similarity)
+
+
+def test_suggest_edge_cases():
+    lookup = SymptomLookup(["ปวดหัว", "ไข้", "ไอ"], {"ตัวร้อน": "ไข้"})
+    assert lookup.suggest("ไข้", limit=0) == []
+    assert lookup.suggest("") == []
+    assert lookup.suggest("ตัวร้อน") == [("ไข้", 1.0)]
+    assert lookup.suggest("ปวดหัวว")[0][0] == "ปวดหัว"
+    assert SymptomLookup([]).suggest("ไข้") == []
+
+
+def test_suggest_latency_on_large_vocabulary():
+    kb = SyntheticKnowledgeBase(100, n_symptoms=100000, seed=0)
+    lookup = SymptomLookup(kb.vocabulary)
+    rng = np.random.default_rng(0)
+    queries = [kb.vocabulary[i][:-1] for i in rng.integers(0, kb.n_symptoms, 200)]
+    queries += ["ปวดมือหลังอาหร", "ชนิดที่ 3", "ปวดหัว"]
+    lookup.suggest(queries[0])
+    start = time.perf_counter()
+    results = [lookup.suggest(query) for query in queries]
+    elapsed = (time.perf_counter() - start) / len(queries)
+    assert results[-3][0] == ("ปวดมือหลังอาหาร", pytest.approx(0.8387, abs=1e-4))
+    # เดิมที่นับทุก postings ใช้เวลาเฉลี่ยราว 50 ms ต่อครั้ง ตอนนี้ต่ำกว่า 1 ms; เผื่อเครื่องที่ช้ากว่า
+    assert elapsed < 0.002
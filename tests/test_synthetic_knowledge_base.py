@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from synthetic_knowledge_base import SyntheticKnowledgeBase
+
+
+def test_same_seed_gives_same_knowledge_base_and_queries():
+    first = SyntheticKnowledgeBase(300, seed=7)
+    second = SyntheticKnowledgeBase(300, seed=7)
+    assert first.to_diseases() == second.to_diseases()
+    assert first.queries(200, typo_rate=0.3) == second.queries(200, typo_rate=0.3)
+
+
+def test_diseases_have_unique_symptoms_within_range():
+    kb = SyntheticKnowledgeBase(500, n_symptoms=120, symptoms_per_disease=(3, 12), seed=1)
+    for disease in kb.to_diseases().values():
+        assert 3 <= len(disease["symptoms"]) <= 12
+        assert len(set(disease["symptoms"])) == len(disease["symptoms"])
+
+
+def test_typo_never_produces_a_real_symptom_name():
+    # คำศัพท์เกินจำนวนชื่อที่ประกอบได้ จึงมีชื่อ "... ชนิดที่ 20" ซึ่งตัดแล้วกลายเป็น "... ชนิดที่ 2"
+    kb = SyntheticKnowledgeBase(100, n_symptoms=100000, symptom_exponent=0.0, seed=3)
+    vocabulary = set(kb.vocabulary)
+    assert any(name[:-1].rstrip() in vocabulary for name in kb.vocabulary)
+    _, symptoms = kb.query_ids(20000, symptoms_per_query=(2, 5), typo_rate=1.0)
+    names = kb.query_vocabulary()
+    typos = symptoms[symptoms >= kb.n_symptoms]
+    assert len(typos)
+    assert not {names[i] for i in typos.tolist()} & vocabulary
+
+
+@pytest.mark.parametrize("exponent", [3.0, 6.0])
+def test_steep_zipf_with_full_vocabulary_terminates(exponent):
+    # ทุกโรคต้องใช้อาการทั้งคำศัพท์ การสุ่มแบบใส่คืนแทบไม่มีทางได้ครบ จึงต้องใช้ทางสำรอง
+    kb = SyntheticKnowledgeBase(20, n_symptoms=12, symptoms_per_disease=(12, 12), symptom_exponent=exponent, seed=0)
+    for row in kb.padded:
+        assert sorted(row.tolist()) == list(range(12))
+
+
+def test_large_vocabulary_names_are_unique():
+    kb = SyntheticKnowledgeBase(100, n_symptoms=50000, seed=0)
+    assert len(set(kb.vocabulary)) == kb.n_symptoms
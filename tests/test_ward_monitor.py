@@ -0,0 +1,114 @@
+import asyncio
+import math
+
+import pytest
+
+from ward_monitor import WardMonitor
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def make_monitor(**options):
+    monitor = WardMonitor(window=5, **options)
+    monitor.register("a", 30)
+    monitor.register("b", 70, "normal")
+    return monitor
+
+
+def feed(monitor, readings):
+    """ส่งค่า (ผู้ป่วย, ค่า) ทั้งหมดแล้วประมวลผลหนึ่งรอบ คืนการแจ้งเตือนของรอบนั้น"""
+    for patient, heart_rate in readings:
+        monitor.submit_nowait(patient, heart_rate)
+    return monitor.process_batch(monitor._drain())
+
+
+@pytest.mark.parametrize("reading", [math.nan, math.inf, None, "เร็ว"])
+def test_invalid_readings_are_rejected_at_submit(reading):
+    async def scenario():
+        monitor = make_monitor()
+        with pytest.raises(ValueError):
+            monitor.submit_nowait("a", reading)
+        with pytest.raises(ValueError):
+            await monitor.submit("a", reading)
+        assert monitor.queue.empty()
+    run(scenario())
+
+
+def test_invalid_reading_in_batch_does_not_poison_mean():
+    async def scenario():
+        monitor = make_monitor()
+        row = monitor._index["a"]
+        monitor.process_batch([(row, math.nan, None, 0.0), (row, None, None, 0.0)])
+        feed(monitor, [("a", 70)] * 5)
+        assert monitor.mean("a") == 70
+        assert monitor.status("a") == "ปกติ"
+        assert monitor.rejected == 2 and monitor.processed == 5
+    run(scenario())
+
+
+def test_sum_recovers_after_extreme_value_is_overwritten():
+    async def scenario():
+        monitor = make_monitor()
+        feed(monitor, [("a", 1e308), ("a", 1e308)])
+        assert math.isinf(monitor.mean("a"))
+        # ผลรวมถูกคำนวณใหม่จาก ring buffer อย่างน้อยทุกครั้งที่วนครบ window
+        feed(monitor, [("a", 70)] * 10)
+        assert monitor.mean("a") == 70
+    run(scenario())
+
+
+def test_alert_is_sent_once_when_entering_dangerous_status():
+    async def scenario():
+        monitor = make_monitor()
+        assert feed(monitor, [("a", 75)] * 5) == []
+        alerts = feed(monitor, [("a", 200)] * 5)
+        assert [(alert["patient"], alert["status"]) for alert in alerts] == [("a", "เร็วมาก")]
+        assert feed(monitor, [("a", 200)]) == []                   # ยังอยู่ในสถานะเดิม ไม่แจ้งซ้ำ
+        feed(monitor, [("a", 75)] * 5)
+        assert monitor.status("a") == "ปกติ"
+        assert len(feed(monitor, [("a", 30)] * 5)) == 1            # เข้าสู่ "ช้ามาก" แจ้งใหม่
+        assert monitor.alerts.qsize() == monitor.alerts_sent == 2
+        assert monitor.status("b") is None
+    run(scenario())
+
+
+def test_full_alert_queue_drops_alerts_without_blocking():
+    async def scenario():
+        monitor = make_monitor(alert_queue_size=1)
+        feed(monitor, [("a", 200)] * 5 + [("b", 250)] * 5)
+        assert (monitor.alerts_sent, monitor.alerts_dropped) == (1, 1)
+    run(scenario())
+
+
+def test_full_queue_applies_backpressure():
+    async def scenario():
+        monitor = make_monitor(queue_size=2)
+        monitor.submit_nowait("a", 70)
+        await monitor.submit("a", 71)
+        with pytest.raises(asyncio.QueueFull):
+            monitor.submit_nowait("a", 72)
+        waiting = asyncio.create_task(monitor.submit("a", 73))
+        await asyncio.sleep(0)
+        assert not waiting.done()                                  # ผู้ส่งต้องรอจนคิวว่าง
+        monitor.process_batch(monitor._drain())
+        await waiting
+        monitor.process_batch(monitor._drain())
+        assert monitor.processed == 3 and monitor.max_queue_depth == 2
+        assert monitor.mean("a") == pytest.approx((70 + 71 + 73) / 3)
+    run(scenario())
+
+
+def test_run_processes_submissions_until_stopped():
+    async def scenario():
+        monitor = make_monitor(tick=0.001)
+        engine = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0)
+        for heart_rate in range(60, 80):
+            await monitor.submit("b", heart_rate)
+        monitor.stop()
+        await engine
+        assert monitor.processed == 20
+        assert monitor.stats()["latency_max"] is not None
+    run(scenario())
@@ -0,0 +1,323 @@
+"""
+ระบบติดตามอัตราการเต้นหัวใจของผู้ป่วยทั้งหอ (Ward Monitor) แบบ asyncio
+รับค่าจากอุปกรณ์หลายพันเครื่องพร้อมกันผ่านคิวที่มีขนาดจำกัด (อุปกรณ์ต้องรอเมื่อคิวเต็ม = backpressure)
+แล้วประมวลผลเป็นรอบ (tick): ปรับค่าเฉลี่ยเคลื่อนที่ของผู้ป่วยทุกคนที่มีค่าใหม่และจำแนกสถานะพร้อมกัน
+ด้วยตารางเกณฑ์เดียวกับ HeartRateAnalyzer.analyze_heart_rate_arrays
+เมื่อผู้ป่วยเข้าสู่สถานะ "เร็วมาก" หรือ "ช้ามาก" จะส่งการแจ้งเตือนเข้าคิว alerts
+
+ตัวอย่างการใช้งาน (จำลองอุปกรณ์ 10,000 เครื่อง ส่งค่าทุก 1 วินาที เป็นเวลา 30 วินาที):
+    python ward_monitor.py --devices 10000 --seconds 30
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from heart_rate_analyzer import HeartRateAnalyzer
+
+# สถานะที่ต้องแจ้งเตือนทันที
+ALERT_STATUSES = ("ช้ามาก", "เร็วมาก")
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _check_reading(heart_rate):
+    """ค่าจากอุปกรณ์ต้องเป็นตัวเลขที่มีค่าจำกัด มิฉะนั้นยก ValueError (NaN ค่าเดียวทำให้ค่าเฉลี่ยเสียทั้ง window)"""
+    value = _float_or_nan(heart_rate)
+    if not math.isfinite(value):
+        raise ValueError(f"อัตราการเต้นหัวใจต้องเป็นตัวเลข: {heart_rate!r}")
+    return value
+
+
+class WardMonitor:
+    """สถานะของผู้ป่วยทุกคนเก็บเป็น array (ผู้ป่วยหนึ่งคน = หนึ่งแถว) เพื่อประมวลผลทั้งหอพร้อมกัน
+
+    window: จำนวนค่าล่าสุดที่ใช้หาค่าเฉลี่ยก่อนจำแนกสถานะ (ลดการแจ้งเตือนจากค่าผิดพลาดค่าเดียว)
+    tick: ระยะเวลาระหว่างรอบการประมวลผล (วินาที) ค่าที่เข้ามาจะถูกประมวลผลภายในประมาณหนึ่ง tick
+    """
+
+    def __init__(self, analyzer=None, window=10, tick=0.1, queue_size=50000, alert_queue_size=10000):
+        self.analyzer = analyzer or HeartRateAnalyzer()
+        self.window = window
+        self.tick = tick
+        self.queue = asyncio.Queue(queue_size)
+        self.alerts = asyncio.Queue(alert_queue_size)
+
+        self._names = self.analyzer.status_names()
+        self._alert_codes = np.array([self._names.index(status) for status in ALERT_STATUSES])
+        self._index = {}                # รหัสผู้ป่วย -> แถว
+        self._patients = []             # แถว -> รหัสผู้ป่วย
+        self._capacity = 0
+        self._allocate(1024)
+
+        self.processed = 0
+        self.rejected = 0
+        self.alerts_sent = 0
+        self.alerts_dropped = 0
+        self.max_queue_depth = 0
+        self._latencies = deque(maxlen=600)   # เวลาแฝงของแต่ละรอบล่าสุด (array ต่อรอบ)
+        self._running = False
+
+    def _allocate(self, capacity):
+        """ขยาย array สถานะให้รองรับผู้ป่วยได้ capacity คน (เพิ่มเป็นสองเท่าเมื่อเต็ม)"""
+        def grow(old, shape, dtype, fill=0):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        n = self._capacity
+        keep = self._capacity > 0
+        self._ring = grow(self._ring[:n] if keep else None, (capacity, self.window), np.float64)
+        self._pos = grow(self._pos[:n] if keep else None, capacity, np.int64)
+        self._count = grow(self._count[:n] if keep else None, capacity, np.int64)
+        self._sum = grow(self._sum[:n] if keep else None, capacity, np.float64)
+        self._normal_min = grow(self._normal_min[:n] if keep else None, capacity, np.float64)
+        self._normal_max = grow(self._normal_max[:n] if keep else None, capacity, np.float64)
+        self._status = grow(self._status[:n] if keep else None, capacity, np.int8, -1)
+        self._last_timestamp = grow(self._last_timestamp[:n] if keep else None, capacity, np.float64, np.nan)
+        self._capacity = capacity
+
+    def register(self, patient_id, age, activity_level="resting"):
+        """ลงทะเบียนผู้ป่วย (หรือปรับอายุ/สถานะกิจกรรมของผู้ป่วยเดิม) คืนแถวของผู้ป่วย"""
+        row = self._index.get(patient_id)
+        if row is None:
+            row = len(self._patients)
+            if row >= self._capacity:
+                self._allocate(self._capacity * 2)
+            self._index[patient_id] = row
+            self._patients.append(patient_id)
+        zone_min, zone_max = self.analyzer._zone_tables()
+        group = self.analyzer.get_age_group_codes(age)
+        activity = self.analyzer.get_activity_codes(activity_level)
+        self._normal_min[row] = zone_min[group, activity]
+        self._normal_max[row] = zone_max[group, activity]
+        return row
+
+    def __len__(self):
+        return len(self._patients)
+
+    async def submit(self, patient_id, heart_rate, timestamp=None):
+        """ส่งค่าจากอุปกรณ์ (รอเมื่อคิวเต็ม) ผู้ป่วยต้องลงทะเบียนไว้ก่อน ค่าที่ไม่ใช่ตัวเลข (NaN, None) ยก ValueError"""
+        await self.queue.put((self._index[patient_id], _check_reading(heart_rate), timestamp, time.perf_counter()))
+
+    def submit_nowait(self, patient_id, heart_rate, timestamp=None):
+        """ส่งค่าแบบไม่รอ (asyncio.QueueFull เมื่อคิวเต็ม ให้ผู้ส่งตัดสินใจเองว่าจะทิ้งหรือส่งใหม่)"""
+        self.queue.put_nowait((self._index[patient_id], _check_reading(heart_rate), timestamp, time.perf_counter()))
+
+    def status(self, patient_id):
+        """สถานะปัจจุบันของผู้ป่วย (None ถ้ายังไม่มีค่า)"""
+        code = self._status[self._index[patient_id]]
+        return None if code < 0 else self._names[code]
+
+    def mean(self, patient_id):
+        """ค่าเฉลี่ยของ window ค่าล่าสุดของผู้ป่วย (None ถ้ายังไม่มีค่า)"""
+        row = self._index[patient_id]
+        return self._sum[row] / self._count[row] if self._count[row] else None
+
+    def _drain(self):
+        """ดึงค่าทั้งหมดที่รออยู่ในคิวออกมาโดยไม่รอ"""
+        queue = self.queue
+        depth = queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return [queue.get_nowait() for _ in range(depth)]
+
+    def process_batch(self, batch):
+        """ประมวลผลค่าชุดหนึ่ง (รายการ (แถว, ค่า, timestamp, เวลาที่ส่ง)) คืนรายการการแจ้งเตือน
+
+        ค่าที่ไม่ใช่ตัวเลขที่มีค่าจำกัด (ส่งเข้ามาโดยไม่ผ่าน submit) ถูกทิ้งและนับใน rejected
+        """
+        if not batch:
+            return []
+        rows, heart_rates, timestamps, submitted = zip(*batch)
+        rows = np.array(rows, dtype=np.int64)
+        try:
+            heart_rates = np.array(heart_rates, dtype=np.float64)
+        except (TypeError, ValueError):
+            heart_rates = np.array([_float_or_nan(hr) for hr in heart_rates], dtype=np.float64)
+        timestamps = np.array([np.nan if t is None else t for t in timestamps], dtype=np.float64)
+        valid = np.isfinite(heart_rates)
+        if not valid.all():
+            self.rejected += int((~valid).sum())
+            rows, heart_rates, timestamps = rows[valid], heart_rates[valid], timestamps[valid]
+            submitted = np.array(submitted)[valid]
+            if not len(rows):
+                return []
+
+        # ผู้ป่วยคนเดียวอาจมีหลายค่าในรอบเดียว: ปรับทีละ "ชั้น" ซึ่งแต่ละชั้นมีผู้ป่วยไม่ซ้ำกัน
+        # (ชั้นที่ r คือค่าลำดับที่ r ของผู้ป่วยแต่ละคนในรอบนี้ ตามลำดับที่ส่งเข้ามา)
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        rank = np.arange(len(rows)) - np.repeat(group_start, np.diff(np.r_[group_start, len(rows)]))
+        for layer in range(int(rank.max()) + 1):
+            selected = order[rank == layer]
+            self._push(rows[selected], heart_rates[selected], timestamps[selected])
+
+        alerts = self._classify(np.unique(rows))
+        now = time.perf_counter()
+        self._latencies.append(now - np.array(submitted))
+        self.processed += len(rows)
+        return alerts
+
+    def _push(self, rows, heart_rates, timestamps):
+        """เพิ่มค่าใหม่ลง ring buffer ของผู้ป่วย (แต่ละแถวไม่ซ้ำกัน) และปรับผลรวมเคลื่อนที่"""
+        pos = self._pos[rows]
+        with np.errstate(over="ignore", invalid="ignore"):
+            sums = self._sum[rows] + (heart_rates - self._ring[rows, pos])   # ช่องที่ยังไม่เคยใช้มีค่า 0
+            self._ring[rows, pos] = heart_rates
+            # คำนวณผลรวมใหม่จาก ring buffer ทุกครั้งที่วนครบ window (ต้นทุนเฉลี่ย O(1) ต่อค่า) และเมื่อผลรวมไม่จำกัด
+            # ความคลาดเคลื่อนสะสมของการบวกลบ และ inf จากค่าสุดโต่งที่ถูกเขียนทับแล้ว จึงไม่ค้างอยู่ตลอดไป
+            stale = (pos == self.window - 1) | ~np.isfinite(sums)
+            if stale.any():
+                sums[stale] = self._ring[rows[stale]].sum(axis=1)
+        self._sum[rows] = sums
+        self._pos[rows] = (pos + 1) % self.window
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.window)
+        self._last_timestamp[rows] = timestamps
+
+    def _classify(self, rows):
+        """จำแนกสถานะของผู้ป่วยที่มีค่าใหม่พร้อมกัน คืนการแจ้งเตือนของผู้ที่เพิ่งเข้าสู่สถานะอันตราย"""
+        means = self._sum[rows] / self._count[rows]
+        codes = self.analyzer.get_status_codes(means, self._normal_min[rows], self._normal_max[rows])
+        previous = self._status[rows]
+        self._status[rows] = codes
+        entering = np.isin(codes, self._alert_codes) & (codes != previous)
+
+        alerts = []
+        for i in np.flatnonzero(entering).tolist():
+            row = int(rows[i])
+            timestamp = self._last_timestamp[row]
+            alert = {
+                "patient": self._patients[row],
+                "status": self._names[codes[i]],
+                "mean_heart_rate": float(means[i]),
+                "timestamp": None if np.isnan(timestamp) else float(timestamp),
+                "advice": self.analyzer.status_categories[self._names[codes[i]]]["advice"]
+            }
+            try:
+                self.alerts.put_nowait(alert)
+                self.alerts_sent += 1
+            except asyncio.QueueFull:
+                self.alerts_dropped += 1   # ไม่ให้ผู้รับการแจ้งเตือนที่ช้าทำให้การประมวลผลหยุด
+            alerts.append(alert)
+        return alerts
+
+    async def run(self):
+        """วนประมวลผลทุก tick จนกว่าจะเรียก stop()"""
+        self._running = True
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self._running:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            self.process_batch(self._drain())
+        self.process_batch(self._drain())
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        """สถิติการทำงาน: จำนวนค่าที่ประมวลผล การแจ้งเตือน ความลึกคิวสูงสุด และเวลาแฝง (วินาที)"""
+        latencies = np.concatenate(self._latencies) if self._latencies else np.empty(0)
+        return {
+            "patients": len(self._patients),
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "alerts_sent": self.alerts_sent,
+            "alerts_dropped": self.alerts_dropped,
+            "max_queue_depth": self.max_queue_depth,
+            "latency_p50": float(np.percentile(latencies, 50)) if latencies.size else None,
+            "latency_p99": float(np.percentile(latencies, 99)) if latencies.size else None,
+            "latency_max": float(latencies.max()) if latencies.size else None
+        }
+
+
+async def simulate_devices(monitor, devices, seconds, rate_hz=1.0, group_size=100, seed=None,
+                           episode_fraction=0.01):
+    """จำลองอุปกรณ์ devices เครื่อง ส่งค่าทุก 1/rate_hz วินาทีเป็นเวลา seconds วินาที
+
+    อุปกรณ์ถูกแบ่งเป็นกลุ่มละ group_size เครื่อง (หนึ่ง coroutine ต่อกลุ่ม) และกระจายเวลาส่งของแต่ละกลุ่ม
+    ให้ทั่วทั้งรอบ ผู้ป่วยประมาณ episode_fraction มีช่วงหัวใจเต้นเร็วมากหรือช้ามากเพื่อทดสอบการแจ้งเตือน
+    """
+    rng = np.random.default_rng(seed)
+    ages = rng.integers(6, 90, devices)
+    levels = np.array(monitor.analyzer.activity_levels()[:2])[rng.integers(0, 2, devices)]
+    for device in range(devices):
+        monitor.register(f"bed-{device:05d}", int(ages[device]), str(levels[device]))
+    base = rng.normal(78, 8, devices)
+    episode = np.where(rng.random(devices) < episode_fraction, rng.choice([-45.0, 90.0], devices), 0.0)
+
+    loop = asyncio.get_running_loop()
+    period = 1 / rate_hz
+    start = loop.time()
+    total_ticks = int(seconds * rate_hz)
+
+    async def device_group(first, last, offset):
+        group_rng = np.random.default_rng([first, 0 if seed is None else seed])
+        patient_ids = [f"bed-{device:05d}" for device in range(first, last)]
+        for tick in range(total_ticks):
+            await asyncio.sleep(max(0, start + offset + tick * period - loop.time()))
+            # ครึ่งหลังของการจำลองเป็นช่วงที่ผู้ป่วยบางคนมีอาการ
+            shift = episode[first:last] if tick >= total_ticks // 2 else 0
+            readings = base[first:last] + shift + group_rng.normal(0, 3, last - first)
+            now = time.time()
+            for patient_id, heart_rate in zip(patient_ids, readings.tolist()):
+                await monitor.submit(patient_id, heart_rate, now)
+
+    groups = range(0, devices, group_size)
+    await asyncio.gather(*(device_group(first, min(first + group_size, devices), period * i / len(groups))
+                           for i, first in enumerate(groups)))
+
+
+async def _run_simulation(devices, seconds, rate_hz, window, tick, seed):
+    monitor = WardMonitor(window=window, tick=tick)
+    alerts_by_status = {status: 0 for status in ALERT_STATUSES}
+
+    async def consume_alerts():
+        while True:
+            alert = await monitor.alerts.get()
+            alerts_by_status[alert["status"]] += 1
+
+    engine = asyncio.create_task(monitor.run())
+    consumer = asyncio.create_task(consume_alerts())
+    started = time.perf_counter()
+    await simulate_devices(monitor, devices, seconds, rate_hz, seed=seed)
+    monitor.stop()
+    await engine
+    await asyncio.sleep(0)
+    consumer.cancel()
+    elapsed = time.perf_counter() - started
+    return monitor.stats(), alerts_by_status, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="จำลองอุปกรณ์วัดอัตราการเต้นหัวใจทั้งหอผู้ป่วย")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--rate", type=float, default=1.0, help="ความถี่การส่งค่าของแต่ละอุปกรณ์ (Hz)")
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--tick", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats, alerts_by_status, elapsed = asyncio.run(
+        _run_simulation(args.devices, args.seconds, args.rate, args.window, args.tick, args.seed))
+    print(f"\n🏥 ผู้ป่วย {stats['patients']:,} คน, ประมวลผล {stats['processed']:,} ค่า "
+          f"ใน {elapsed:.1f} วินาที ({stats['processed'] / elapsed:,.0f} ค่า/วินาที)")
+    print(f"⏱️  เวลาแฝง p50 {stats['latency_p50'] * 1000:.1f} ms, p99 {stats['latency_p99'] * 1000:.1f} ms, "
+          f"สูงสุด {stats['latency_max'] * 1000:.1f} ms (ความลึกคิวสูงสุด {stats['max_queue_depth']:,})")
+    print("🚨 การแจ้งเตือน: " + ", ".join(f"{status} {count}" for status, count in alerts_by_status.items())
+          + (f" (ทิ้ง {stats['alerts_dropped']})" if stats["alerts_dropped"] else ""))
+
+if __name__ == "__main__":
+    main()